@@ -35,10 +35,13 @@ from behavysis.df_classes.features_df import FeaturesDf
 from behavysis.pydantic_models.behav_classifier_configs import (
     BehavClassifierConfigs,
 )
+from behavysis.utils.bout_array import BoutArray
 from behavysis.utils.df_mixin import DFMixin
 from behavysis.utils.io_utils import async_read_files_run, get_name, joblib_dump, joblib_load, write_json
 from behavysis.utils.logging_utils import init_logger_file
 from behavysis.utils.misc_utils import array2listofvect, enum2tuple, listofvects2array
+from behavysis.utils.plot_service import save_fig
+from behavysis.utils.resource_cache import ResourceCache
 
 if TYPE_CHECKING:
     from behavysis.pipeline.project import Project
@@ -442,6 +445,20 @@ class BehavClassifier:
         # Restoring clf
         self.clf = clf
 
+    def load_inference_models(self) -> tuple[Pipeline, BaseTorchModel]:
+        """
+        Returns the fitted preprocessing pipeline and model (from `pipeline_training`).
+
+        Within a `ResourceCache.session()` (i.e. a `Project` stage), they are loaded once
+        and shared by all experiments, so must not be modified (e.g. refitted).
+        Otherwise, they are loaded from disk each call.
+        """
+        preproc_fp = self.preproc_fp
+        clf_fp = self.clf_fp
+        preproc_pipe: Pipeline = ResourceCache.load(joblib_load.__name__, preproc_fp, lambda: joblib_load(preproc_fp))
+        clf: BaseTorchModel = ResourceCache.load(joblib_load.__name__, clf_fp, lambda: joblib_load(clf_fp))
+        return preproc_pipe, clf
+
     def pipeline_inference(self, x_df: pd.DataFrame) -> pd.DataFrame:
         """
         Given the unprocessed features dataframe, runs the model pipeline to make predictions.
@@ -452,12 +469,11 @@ class BehavClassifier:
         - Makes predictions and returns the predicted behaviours.
         """
         index = x_df.index
+        preproc_pipe, clf = self.load_inference_models()
         # Preprocessing features
-        x = self.preproc_x_transform(x_df.values, self.preproc_fp)
-        # Loading the model
-        self.clf = joblib_load(self.clf_fp)
+        x = preproc_pipe.transform(x_df.values)
         # Getting probabilities
-        y_prob = self.clf.predict(
+        y_prob = clf.predict(
             x=x,
             index=np.arange(x.shape[0]),
             batch_size=self.configs.batch_size,
@@ -480,7 +496,7 @@ class BehavClassifier:
         # Making and saving history figure
         fig, ax = plt.subplots(figsize=(10, 7))
         sns.lineplot(data=history, ax=ax)
-        fig.savefig(os.path.join(self.eval_dir, "history.png"))
+        save_fig(fig, os.path.join(self.eval_dir, "history.png"))
 
     def clf_eval_save_performance(
         self,
@@ -491,7 +507,8 @@ class BehavClassifier:
     ) -> tuple[pd.DataFrame, dict, Figure, Figure, Figure]:
         """
         Evaluates the classifier performance on the given x and y data.
-        Saves the `metrics_fig` and `pcutoffs_fig` to the model's root directory.
+        Saves the `metrics_fig` and `pcutoffs_fig` to the model's root directory
+        (the returned figures are closed, refer to `save_fig`).
 
         Returns
         -------
@@ -529,9 +546,9 @@ class BehavClassifier:
         # Saving data and figures
         BehavClassifierEvalDf.write(eval_df, os.path.join(self.eval_dir, f"{name}_eval.{BehavClassifierEvalDf.IO}"))
         write_json(os.path.join(self.eval_dir, f"{name}_report.json"), report_dict)
-        metrics_fig.savefig(os.path.join(self.eval_dir, f"{name}_confm.png"))
-        pcutoffs_fig.savefig(os.path.join(self.eval_dir, f"{name}_pcutoffs.png"))
-        logc_fig.savefig(os.path.join(self.eval_dir, f"{name}_logc.png"))
+        save_fig(metrics_fig, os.path.join(self.eval_dir, f"{name}_confm.png"))
+        save_fig(pcutoffs_fig, os.path.join(self.eval_dir, f"{name}_pcutoffs.png"))
+        save_fig(logc_fig, os.path.join(self.eval_dir, f"{name}_logc.png"))
         return eval_df, report_dict, metrics_fig, pcutoffs_fig, logc_fig
 
     #################################################
@@ -638,16 +655,18 @@ class BehavClassifier:
         """
         __summary__
         """
-        y_eval = pd.DataFrame({"y_true": y_true, "y_pred": y_pred})
-        y_eval["ids"] = np.cumsum(y_eval["y_true"] != y_eval["y_true"].shift())
+        y_true = np.asarray(y_true)
+        # Getting each bout (i.e. run) of y_true values
+        bouts = BoutArray.from_runs(y_true)
         # Getting the proportion of correct predictions for each bout
-        y_eval_grouped = y_eval.groupby("ids")
         y_eval_summary = pd.DataFrame(
-            y_eval_grouped.apply(lambda x: (x["y_pred"] == x["y_true"]).mean()),
-            columns=["proportion"],
+            {
+                "proportion": bouts.get_sums(np.asarray(y_pred) == y_true) / bouts.durs,
+                "actual_bout": bouts.values.astype(np.float64),
+                "bout_len": bouts.durs,
+            },
+            index=pd.Index(np.arange(1, len(bouts) + 1), name="ids"),
         )
-        y_eval_summary["actual_bout"] = y_eval_grouped.apply(lambda x: x["y_true"].mean())
-        y_eval_summary["bout_len"] = y_eval_grouped.apply(lambda x: x.shape[0])
         y_eval_summary = y_eval_summary.sort_values("proportion")
         # # Making figure
         # fig, ax = plt.subplots(figsize=(10, 7))
@@ -47,6 +47,8 @@ class FileExts(Enum):
 # TODO: is there a better way to do the subsubdirs?
 DIAGNOSTICS_DIR = "0_diagnostics"
 ANALYSIS_DIR = "8_analysis"
+ANALYSIS_SWEEP_DIR = "8_analysis_sweep"
+PREVIEW_DIR = "preview"
 
 CACHE_DIR = os.path.join(pathlib.Path.home(), ".behavysis_temp")
 
@@ -65,6 +67,10 @@ STR_DIV = "".ljust(50, "-")
 
 PLOT_STYLE = "whitegrid"
 PLOT_DPI = 75
+# Number of processes that render plots at a time (refer to `PlotService`)
+PLOT_MAX_WORKERS = 2
+# Scatter and line artists with this many points are rasterised
+PLOT_RASTERISE_MIN_POINTS = 10000
 
 ####################################################################################################
 # DEFAULT BODYPOINT CONSTANTS (FOR SIMBA FEATURE EXTRACTION)
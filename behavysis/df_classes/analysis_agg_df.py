@@ -1,15 +1,25 @@
 import os
+import warnings
 from enum import Enum
 from typing import Callable
 
 import numpy as np
 import pandas as pd
 import seaborn as sns
+from matplotlib.figure import Figure
 
 from behavysis.df_classes.analysis_df import AnalysisDf
-from behavysis.df_classes.behav_df import BehavScoredDf
+from behavysis.utils.binned_utils import (
+    BEHAVS_AGGS,
+    QUANTITATIVE_AGGS,
+    binned_behavs_stats,
+    binned_quantitative_stats,
+    sorted_order_stats,
+)
+from behavysis.utils.bout_array import BoutArray
 from behavysis.utils.df_mixin import DFMixin
 from behavysis.utils.misc_utils import enum2list, enum2tuple
+from behavysis.utils.plot_service import PlotService, PlotSpec
 
 SUMMARY = "summary"
 BINNED = "binned"
@@ -48,6 +58,9 @@ class AnalysisSummaryDf(DFMixin):
         std, min, Q1, median, Q3, and max.
         Used for quantitative numeric data.
 
+        All columns are aggregated at once (refer to `nan_stats_arr`).
+        NaN values are ignored, and empty dfs have statistics of 0.
+
         Params:
             analysis_df: pd.DataFrame
                 _description_
@@ -56,35 +69,12 @@ class AnalysisSummaryDf(DFMixin):
         str
             The outcome string.
         """
-        # Getting summary stats for each individual
-        summary_df_ls = np.zeros(analysis_df.shape[1], dtype="object")
-        for i, col in enumerate(analysis_df.columns):
-            # Getting column vector of individual-measure
-            vect = analysis_df[col]
-            # Handling edge case where columns are empty
-            vect = np.array([0]) if vect.shape[0] == 0 else vect
-            # Setting columns to type float
-            vect = vect.astype(np.float64)
-            # Aggregating stats
-            summary_df_ls[i] = (
-                pd.Series(
-                    {
-                        "mean": np.nanmean(vect),
-                        "std": np.nanstd(vect),
-                        "min": np.nanmin(vect),
-                        "Q1": np.nanquantile(vect, q=0.25),
-                        "median": np.nanmedian(vect),
-                        "Q3": np.nanquantile(vect, q=0.75),
-                        "max": np.nanmax(vect),
-                    },
-                    name=col,
-                )
-                .to_frame()
-                .T
-            )
-        # Concatenating summary_df_ls, setting index, and cleaning
-        summary_df = pd.concat(summary_df_ls, axis=0)
-        summary_df.index = analysis_df.columns
+        # Getting (columns, frames) array
+        arr = np.ascontiguousarray(analysis_df.to_numpy(dtype=np.float64).T)
+        # Handling edge case where columns are empty
+        arr = np.zeros((analysis_df.shape[1], 1)) if arr.shape[1] == 0 else arr
+        # Aggregating stats
+        summary_df = pd.DataFrame(nan_stats_arr(arr), index=analysis_df.columns)
         summary_df = cls.basic_clean(summary_df)
         return summary_df
 
@@ -104,43 +94,26 @@ class AnalysisSummaryDf(DFMixin):
         str
             The outcome string.
         """
-        # Getting summary stats for each individual
-        summary_df_ls = np.zeros(analysis_df.shape[1], dtype="object")
-        for i, col in enumerate(analysis_df.columns):
-            # Getting column vector of individual-measure
-            vect = analysis_df[col]
-            # Getting duration of each behav bout
-            bouts = BehavScoredDf.vect2bouts_df(vect == 1)["dur"]
-            # Converting bouts duration from frames to seconds
-            bouts = bouts / fps
-            # Getting bout frequency (before it is overwritten if empty)
-            bout_freq = bouts.shape[0]
-            # Handling edge case where bouts is empty
-            bouts = np.array([0]) if bouts.shape[0] == 0 else bouts
-            # Setting bouts to type float
-            bouts = bouts.astype(np.float64)
-            # Aggregating stats
-            summary_df_ls[i] = (
-                pd.Series(
-                    {
-                        "bout_freq": bout_freq,
-                        "bout_dur_total": np.nansum(bouts),
-                        "bout_dur_mean": np.nanmean(bouts),
-                        "bout_dur_std": np.nanstd(bouts),
-                        "bout_dur_min": np.nanmin(bouts),
-                        "bout_dur_Q1": np.nanquantile(bouts, q=0.25),
-                        "bout_dur_median": np.nanmedian(bouts),
-                        "bout_dur_Q3": np.nanquantile(bouts, q=0.75),
-                        "bout_dur_max": np.nanmax(bouts),
-                    },
-                    name=col,
-                )
-                .to_frame()
-                .T
-            )
-        # Concatenating summary_df_ls, setting index, and cleaning
-        summary_df = pd.concat(summary_df_ls, axis=0)
-        summary_df.index = analysis_df.columns
+        # Getting behav bouts of all columns (run-length encoded at once)
+        bouts_ls = BoutArray.from_arr(analysis_df.to_numpy() == 1)
+        n_bouts = np.array([len(bouts) for bouts in bouts_ls], dtype=np.int64)
+        # Getting (columns, bouts) array of bout durations (in seconds), padded with NaN.
+        # Columns without bouts have a single duration of 0 (same as `BoutArray.summary`)
+        durs = np.full((len(bouts_ls), max(1, n_bouts.max(initial=0))), np.nan)
+        durs[n_bouts == 0, 0] = 0
+        rows_idx = np.repeat(np.arange(len(bouts_ls)), n_bouts)
+        bouts_idx = np.arange(rows_idx.shape[0]) - np.repeat(np.cumsum(n_bouts) - n_bouts, n_bouts)
+        durs[rows_idx, bouts_idx] = np.concatenate([bouts.durs for bouts in bouts_ls] + [[]]) / fps
+        # Aggregating stats (bout durations in seconds)
+        stats = nan_stats_arr(durs)
+        summary_df = pd.DataFrame(
+            {
+                "bout_freq": n_bouts.astype(np.float64),
+                "bout_dur_total": np.nansum(durs, axis=1),
+                **{f"bout_dur_{agg}": stats[agg] for agg in QUANTITATIVE_AGGS},
+            },
+            index=analysis_df.columns,
+        )
         summary_df = cls.basic_clean(summary_df)
         return summary_df
 
@@ -167,10 +140,7 @@ class AnalysisBinnedDf(DFMixin):
         # For each column, displays the mean of each binned group.
         timestamps = analysis_df.index.get_level_values("frame") / fps
         # Ensuring all bins are included (start frame and end frame)
-        bins = np.asarray(bins_)
-        bins = np.append(0, bins) if np.min(bins) > 0 else bins
-        t_max = np.max(timestamps)
-        bins = np.append(bins, t_max) if np.max(bins) < t_max else bins
+        bins = cls.get_bin_edges(bins_, np.max(timestamps))
         # Making binned data
         bin_sec = pd.cut(x=timestamps, bins=bins, labels=bins[1:], include_lowest=True)  # type: ignore
         grouped_df = analysis_df.groupby(bin_sec)
@@ -184,6 +154,69 @@ class AnalysisBinnedDf(DFMixin):
         binned_df = cls.basic_clean(binned_df)
         return binned_df
 
+    @classmethod
+    def make_binned_multi(
+        cls,
+        analysis_df: pd.DataFrame,
+        fps: float,
+        bins_dict: dict[str, list],
+        summary_func: Callable[[pd.DataFrame, float], pd.DataFrame],
+        bout_attribution: str = "split",
+    ) -> dict[str, pd.DataFrame]:
+        """
+        Generates the binned data of each bins in `bins_dict` (the same as `make_binned` for each).
+
+        For `AnalysisSummaryDf.agg_quantitative` and `AnalysisSummaryDf.agg_behavs`, all binnings are
+        computed in one pass (refer to `behavysis.utils.binned_utils`), rather than grouping
+        and summarising the df for each binning.
+
+        For `AnalysisSummaryDf.agg_behavs`, bouts that span more than one bin are attributed to the bins
+        by `bout_attribution` (refer to `BoutArray.split_bins`). The default, `"split"`, is the same as
+        `make_binned`.
+        """
+        binned_stats_funcs = {
+            AnalysisSummaryDf.agg_quantitative: (binned_quantitative_stats, QUANTITATIVE_AGGS),
+            AnalysisSummaryDf.agg_behavs: (
+                lambda *args: binned_behavs_stats(*args, fps, bout_attribution),
+                BEHAVS_AGGS,
+            ),
+        }
+        # Other summary functions are binned separately
+        if summary_func not in binned_stats_funcs:
+            return {name: cls.make_binned(analysis_df, fps, bins_, summary_func) for name, bins_ in bins_dict.items()}
+        binned_stats_func, aggs = binned_stats_funcs[summary_func]
+        timestamps = analysis_df.index.get_level_values("frame").to_numpy() / fps
+        # Ensuring all bins are included (start frame and end frame)
+        t_max = np.max(timestamps) if timestamps.shape[0] > 0 else 0
+        edges_ls = [cls.get_bin_edges(bins_, t_max) for bins_ in bins_dict.values()]
+        # Getting each binning's (bins, columns) arrays of each statistic
+        stats_ls = binned_stats_func(analysis_df.to_numpy(), timestamps, edges_ls)
+        binned_dfs = {}
+        for name, edges, stats in zip(bins_dict, edges_ls, stats_ls):
+            # Making binned df (with the same bin_sec labels as `pd.cut`)
+            columns = pd.MultiIndex.from_tuples(
+                [(*col, agg) for col in analysis_df.columns for agg in aggs], names=enum2list(cls.CN)
+            )
+            binned_df = pd.DataFrame(
+                np.stack([stats[agg] for agg in aggs], axis=-1).reshape(len(edges) - 1, -1),
+                index=pd.CategoricalIndex(edges[1:], categories=edges[1:], ordered=True),
+                columns=columns,
+            )
+            # Cleaning (sets index and column names) and checking
+            binned_dfs[name] = cls.basic_clean(binned_df)
+        return binned_dfs
+
+    @staticmethod
+    def get_bin_edges(bins_: list, t_max: float) -> np.ndarray:
+        """
+        Returns the bin edges of the given bins, including 0 and `t_max`
+        (so all frames from the start to the end are binned).
+        """
+        bins = np.asarray(bins_)
+        bins = np.append(0, bins) if np.min(bins) > 0 else bins
+        bins = np.append(bins, t_max) if np.max(bins) < t_max else bins
+        return bins
+
     @classmethod
     def make_binned_plot(
         cls,
@@ -192,7 +225,16 @@ class AnalysisBinnedDf(DFMixin):
         agg_column: str,
     ):
         """
-        _summary_
+        Makes the line plot of the `agg_column` of each bin
+        (rendered with the active `PlotService`).
+        """
+        PlotService.render_active(PlotSpec(cls.binned_plot_fig, dst_fp, binned_df, agg_column))
+
+    @classmethod
+    def binned_plot_fig(cls, binned_df: pd.DataFrame, agg_column: str) -> Figure:
+        """
+        Returns the line plot figure of the `agg_column` of each bin
+        (measures are lines, and individuals are columns).
         """
         # Making binned_df long
         binned_stacked_df = binned_df.stack(enum2tuple(AnalysisSummaryDf.IN))[agg_column].rename("value").reset_index()
@@ -215,10 +257,7 @@ class AnalysisBinnedDf(DFMixin):
         g.set_titles(col_template="{col_name}")
         g.figure.subplots_adjust(top=0.85)
         g.figure.suptitle("Binned data", fontsize=12)
-        # Saving fig
-        os.makedirs(os.path.dirname(dst_fp), exist_ok=True)
-        g.savefig(dst_fp)
-        g.figure.clf()
+        return g.figure
 
     @classmethod
     def summary_binned_quantitative(
@@ -253,6 +292,7 @@ class AnalysisBinnedDf(DFMixin):
         fps: float,
         bins_ls: list,
         cbins_ls: list,
+        bout_attribution: str = "split",
     ) -> str:
         """
         _summary_
@@ -266,6 +306,7 @@ class AnalysisBinnedDf(DFMixin):
             agg_column="bout_dur_total",
             bins_ls=bins_ls,
             cbins_ls=cbins_ls,
+            bout_attribution=bout_attribution,
         )
 
     @classmethod
@@ -279,48 +320,121 @@ class AnalysisBinnedDf(DFMixin):
         agg_column: str,
         bins_ls: list,
         cbins_ls: list,
+        bout_attribution: str = "split",
     ) -> str:
         """
         _summary_
         """
+        return cls.summary_binned_multi(
+            analysis_dfs={dst_dir: analysis_df},
+            name=name,
+            fps=fps,
+            summary_func=summary_func,
+            agg_column=agg_column,
+            bins_ls=bins_ls,
+            cbins_ls=cbins_ls,
+            bout_attribution=bout_attribution,
+        )
+
+    @classmethod
+    def summary_binned_multi(
+        cls,
+        analysis_dfs: dict[str, pd.DataFrame],
+        name: str,
+        fps: float,
+        summary_func: Callable[[pd.DataFrame, float], pd.DataFrame],
+        agg_column: str,
+        bins_ls: list,
+        cbins_ls: list,
+        bout_attribution: str = "split",
+    ) -> str:
+        """
+        Summarises and bins many analysis dfs (of the same frames) at once.
+
+        The analysis dfs are concatenated into one wide df, so the summary and each binning
+        are computed once for all of them.
+        Each analysis df's summary and binned files are then written to its dst_dir
+        (the keys of `analysis_dfs`), and are the same as `summary_binned` for each analysis df.
+        """
         outcome = ""
+        measures_name = AnalysisDf.CN.MEASURES.value
+        # Concatenating analysis dfs into one wide df.
+        # Measures are renamed to "<df number>:<measure>" keys, so the same measure names
+        # in different analysis dfs are kept separate.
+        wide_df_ls = []
+        measures_ls = []
+        for i, analysis_df in enumerate(analysis_dfs.values()):
+            measures = {f"{i}:{measure}": measure for measure in analysis_df.columns.unique(measures_name)}
+            wide_df_ls.append(
+                analysis_df.rename(columns={v: k for k, v in measures.items()}, level=measures_name)  # type: ignore
+            )
+            measures_ls.append(measures)
+        wide_df = pd.concat(wide_df_ls, axis=1)
         # Offsetting the frames index to start from 0
         # (i.e. when the experiment commenced, rather than when the recording started)
-        index_df = analysis_df.index.to_frame(index=False)
+        index_df = wide_df.index.to_frame(index=False)
         frame_name = AnalysisDf.IN.FRAME.value
         index_df[frame_name] = index_df[frame_name] - index_df[frame_name].iloc[0]
-        analysis_df.index = pd.MultiIndex.from_frame(index_df)
-        # Summarising analysis_df
-        summary_fp = os.path.join(dst_dir, SUMMARY, f"{name}.{cls.IO}")
-        summary_csv_fp = os.path.join(dst_dir, f"{SUMMARY}_csv", f"{name}.csv")
-        summary_df = summary_func(analysis_df, fps)
-        AnalysisSummaryDf.write(summary_df, summary_fp)
-        AnalysisSummaryDf.write_csv(summary_df, summary_csv_fp)
+        wide_df.index = pd.MultiIndex.from_frame(index_df)
         # Getting timestamps index
-        timestamps = analysis_df.index.get_level_values(AnalysisDf.IN.FRAME.value) / fps
-        # Binning analysis_df
+        timestamps = wide_df.index.get_level_values(frame_name) / fps
+        # Summarising wide_df
+        summary_df = summary_func(wide_df, fps)
+        # Binning (and custom binning) wide_df, all at once
+        bins_dict = {}
         for bin_sec in bins_ls:
-            # Making filepaths
-            binned_fp = os.path.join(dst_dir, f"{BINNED}_{bin_sec}", f"{name}.{cls.IO}")
-            binned_csv_fp = os.path.join(dst_dir, f"{BINNED}_{bin_sec}_csv", f"{name}.csv")
-            binned_plot_fp = os.path.join(dst_dir, f"{BINNED}_{bin_sec}_{PLOT}", f"{name}.png")
-            # Making binned df
-            bins = np.arange(0, np.max(timestamps) + bin_sec, bin_sec)
-            binned_df = cls.make_binned(analysis_df, fps, bins, summary_func)
-            cls.write(binned_df, binned_fp)
-            cls.write_csv(binned_df, binned_csv_fp)
-            # Making binned plots
-            cls.make_binned_plot(binned_df, binned_plot_fp, agg_column)
-        # Custom binning analysis_df
+            bins_dict[f"{BINNED}_{bin_sec}"] = np.arange(0, np.max(timestamps) + bin_sec, bin_sec)
         if cbins_ls:
-            # Making filepaths
-            binned_fp = os.path.join(dst_dir, f"{BINNED}_{CUSTOM}", f"{name}.{cls.IO}")
-            binned_csv_fp = os.path.join(dst_dir, f"{BINNED}_{CUSTOM}_csv", f"{name}.csv")
-            binned_plot_fp = os.path.join(dst_dir, f"{BINNED}_{CUSTOM}_{PLOT}", f"{name}.png")
-            # Making binned df
-            binned_df = cls.make_binned(analysis_df, fps, cbins_ls, summary_func)
-            cls.write(binned_df, binned_fp)
-            cls.write_csv(binned_df, binned_csv_fp)
-            # Making binned plots
-            cls.make_binned_plot(binned_df, binned_plot_fp, agg_column)
+            bins_dict[f"{BINNED}_{CUSTOM}"] = cbins_ls
+        binned_dfs = cls.make_binned_multi(wide_df, fps, bins_dict, summary_func, bout_attribution)
+        # Writing each analysis df's summary and binned dfs
+        for dst_dir, measures in zip(analysis_dfs, measures_ls):
+            # Summary
+            summary_fp = os.path.join(dst_dir, SUMMARY, f"{name}.{cls.IO}")
+            summary_csv_fp = os.path.join(dst_dir, f"{SUMMARY}_csv", f"{name}.csv")
+            summary_i_df = AnalysisSummaryDf.basic_clean(select_measures(summary_df, measures, measures_name, axis=0))
+            AnalysisSummaryDf.write(summary_i_df, summary_fp)
+            AnalysisSummaryDf.write_csv(summary_i_df, summary_csv_fp)
+            # Binned (and binned plots)
+            for binned_name, binned_df in binned_dfs.items():
+                binned_fp = os.path.join(dst_dir, binned_name, f"{name}.{cls.IO}")
+                binned_csv_fp = os.path.join(dst_dir, f"{binned_name}_csv", f"{name}.csv")
+                binned_plot_fp = os.path.join(dst_dir, f"{binned_name}_{PLOT}", f"{name}.png")
+                binned_i_df = cls.basic_clean(select_measures(binned_df, measures, measures_name, axis=1))
+                cls.write(binned_i_df, binned_fp)
+                cls.write_csv(binned_i_df, binned_csv_fp)
+                cls.make_binned_plot(binned_i_df, binned_plot_fp, agg_column)
         return outcome
+
+
+def nan_stats_arr(arr: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Returns the mean, std, min, Q1, median, Q3, and max of each row of the `(rows, n)` array (n >= 1),
+    ignoring NaN values (the same as `np.nanmean`, `np.nanstd`, `np.nanmin`, `np.nanquantile`, `np.nanmedian`,
+    and `np.nanmax` of each row). Rows with only NaN values have NaN statistics.
+
+    The order statistics are taken from one sort of the rows (NaN values are sorted to the end).
+    """
+    n_rows, n_cols = arr.shape
+    counts = np.sum(~np.isnan(arr), axis=1)
+    sorted_arr = np.sort(arr, axis=1)
+    order_stats = sorted_order_stats(sorted_arr.ravel(), np.arange(n_rows) * n_cols, counts)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        stats = {"mean": np.nanmean(arr, axis=1), "std": np.nanstd(arr, axis=1), **order_stats}
+    return {agg: stats[agg] for agg in QUANTITATIVE_AGGS}
+
+
+def select_measures(df: pd.DataFrame, measures: dict[str, str], level: str, axis: int) -> pd.DataFrame:
+    """
+    Selects the `measures` keys in the given level of the df's index (`axis=0`) or columns (`axis=1`),
+    and renames them to their values.
+    """
+    labels = df.axes[axis]
+    is_selected = labels.get_level_values(level).isin(list(measures))
+    df = df.loc[is_selected] if axis == 0 else df.loc[:, is_selected]
+    # Remaking the (selected) labels with the renamed measures
+    labels = df.axes[axis]
+    arrays = [labels.get_level_values(i) for i in range(labels.nlevels)]
+    arrays[labels.names.index(level)] = arrays[labels.names.index(level)].map(measures)
+    return df.set_axis(pd.MultiIndex.from_arrays(arrays, names=labels.names), axis=axis)
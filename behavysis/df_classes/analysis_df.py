@@ -1,13 +1,14 @@
-import os
 from enum import Enum
 
 import numpy as np
 import pandas as pd
 import seaborn as sns
 from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
 
 from behavysis.df_classes.keypoints_df import CoordsCols, FramesIN
 from behavysis.utils.df_mixin import DFMixin
+from behavysis.utils.plot_service import PlotService, PlotSpec
 
 FBF = "fbf"
 
@@ -34,6 +35,16 @@ class AnalysisDf(DFMixin):
         """
         Expects analysis_df index levels to be (frame,),
         and column levels to be (individual, measure).
+
+        The plot is rendered with the active `PlotService`.
+        """
+        PlotService.render_active(PlotSpec(cls.location_scatterplot_fig, dst_fp, scatter_df, corners_df))
+
+    @classmethod
+    def location_scatterplot_fig(cls, scatter_df: pd.DataFrame, corners_df: pd.DataFrame) -> Figure:
+        """
+        Returns the scatter plot figure of each individual's locations (coloured by each ROI measure),
+        with the ROI polygons. Rows are ROIs and columns are individuals.
         """
         # Getting list of individuals and measures
         indivs_ls = scatter_df.columns.unique(cls.CN.INDIVIDUALS.value)
@@ -88,7 +99,4 @@ class AnalysisDf(DFMixin):
                 ax.set_title(f"{roi} - {indiv}")
                 ax.set_aspect("equal")
                 ax.invert_yaxis()
-        # Saving fig
-        os.makedirs(os.path.dirname(dst_fp), exist_ok=True)
-        fig.savefig(dst_fp)
-        fig.clf()
+        return fig
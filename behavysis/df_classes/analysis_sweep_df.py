@@ -0,0 +1,15 @@
+from behavysis.utils.df_mixin import DFMixin
+
+
+class AnalysisSweepDf(DFMixin):
+    """
+    Tidy (long) table of the summary measures of each analysis parameter combination.
+
+    Each row is one summary statistic (`aggs` and `value` columns) of one parameter combination
+    (a column for each swept parameter), `analysis`, `individuals`, and `measures`.
+    Collated tables also have an `experiment` column.
+    """
+
+    NULLABLE = True
+    IN = None
+    CN = None
@@ -7,10 +7,10 @@ from enum import Enum
 import numpy as np
 import pandas as pd
 from scipy import ndimage
-from scipy.stats import mode
 
 from behavysis.df_classes.keypoints_df import FramesIN
 from behavysis.pydantic_models.bouts import Bout, Bouts, BoutStruct
+from behavysis.utils.bout_array import BoutArray
 from behavysis.utils.df_mixin import DFMixin
 from behavysis.utils.misc_utils import enum2tuple
 
@@ -234,12 +234,10 @@ class BehavScoredDf(BehavDf):
             # NOTE: Also safe for multi-index. Assumes using "frame" level
             offset = vect.index.get_level_values(cls.IN.FRAME.value)[0]
         # Getting stop and start indexes of each bout
-        z = np.concatenate(([0], vect, [0]))
-        start = np.flatnonzero(~z[:-1] & z[1:])
-        stop = np.flatnonzero(z[:-1] & ~z[1:]) - 1
+        bouts = BoutArray.from_vect(vect.to_numpy())
         # Making dataframe
-        bouts_df = pd.DataFrame({BoutCols.START.value: start, BoutCols.STOP.value: stop}) + offset
-        bouts_df[BoutCols.DUR.value] = bouts_df[BoutCols.STOP.value] - bouts_df[BoutCols.START.value] + 1
+        bouts_df = pd.DataFrame({BoutCols.START.value: bouts.starts, BoutCols.STOP.value: bouts.stops}) + offset
+        bouts_df[BoutCols.DUR.value] = bouts.durs
         return bouts_df
 
     @classmethod
@@ -249,29 +247,30 @@ class BehavScoredDf(BehavDf):
         """
         # Getting bouts_ls
         bouts_ls = []
+        offset = df.index.get_level_values(cls.IN.FRAME.value)[0] if df.shape[0] > 0 else 0
         # For each behaviour
         for behav in df.columns.unique(cls.CN.BEHAVS.value):
             behav_df = df[behav]
             # Getting start-stop of each bout
-            bouts_df = cls.vect2bouts_df(behav_df[cls.OutcomesCols.PRED.value] == BehavValues.BEHAV.value)
-            # For each bout (i.e. start-stop pair)
-            for _, row in bouts_df.iterrows():
-                # Getting only the frames in the current bout
-                bout_frames_df = behav_df.loc[row[BoutCols.START.value] : row[BoutCols.STOP.value]]
-                # Making bout object
+            bouts = BoutArray.from_vect(behav_df[cls.OutcomesCols.PRED.value] == BehavValues.BEHAV.value)
+            # Getting the mode of the actual and user_defined values in each bout
+            # (using mode as proxy for the entire bout's value)
+            actual_modes = bouts.get_modes(behav_df[cls.OutcomesCols.ACTUAL.value])
+            user_defined_modes = {
+                str(outcome): bouts.get_modes(values)
+                for outcome, values in behav_df.items()
+                if outcome not in enum2tuple(cls.OutcomesCols)
+            }
+            # For each bout (i.e. start-stop pair), making bout object
+            for i in range(len(bouts)):
                 bout = Bout(
-                    start=row[BoutCols.START.value],
-                    stop=row[BoutCols.STOP.value],
-                    dur=row[BoutCols.DUR.value],
+                    start=int(bouts.starts[i] + offset),
+                    stop=int(bouts.stops[i] + offset),
+                    dur=int(bouts.durs[i]),
                     behav=behav,
-                    actual=int(mode(bout_frames_df[cls.OutcomesCols.ACTUAL.value]).mode),
-                    user_defined={},
+                    actual=int(actual_modes[i]),
+                    user_defined={outcome: int(modes[i]) for outcome, modes in user_defined_modes.items()},
                 )
-                # Storing user_defined column names in bout object
-                for outcome, values in bout_frames_df.items():
-                    if outcome not in enum2tuple(cls.OutcomesCols):
-                        # Using mode as proxy for the entire bout's user_defined value
-                        bout.user_defined[str(outcome)] = int(mode(values).mode)
                 bouts_ls.append(bout)
         return Bouts(
             start=df.index.get_level_values(cls.IN.FRAME.value)[0],
@@ -26,6 +26,11 @@ class IndivCols(Enum):
     PROCESSED = "processed"  # TODO: remove this
 
 
+class FlagCols(Enum):
+    # Coords value of the per-bodypart flag columns under the `processed` individual
+    GAP = "gap"
+
+
 class KeypointsCN(Enum):
     SCORER = "scorer"
     INDIVIDUALS = "individuals"
@@ -34,6 +39,16 @@ class KeypointsCN(Enum):
 
 
 class KeypointsDf(DFMixin):
+    """
+    Keypoints df. The columns are (scorer, individuals, bodyparts, coords).
+
+    Animal and `single` individuals have the `CoordsCols` coords (x, y, and likelihood).
+    The `processed` individual has flag columns, `(scorer, "processed", "<indiv>_<bpt>", <FlagCols>)`.
+    For example, `Preprocess.interpolate` (with `flag_gaps`) adds a `gap` column for each bodypart,
+    which is 1 for the frames left unfilled. Use `get_indivs_bpts` to get the animal individuals
+    and bodyparts (without the `processed` individual).
+    """
+
     NULLABLE = False
     IN = FramesIN
     CN = KeypointsCN
@@ -93,6 +108,17 @@ class KeypointsDf(DFMixin):
         bpts = columns.unique("bodyparts").to_list()
         return indivs, bpts
 
+    @classmethod
+    def check_df(cls, df: pd.DataFrame) -> None:
+        """
+        Same as `DFMixin.check_df`, except the x and y coords can be null
+        (for gaps longer than the interpolate `max_gap_frames`).
+        """
+        if cls.CN.COORDS.value in df.columns.names:
+            coords = df.columns.get_level_values(cls.CN.COORDS.value)
+            df = df.loc[:, ~np.isin(coords, [CoordsCols.X.value, CoordsCols.Y.value])]
+        super().check_df(df)
+
     @classmethod
     def clean_headings(cls, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -122,6 +148,21 @@ class KeypointsDf(DFMixin):
         df.columns = pd.MultiIndex.from_frame(columns)
         return df
 
+    @classmethod
+    def write_quantised(cls, df: pd.DataFrame, fp: str, precision_px: float) -> None:
+        """
+        Writes the keypoints df to a (parquet) file with the x and y coordinates quantised to
+        `precision_px` and delta-encoded, and likelihoods quantised to 8 bits.
+        Refer to `behavysis.utils.quantised_codec` for details.
+
+        The file is decoded transparently by `KeypointsDf.read`, with a maximum error of
+        `precision_px / 2` for coordinates and `1 / 510` for likelihoods.
+        """
+        coords = df.columns.get_level_values(cls.CN.COORDS.value)
+        delta_cols = df.columns[np.isin(coords, [CoordsCols.X.value, CoordsCols.Y.value])]
+        unit_cols = df.columns[coords == CoordsCols.LIKELIHOOD.value]
+        cls.write_parquet_quantised(df, fp, delta_cols, precision_px, unit_cols)
+
     @classmethod
     def resolution_scale_df(cls, df: pd.DataFrame, width_x_scale: float, height_y_scale: float) -> pd.DataFrame:
         scaled_df = cls.basic_clean(df)
@@ -165,10 +206,11 @@ class KeypointsAnnotationsDf(DFMixin):
         )
         df = df.loc[:, columns]
         # Rounding and converting to correct dtypes - "x" and "y" values are ints
+        # (unfilled gaps are NaN, so imputing with 0)
         xy_columns = df.columns[
             df.columns.get_level_values(KeypointsDf.CN.COORDS.value).isin([CoordsCols.X.value, CoordsCols.Y.value])
         ]
-        df[xy_columns] = df[xy_columns].round(0).astype(int)
+        df[xy_columns] = df[xy_columns].fillna(0).round(0).astype(int)
         # Changing the columns MultiIndex to a single-level index. For speedup
         df.columns = [f"{indiv}_{bpt}_{coord}" for scorer, indiv, bpt, coord in df.columns]
         return cls.basic_clean(df)
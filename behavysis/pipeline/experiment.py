@@ -10,9 +10,13 @@ import numpy as np
 
 from behavysis.constants import (
     ANALYSIS_DIR,
+    ANALYSIS_SWEEP_DIR,
+    PREVIEW_DIR,
     FileExts,
     Folders,
 )
+from behavysis.df_classes.analysis_sweep_df import AnalysisSweepDf
+from behavysis.processes.analyse import Analyse, is_analysis
 from behavysis.processes.analyse_behavs import AnalyseBehavs
 from behavysis.processes.classify_behavs import ClassifyBehavs
 from behavysis.processes.combine_analysis import CombineAnalysis
@@ -23,6 +27,8 @@ from behavysis.processes.format_vid import FormatVid
 from behavysis.processes.run_dlc import RunDLC
 from behavysis.processes.update_configs import UpdateConfigs
 from behavysis.pydantic_models.experiment_configs import AutoConfigs, ExperimentConfigs
+from behavysis.utils.configs_session import ConfigsSession
+from behavysis.utils.experiment_context import ExperimentContext
 from behavysis.utils.logging_utils import get_io_obj_content, init_logger_file, init_logger_io_obj
 
 
@@ -146,30 +152,92 @@ class Experiment:
         ```
         func(*args, **kwargs)
         ```
+        The funcs are run in a shared `ExperimentContext`, so the experiment's files
+        (e.g. keypoints, configs, features, and video metadata) are loaded once across the funcs.
+        Files a func writes are reloaded by the next func.
         """
         f_names_ls_msg = "".join([f"\n    - {f.__name__}" for f in funcs])
         self.logger.info(f"Processing experiment, {self.name}, with:{f_names_ls_msg}")
         # Setting up diagnostics dict
         dd = {"experiment": self.name}
         # Running functions and saving outcome to diagnostics dict
-        for f in funcs:
-            f_name = f.__name__
-            # Getting logger and corresponding io object
-            f_logger, f_io_obj = init_logger_io_obj(f_name)
-            # Running each func and saving outcome
-            try:
-                f(*args, **kwargs)
-                # f_logger.info(success_msg())
-            except Exception as e:
-                f_logger.error(e)
-                self.logger.debug(traceback.format_exc())
-            # Adding to diagnostics dict
-            dd[f_name] = get_io_obj_content(f_io_obj)
-            # Clearing io object
-            f_io_obj.truncate(0)
+        # (sharing the loaded files between functions)
+        with ExperimentContext():
+            for f in funcs:
+                f_name = f.__name__
+                # Getting logger and corresponding io object
+                f_logger, f_io_obj = init_logger_io_obj(f_name)
+                # Running each func and saving outcome
+                try:
+                    f(*args, **kwargs)
+                    # f_logger.info(success_msg())
+                except Exception as e:
+                    f_logger.error(e)
+                    self.logger.debug(traceback.format_exc())
+                # Adding to diagnostics dict
+                dd[f_name] = get_io_obj_content(f_io_obj)
+                # Clearing io object
+                f_io_obj.truncate(0)
         self.logger.info(f"Finished processing experiment, {self.name}, with:{f_names_ls_msg}")
         return dd
 
+    #####################################################################
+    #                          PREVIEW METHODS
+    #####################################################################
+
+    def make_preview(self, preview_sec: float = 120, offset_sec: float = 0, overwrite: bool = True) -> dict:
+        """
+        Makes a preview of the experiment in the project's preview folder, with the keypoints
+        truncated to `preview_sec` seconds from `offset_sec` seconds after `start_frame`.
+
+        The pipeline (e.g. `preprocess`, `extract_features`, `classify_behavs`, and `analyse`) can
+        then be run on the preview experiment (from `get_preview`) to get results quickly
+        (e.g. to tune the configs), without changing the experiment's outputs.
+        The preview uses the experiment's auto configs (i.e. `calculate_parameters` does not need to be rerun).
+
+        Parameters
+        ----------
+        preview_sec : float
+            The duration of the preview (in seconds).
+        offset_sec : float
+            The start of the preview (in seconds after `start_frame`).
+        overwrite : bool
+            Whether to overwrite the preview (if it exists).
+
+        Returns
+        -------
+        dict
+            Diagnostics dictionary, with description of each function's outcome.
+
+        Notes
+        -----
+        Refer to `Export.experiment2preview`.
+        """
+        return self._proc_scaff(
+            (Export.experiment2preview,),
+            keypoints_fp=self.get_fp(Folders.KEYPOINTS),
+            configs_fp=self.get_fp(Folders.CONFIGS),
+            formatted_vid_fp=self.get_fp(Folders.FORMATTED_VID),
+            preview_dir=os.path.join(self.root_dir, PREVIEW_DIR),
+            preview_sec=preview_sec,
+            offset_sec=offset_sec,
+            overwrite=overwrite,
+        )
+
+    def get_preview(self) -> "Experiment":
+        """
+        Returns the preview experiment (made with `make_preview`).
+
+        Raises
+        ------
+        ValueError
+            The preview has not been made.
+        """
+        preview_dir = os.path.join(self.root_dir, PREVIEW_DIR)
+        if not os.path.isdir(preview_dir):
+            raise ValueError(f'The preview of "{self.name}" has not been made. Run `make_preview` first.')
+        return Experiment(self.name, preview_dir)
+
     #####################################################################
     #                        CONFIG FILE METHODS
     #####################################################################
@@ -308,12 +376,15 @@ class Experiment:
         Notes
         -----
         Can call any methods from `CalculateParams`.
-        """
-        return self._proc_scaff(
-            funcs,
-            keypoints_fp=self.get_fp(Folders.KEYPOINTS),
-            configs_fp=self.get_fp(Folders.CONFIGS),
-        )
+        The configs file is read once, and the funcs' updates are written once
+        (atomically) after all funcs have run.
+        """
+        with ConfigsSession(self.get_fp(Folders.CONFIGS)):
+            return self._proc_scaff(
+                funcs,
+                keypoints_fp=self.get_fp(Folders.KEYPOINTS),
+                configs_fp=self.get_fp(Folders.CONFIGS),
+            )
 
     def collate_auto_configs(self) -> Dict:
         """
@@ -363,13 +434,22 @@ class Experiment:
         Notes
         -----
         Can call any methods from `Preprocess`.
-        """
+        If `user.preprocess.chunk_frames` is set in the configs, the keypoints are streamed
+        in chunks of that many frames (refer to `Preprocess`).
+        """
+        # Getting the chunk size to stream the keypoints in (None is in-memory)
+        configs_fp = self.get_fp(Folders.CONFIGS)
+        chunk_frames = None
+        if os.path.isfile(configs_fp):
+            configs = ExperimentConfigs.read_json(configs_fp)
+            chunk_frames = configs.get_ref(configs.user.preprocess.chunk_frames)
         # Exporting keypoints df to preprocessed folder
         dd0 = self._proc_scaff(
             (Export.df2df,),
             src_fp=self.get_fp(Folders.KEYPOINTS),
             dst_fp=self.get_fp(Folders.PREPROCESSED),
             overwrite=overwrite,
+            chunk_frames=chunk_frames,
         )
         # If there is an error or warning (indicates not to ovewrite) in logger, return early
         if "ERROR" in dd0[Export.df2df.__name__] or "WARNING" in dd0[Export.df2df.__name__]:
@@ -416,6 +496,8 @@ class Experiment:
         """
         Given model config files in the BehavClassifier format, generates beahviour predidctions
         on the given extracted features dataframe.
+        The rule behaviours in the configs (`user.rule_behavs`) are detected from the preprocessed
+        keypoints (without the extracted features or a classifier).
 
         Parameters
         ----------
@@ -433,6 +515,7 @@ class Experiment:
             behavs_fp=self.get_fp(Folders.PREDICTED_BEHAVS),
             configs_fp=self.get_fp(Folders.CONFIGS),
             overwrite=overwrite,
+            keypoints_fp=self.get_fp(Folders.PREPROCESSED),
         )
 
     def export_behavs(self, overwrite: bool) -> dict:
@@ -481,12 +564,73 @@ class Experiment:
         Notes
         -----
         Can call any methods from `Analyse`.
+        The `Analyse` analyses (e.g. `Analyse.in_roi` and `Analyse.speed`) are run together
+        in a single pass with `analyse_all` (so their outcomes are under `analyse_all`
+        in the diagnostics dict). Other funcs are run one at a time.
+        """
+        # Running the analyses in a single pass
+        analyses = tuple(f for f in funcs if is_analysis(f))
+        dd = self.analyse_all(analyses) if len(analyses) > 0 else {"experiment": self.name}
+        # Running the other funcs
+        other_funcs = tuple(f for f in funcs if not is_analysis(f))
+        if len(other_funcs) > 0:
+            dd.update(
+                self._proc_scaff(
+                    other_funcs,
+                    keypoints_fp=self.get_fp(Folders.PREPROCESSED),
+                    dst_dir=os.path.join(self.root_dir, ANALYSIS_DIR),
+                    configs_fp=self.get_fp(Folders.CONFIGS),
+                )
+            )
+        return dd
+
+    def analyse_all(self, funcs: None | tuple[Callable, ...] = None) -> dict:
+        """
+        Runs the given `Analyse` funcs (or all of them if `funcs` is None) in a single pass
+        with `Analyse.analyse_all`.
+        The outputs are the same as `analyse`, but the keypoints are loaded once, and the summary
+        and binned aggregations are computed once over all of the analyses.
+
+        Parameters
+        ----------
+        funcs : None | tuple[Callable, ...]
+            The `Analyse` funcs to run (e.g. `(Analyse.in_roi, Analyse.speed)`).
+
+        Returns
+        -------
+        dict
+            Diagnostics dictionary, with description of each function's outcome.
         """
         return self._proc_scaff(
-            funcs,
+            (Analyse.analyse_all,),
             keypoints_fp=self.get_fp(Folders.PREPROCESSED),
             dst_dir=os.path.join(self.root_dir, ANALYSIS_DIR),
             configs_fp=self.get_fp(Folders.CONFIGS),
+            funcs=funcs,
+        )
+
+    def analyse_sweep(self, param_grid: dict[str, list[Any]]) -> dict:
+        """
+        Summarises the analyses for every combination of the parameter grid with `Analyse.analyse_sweep`
+        (e.g. to choose thresholds), without changing the configs file.
+        The tidy table is saved to the project's analysis sweep folder.
+
+        Parameters
+        ----------
+        param_grid : dict[str, list[Any]]
+            The values of each parameter (paths in `configs.user.analyse`, e.g. `"freezing.thresh_mm"`).
+
+        Returns
+        -------
+        dict
+            Diagnostics dictionary, with description of each function's outcome.
+        """
+        return self._proc_scaff(
+            (Analyse.analyse_sweep,),
+            keypoints_fp=self.get_fp(Folders.PREPROCESSED),
+            dst_fp=os.path.join(self.root_dir, ANALYSIS_SWEEP_DIR, f"{self.name}.{AnalysisSweepDf.IO}"),
+            configs_fp=self.get_fp(Folders.CONFIGS),
+            param_grid=param_grid,
         )
 
     def analyse_behavs(self) -> dict:
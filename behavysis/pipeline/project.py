@@ -12,17 +12,23 @@ import numpy as np
 import pandas as pd
 import seaborn as sns
 from dask.distributed import LocalCluster
+from matplotlib.figure import Figure
 from natsort import natsorted
 
+from behavysis.behav_classifier.behav_classifier import BehavClassifier
 from behavysis.constants import (
     ANALYSIS_DIR,
+    ANALYSIS_SWEEP_DIR,
     DIAGNOSTICS_DIR,
+    PREVIEW_DIR,
     Folders,
 )
 from behavysis.df_classes.analysis_agg_df import AnalysisBinnedDf, AnalysisSummaryDf
 from behavysis.df_classes.analysis_collated_df import AnalysisBinnedCollatedDf, AnalysisSummaryCollatedDf
+from behavysis.df_classes.analysis_sweep_df import AnalysisSweepDf
 from behavysis.df_classes.diagnostics_df import DiagnosticsDf
 from behavysis.pipeline.experiment import Experiment
+from behavysis.processes.calculate_params import read_start_times_csv
 from behavysis.processes.run_dlc import RunDLC
 from behavysis.pydantic_models.experiment_configs import (
     ExperimentConfigs,
@@ -31,6 +37,8 @@ from behavysis.utils.dask_utils import cluster_process
 from behavysis.utils.io_utils import get_name
 from behavysis.utils.logging_utils import init_logger_file
 from behavysis.utils.multiproc_utils import get_gpu_ids
+from behavysis.utils.plot_service import PlotService, PlotSpec
+from behavysis.utils.resource_cache import ResourceCache
 
 
 class Project:
@@ -136,11 +144,18 @@ class Project:
         exp is a Experiment instance
         method(exp, *args, **kwargs)
         ```
+        The shared resources loaded in this process (refer to `load_resources`)
+        are broadcast to the workers once, rather than parsed by each experiment's task.
         """
         # Starting a dask cluster
-        with cluster_process(LocalCluster(n_workers=self.nprocs, threads_per_worker=1)):
+        with cluster_process(LocalCluster(n_workers=self.nprocs, threads_per_worker=1)) as client:
+            # Broadcasting the shared resources to all workers (as a single object)
+            [resources] = client.scatter([ResourceCache.get_entries()], broadcast=True)
             # Preparing all experiments for execution
-            f_d_ls = [dask.delayed(method)(exp, *args, **kwargs) for exp in self.experiments]  # type: ignore
+            f_d_ls = [
+                dask.delayed(ResourceCache.run_with_entries)(resources, method, exp, *args, **kwargs)  # type: ignore
+                for exp in self.experiments
+            ]
             # Executing in parallel
             dd_ls = list(dask.compute(*f_d_ls))  # type: ignore
         return dd_ls
@@ -179,8 +194,9 @@ class Project:
         # Running the scaffold function
         # Starting
         self.logger.info(f"Running {method.__name__} for all experiments.")
-        # Running
-        dd_ls = scaffold_func(method, *args, **kwargs)
+        # Running (plots made in this process are rendered in the background)
+        with PlotService():
+            dd_ls = scaffold_func(method, *args, **kwargs)
         if len(dd_ls) > 0:
             # Processing all experiments
             df = DiagnosticsDf.init_from_dd_ls(dd_ls)
@@ -189,6 +205,40 @@ class Project:
             # Finishing
             self.logger.info(f"Finished running {method.__name__} for all experiments")
 
+    def load_resources(self, start_times: bool = False, behav_models: bool = False) -> None:
+        """
+        Loads the shared files referenced in the experiments' configs into the `ResourceCache`,
+        so each file is parsed once for the project (rather than once per experiment).
+        Must be called within a `ResourceCache.session()` (otherwise nothing is cached).
+
+        Only the shared files that the step needs are loaded:
+        - `start_times`: the start times csv (`user.calculate_params.start_frame_from_csv.csv_fp`).
+        - `behav_models`: the fitted behaviour classifier models (`user.classify_behavs`).
+
+        Files that are missing or have invalid configs are skipped
+        (the error is reported by the experiment's process).
+        """
+        for exp in self.experiments:
+            try:
+                configs = ExperimentConfigs.read_json(exp.get_fp(Folders.CONFIGS))
+            except (FileNotFoundError, ValueError):
+                continue
+            # Start times csv
+            if start_times:
+                csv_fp = configs.get_ref(configs.user.calculate_params.start_frame_from_csv.csv_fp)
+                if isinstance(csv_fp, str) and os.path.isfile(csv_fp):
+                    read_start_times_csv(csv_fp)
+            # Behaviour classifier models
+            if behav_models:
+                for model_configs in configs.user.classify_behavs:
+                    try:
+                        BehavClassifier.load(
+                            configs.get_ref(model_configs.proj_dir),
+                            configs.get_ref(model_configs.behav_name),
+                        ).load_inference_models()
+                    except (FileNotFoundError, ValueError) as e:
+                        self.logger.debug(f"Could not load shared behaviour classifier: {e}")
+
     #####################################################################
     #               IMPORT EXPERIMENTS METHODS
     #####################################################################
@@ -254,6 +304,31 @@ class Project:
         # Saving the diagnostics DataFrame
         DiagnosticsDf.write(dd_df, os.path.join(self.root_dir, DIAGNOSTICS_DIR, "import_experiments.csv"))
 
+    #####################################################################
+    #                          PREVIEW METHODS
+    #####################################################################
+
+    def make_preview(self, preview_sec: float = 120, offset_sec: float = 0, overwrite: bool = True) -> "Project":
+        """
+        Makes a preview of each experiment in the project's preview folder (refer to `Experiment.make_preview`),
+        and returns the preview project (with the preview experiments imported).
+
+        The pipeline can be run on the preview project in the same way as the project
+        (e.g. to tune the configs), without changing the project's outputs.
+
+        Example
+        -------
+        >>> preview_proj = proj.make_preview(preview_sec=120)
+        >>> preview_proj.preprocess(funcs, overwrite=True)
+        >>> preview_proj.analyse_all()
+        """
+        self._proc_scaff(Experiment.make_preview, preview_sec, offset_sec, overwrite)
+        os.makedirs(os.path.join(self.root_dir, PREVIEW_DIR), exist_ok=True)
+        preview_proj = Project(os.path.join(self.root_dir, PREVIEW_DIR))
+        preview_proj.nprocs = self.nprocs
+        preview_proj.import_experiments()
+        return preview_proj
+
     #####################################################################
     #         BATCH PROCESSING WRAPPING EXPERIMENT METHODS
     #####################################################################
@@ -306,7 +381,9 @@ class Project:
             list(dask.compute(*f_d_ls))  # type: ignore
 
     def calculate_parameters(self, funcs: tuple[Callable, ...]) -> None:
-        self._proc_scaff(Experiment.calculate_parameters, funcs)
+        with ResourceCache.session():
+            self.load_resources(start_times=True)
+            self._proc_scaff(Experiment.calculate_parameters, funcs)
 
     def collate_auto_configs(self) -> None:
         # Saving the auto fields of the configs of all experiments in the diagnostics folder
@@ -316,16 +393,8 @@ class Project:
         # Making and saving histogram plots of the numerical auto fields
         # NOTE: NOT including string frequencies, only numerical
         auto_configs_df = auto_configs_df.loc[:, auto_configs_df.apply(pd.api.types.is_numeric_dtype)]
-        g = sns.FacetGrid(
-            data=auto_configs_df.fillna(-1).melt(var_name="measure", value_name="value"),
-            col="measure",
-            sharex=False,
-            col_wrap=4,
-        )
-        g.map(sns.histplot, "value", bins=10)
-        g.set_titles("{col_name}")
-        g.savefig(os.path.join(self.root_dir, DIAGNOSTICS_DIR, "collate_auto_configs.png"))
-        g.figure.clf()
+        dst_fp = os.path.join(self.root_dir, DIAGNOSTICS_DIR, "collate_auto_configs.png")
+        PlotService.render_active(PlotSpec(auto_configs_plot_fig, dst_fp, auto_configs_df))
 
     def preprocess(self, funcs: tuple[Callable, ...], overwrite: bool) -> None:
         self._proc_scaff(Experiment.preprocess, funcs, overwrite)
@@ -337,7 +406,9 @@ class Project:
         # TODO: IO error with multiprocessing. Using single processing for now.
         nprocs = self.nprocs
         self.nprocs = 1
-        self._proc_scaff(Experiment.classify_behavs, overwrite)
+        with ResourceCache.session():
+            self.load_resources(behav_models=True)
+            self._proc_scaff(Experiment.classify_behavs, overwrite)
         self.nprocs = nprocs
 
     def export_behavs(self, overwrite: bool) -> None:
@@ -346,6 +417,30 @@ class Project:
     def analyse(self, funcs: tuple[Callable, ...]) -> None:
         self._proc_scaff(Experiment.analyse, funcs)
 
+    def analyse_all(self, funcs: None | tuple[Callable, ...] = None) -> None:
+        self._proc_scaff(Experiment.analyse_all, funcs)
+
+    def analyse_sweep(self, param_grid: dict[str, list[Any]]) -> None:
+        """
+        Runs `Experiment.analyse_sweep` for each experiment, and collates the experiments' tables
+        into one table (with an `experiment` column).
+        """
+        self._proc_scaff(Experiment.analyse_sweep, param_grid)
+        # Collating the experiments' sweep tables
+        sweep_dir = os.path.join(self.root_dir, ANALYSIS_SWEEP_DIR)
+        df_ls = []
+        names_ls = []
+        for exp in self.experiments:
+            in_fp = os.path.join(sweep_dir, f"{exp.name}.{AnalysisSweepDf.IO}")
+            if os.path.isfile(in_fp):
+                df_ls.append(AnalysisSweepDf.read(in_fp))
+                names_ls.append(exp.name)
+        if len(df_ls) > 0:
+            df = pd.concat(df_ls, keys=names_ls, names=["experiment"]).reset_index(level="experiment")
+            df = df.reset_index(drop=True)
+            AnalysisSweepDf.write(df, os.path.join(sweep_dir, f"__ALL_sweep.{AnalysisSweepDf.IO}"))
+            AnalysisSweepDf.write_csv(df, os.path.join(sweep_dir, "__ALL_sweep.csv"))
+
     def analyse_behavs(self) -> None:
         self._proc_scaff(Experiment.analyse_behavs)
 
@@ -449,3 +544,19 @@ class Project:
                 AnalysisSummaryCollatedDf.write_csv(
                     df, os.path.join(proj_analyse_dir, analyse_subdir, "__ALL_summary.csv")
                 )
+
+
+def auto_configs_plot_fig(auto_configs_df: pd.DataFrame) -> Figure:
+    """
+    Returns the histogram plot figure of each numerical auto configs field
+    (the `auto_configs_df` columns) across experiments.
+    """
+    g = sns.FacetGrid(
+        data=auto_configs_df.fillna(-1).melt(var_name="measure", value_name="value"),
+        col="measure",
+        sharex=False,
+        col_wrap=4,
+    )
+    g.map(sns.histplot, "value", bins=10)
+    g.set_titles("{col_name}")
+    return g.figure
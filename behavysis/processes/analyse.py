@@ -14,29 +14,48 @@ Returns
 -------
 str
     The outcome of the process.
+
+Each analysis's frame-by-frame df is calculated by `Analyse.calc_<analysis>(keypoints_fp, configs_fp, dst_subdir)`
+(refer to `ANALYSES`), and `Analyse.analyse_all` runs many analyses in a single pass.
+Analyses without frame-by-frame dfs (e.g. `Analyse.occupancy`) write their own outputs.
+`Analyse.analyse_sweep` summarises analyses for each combination of a grid of config values.
 """
 
+import contextlib
+import itertools
 import logging
 import os
+import traceback
+import warnings
+from typing import Any, Callable
 
 import numpy as np
 import pandas as pd
+from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
 
-from behavysis.df_classes.analysis_agg_df import AnalysisBinnedDf
+from behavysis.constants import FileExts, Folders
+from behavysis.df_classes.analysis_agg_df import BINNED, CUSTOM, PLOT, SUMMARY, AnalysisBinnedDf, AnalysisSummaryDf
 from behavysis.df_classes.analysis_df import (
     FBF,
     AnalysisDf,
 )
-from behavysis.df_classes.behav_df import BehavScoredDf
+from behavysis.df_classes.analysis_sweep_df import AnalysisSweepDf
 from behavysis.df_classes.keypoints_df import (
     CoordsCols,
     IndivCols,
     KeypointsDf,
 )
+from behavysis.processes.kinematics import Kinematics, pairwise_min_dists
+from behavysis.processes.motion_energy import get_downsampled_size, motion_energy_arr
 from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
+from behavysis.utils.bout_array import BoutArray
+from behavysis.utils.configs_session import ConfigsSession
+from behavysis.utils.experiment_context import ExperimentContext
 from behavysis.utils.io_utils import get_name
 from behavysis.utils.logging_utils import get_io_obj_content, init_logger_io_obj
-from behavysis.utils.misc_utils import get_func_name_in_stack
+from behavysis.utils.plot_service import PlotService, PlotSpec
+from behavysis.utils.rolling_utils import rolling_mean_arr
 
 ###################################################################################################
 #               ANALYSIS API FUNCS
@@ -44,6 +63,141 @@ from behavysis.utils.misc_utils import get_func_name_in_stack
 
 
 class Analyse:
+    @staticmethod
+    def analyse_all(
+        keypoints_fp: str,
+        dst_dir: str,
+        configs_fp: str,
+        funcs: None | tuple[Callable, ...] = None,
+    ) -> str:
+        """
+        Runs the given analyses (or all analyses if `funcs` is None) in a single pass.
+
+        The keypoints (and shared kinematics) are loaded once, and the frame-by-frame dfs
+        of all analyses are computed. The summary and binned aggregations are then computed once
+        over the concatenated (wide) frame-by-frame df of each summary type
+        (i.e. quantitative or behaviour bouts).
+
+        Each analysis's output files (fbf, summary, and binned) are the same as running
+        its function (e.g. `Analyse.speed`) by itself.
+        The single-analysis functions call this function with one analysis (and are kept for compatibility),
+        so run the analyses together here (as `Experiment.analyse` does) rather than one at a time.
+        Analyses without fbf dfs (e.g. `Analyse.occupancy`) are run as is (in the same
+        `ExperimentContext`).
+
+        Each analysis is run in isolation: a failing analysis is logged (with its name) and left out,
+        and the outputs of the other analyses are still written.
+        """
+        logger, io_obj = init_logger_io_obj()
+        name = get_name(keypoints_fp)
+        configs = ExperimentConfigs.read_json(configs_fp)
+        fps, _, _, _, bins_ls, cbins_ls = configs.get_analysis_configs()
+        bout_attribution = configs.get_ref(configs.user.analyse.bout_attribution)
+        f_names = list(ANALYSES) if funcs is None else [f.__name__ for f in funcs]
+        # Checking all analyses exist
+        for f_name in f_names:
+            assert f_name in ANALYSES or f_name in OTHER_ANALYSES, (
+                f"{f_name} is not an analysis. Possible analyses are {list(ANALYSES) + OTHER_ANALYSES}."
+            )
+        # Calculating each analysis's fbf df (sharing the loaded keypoints and kinematics)
+        analysis_dfs = {}
+        context = ExperimentContext() if ExperimentContext.get_active() is None else contextlib.nullcontext()
+        with context:
+            for f_name in f_names:
+                try:
+                    if f_name in OTHER_ANALYSES:
+                        getattr(Analyse, f_name)(keypoints_fp, dst_dir, configs_fp)
+                    else:
+                        calc_func = ANALYSES[f_name][0]
+                        analysis_df = calc_func(keypoints_fp, configs_fp, os.path.join(dst_dir, f_name))
+                        # Saving the analysis's fbf df
+                        fbf_fp = os.path.join(dst_dir, f_name, FBF, f"{name}.{AnalysisDf.IO}")
+                        AnalysisDf.write(analysis_df, fbf_fp)
+                        analysis_dfs[f_name] = analysis_df
+                except Exception as e:
+                    logger.error(f"{f_name}: {e}")
+                    logger.debug(traceback.format_exc())
+            # Releasing the cached keypoints and kinematics (only the fbf dfs are needed from here)
+            ExperimentContext.invalidate_active(keypoints_fp)
+        # Summarising and binning the (successful) analysis dfs of each summary type at once
+        for summary_func, agg_column in dict.fromkeys(ANALYSES[f_name][1:] for f_name in analysis_dfs):
+            group_f_names = [f_name for f_name in analysis_dfs if ANALYSES[f_name][1:] == (summary_func, agg_column)]
+            try:
+                AnalysisBinnedDf.summary_binned_multi(
+                    {os.path.join(dst_dir, f_name): analysis_dfs[f_name] for f_name in group_f_names},
+                    name,
+                    fps,
+                    summary_func,
+                    agg_column,
+                    bins_ls,
+                    cbins_ls,
+                    bout_attribution,
+                )
+            except Exception as e:
+                logger.error(f"{', '.join(group_f_names)}: {e}")
+                logger.debug(traceback.format_exc())
+        return get_io_obj_content(io_obj)
+
+    @staticmethod
+    def analyse_sweep(
+        keypoints_fp: str,
+        dst_fp: str,
+        configs_fp: str,
+        param_grid: dict[str, list[Any]],
+    ) -> str:
+        """
+        Summarises the analyses for every combination of the parameter grid, and saves the
+        tidy table of the summary measures of each combination (refer to `AnalysisSweepDf`).
+
+        The parameters are paths in `configs.user.analyse` (e.g. `"freezing.thresh_mm"`, or
+        `"in_roi.0.padding_mm"` for list items), and the analysis of each parameter is the first
+        part of its path. The configs file is not changed.
+
+        All combinations are evaluated in one pass over the keypoints: the keypoints and shared
+        intermediates (e.g. kinematics and pairwise distances) are computed once and reused.
+
+        Example
+        -------
+        >>> Analyse.analyse_sweep(
+        ...     keypoints_fp,
+        ...     dst_fp,
+        ...     configs_fp,
+        ...     {"freezing.thresh_mm": [2, 5, 10], "freezing.window_sec": [1, 2]},
+        ... )
+        """
+        logger, io_obj = init_logger_io_obj()
+        configs = ExperimentConfigs.read_json(configs_fp)
+        fps, _, _, _, _, _ = configs.get_analysis_configs()
+        params = list(param_grid)
+        f_names = list(dict.fromkeys(param.split(".")[0] for param in params))
+        # Checking all analyses exist
+        for f_name in f_names:
+            assert f_name in ANALYSES, f"{f_name} is not an analysis. Possible analyses are {list(ANALYSES)}."
+        sweep_df_ls = []
+        # Evaluating each combination with in-memory configs (sharing the loaded keypoints and intermediates)
+        context = ExperimentContext() if ExperimentContext.get_active() is None else contextlib.nullcontext()
+        with context, ConfigsSession(configs_fp, persist=False) as session:
+            for values in itertools.product(*param_grid.values()):
+                # Setting the combination's config values
+                configs_i = configs.model_copy(deep=True)
+                for param, value in zip(params, values):
+                    set_configs_value(configs_i.user.analyse, param, value)
+                session.write(configs_i)
+                logger.debug(f"Sweeping {dict(zip(params, values))}")
+                for f_name in f_names:
+                    calc_func, summary_func, _ = ANALYSES[f_name]
+                    # Summarising the analysis (without writing the fbf or plots)
+                    summary_df = summary_func(calc_func(keypoints_fp, configs_fp, None), fps)
+                    sweep_i_df = summary_df.stack().rename("value").reset_index()
+                    sweep_i_df.insert(0, "analysis", f_name)
+                    for i, (param, value) in enumerate(zip(params, values)):
+                        sweep_i_df.insert(i, param, value if np.isscalar(value) else str(value))
+                    sweep_df_ls.append(sweep_i_df)
+        # Saving sweep table
+        sweep_df = pd.concat(sweep_df_ls, ignore_index=True)
+        AnalysisSweepDf.write(sweep_df, dst_fp)
+        return get_io_obj_content(io_obj)
+
     @staticmethod
     def in_roi(
         keypoints_fp: str,
@@ -56,13 +210,21 @@ class Analyse:
 
         Points are `padding_px` padded (away) from center.
         """
-        logger, io_obj = init_logger_io_obj()
-        f_name = get_func_name_in_stack()
+        return Analyse.analyse_all(keypoints_fp, dst_dir, configs_fp, (Analyse.in_roi,))
+
+    @staticmethod
+    def calc_in_roi(
+        keypoints_fp: str,
+        configs_fp: str,
+        dst_subdir: None | str,
+    ) -> pd.DataFrame:
+        """
+        Returns the fbf df of `in_roi` (and makes the scatter plot in `dst_subdir` if given).
+        """
         name = get_name(keypoints_fp)
-        dst_subdir = os.path.join(dst_dir, f_name)
         # Calculating the deltas (changes in body position) between each frame for the subject
         configs = ExperimentConfigs.read_json(configs_fp)
-        fps, _, _, px_per_mm, bins_ls, cbins_ls = configs.get_analysis_configs()
+        fps, _, _, px_per_mm, _, _ = configs.get_analysis_configs()
         configs_filt_ls = configs.user.analyse.in_roi
         # Loading in dataframe
         keypoints_df = KeypointsDf.clean_headings(KeypointsDf.read(keypoints_fp))
@@ -78,6 +240,8 @@ class Analyse:
         x = CoordsCols.X.value
         y = CoordsCols.Y.value
         idx = pd.IndexSlice
+        is_in_ls = []
+        centres_ls = []
         for configs_filt in configs_filt_ls:
             # Getting necessary config parameters
             roi_name = configs.get_ref(configs_filt.roi_name)
@@ -87,60 +251,115 @@ class Analyse:
             roi_corners = configs.get_ref(configs_filt.roi_corners)
             # Calculating more parameters
             padding_px = padding_mm / px_per_mm
-            # Checking bodyparts and roi_corners exist
+            # Checking bodyparts exist
             KeypointsDf.check_bpts_exist(keypoints_df, bpts)
-            KeypointsDf.check_bpts_exist(keypoints_df, roi_corners)
-            # Getting average corner coordinates. Assumes arena does not move.
-            corners_i_df = pd.DataFrame([keypoints_df[(IndivCols.SINGLE.value, pt)].mean() for pt in roi_corners]).drop(
-                columns=["likelihood"]
+            # Getting (padded) average corner coordinates
+            corners_i_df = get_roi_corners_df(keypoints_df, roi_corners, padding_px)
+            # Getting average body center (x, y) for each individual
+            centres_i = np.stack(
+                [
+                    np.stack(
+                        [
+                            keypoints_df.loc[:, idx[indiv, bpts, x]].mean(axis=1).values,  # type: ignore
+                            keypoints_df.loc[:, idx[indiv, bpts, y]].mean(axis=1).values,  # type: ignore
+                        ],
+                        axis=-1,
+                    )
+                    for indiv in indivs
+                ],
+                axis=1,
             )
-            # Adjusting x-y to have `padding_px` dilation/erosion from the points themselves
-            roi_center = corners_i_df.mean()
-            for i in corners_i_df.index:
-                # Calculating angle from centre to point (going out from centre)
-                theta = np.arctan2(
-                    corners_i_df.loc[i, y] - roi_center[y],
-                    corners_i_df.loc[i, x] - roi_center[x],
-                )
-                # Getting x, y distances so point is `padding_px` padded (away) from center
-                corners_i_df.loc[i, x] = corners_i_df.loc[i, x] + (padding_px * np.cos(theta))
-                corners_i_df.loc[i, y] = corners_i_df.loc[i, y] + (padding_px * np.sin(theta))
+            corners_df_ls.append(corners_i_df)
+            roi_names_ls.append(roi_name)
+            is_in_ls.append(is_in)
+            centres_ls.append(centres_i)
+        # Determining if each indiv body center is in each ROI (all frames, indivs, and ROIs at once)
+        in_roi_arr = pts_in_polygons(
+            np.stack(centres_ls, axis=1),
+            [corners_i_df[[x, y]].to_numpy() for corners_i_df in corners_df_ls],
+        )
+        for j, (roi_name, is_in, centres_i) in enumerate(zip(roi_names_ls, is_in_ls, centres_ls)):
             # Making the res_df
             analysis_i_df = AnalysisDf.init_df(keypoints_df.index)
-            # For each individual, getting the in-roi status
-            for indiv in indivs:
-                # Getting average body center (x, y) for each individual
-                analysis_i_df[(indiv, x)] = keypoints_df.loc[:, idx[indiv, bpts, x]].mean(axis=1).values  # type: ignore
-                analysis_i_df[(indiv, y)] = keypoints_df.loc[:, idx[indiv, bpts, y]].mean(axis=1).values  # type: ignore
-                # Determining if the indiv body center is in the ROI
-                analysis_i_df[(indiv, roi_name)] = analysis_i_df[indiv].apply(
-                    lambda pt: pt_in_roi(pt, corners_i_df, logger), axis=1
-                )
+            for k, indiv in enumerate(indivs):
+                analysis_i_df[(indiv, x)] = centres_i[:, k, 0]
+                analysis_i_df[(indiv, y)] = centres_i[:, k, 1]
+                analysis_i_df[(indiv, roi_name)] = in_roi_arr[:, j, k]
             # Inverting in_roi status if is_in is False
             if not is_in:
                 analysis_i_df.loc[:, idx[:, roi_name]] = ~analysis_i_df.loc[:, idx[:, roi_name]]  # type: ignore
             analysis_df_ls.append(analysis_i_df.loc[:, idx[:, roi_name]].astype(np.int8))  # type: ignore
             scatter_df_ls.append(analysis_i_df)
-            corners_df_ls.append(corners_i_df)
-            roi_names_ls.append(roi_name)
         # Concatenating all analysis_df_ls and roi_corners_df_ls
         analysis_df = pd.concat(analysis_df_ls, axis=1)
         scatter_df = pd.concat(scatter_df_ls, axis=1)
         corners_df = pd.concat(corners_df_ls, keys=roi_names_ls, names=["roi"]).reset_index(level="roi")
-        # Saving analysis_df
-        fbf_fp = os.path.join(dst_subdir, FBF, f"{name}.{AnalysisDf.IO}")
-        AnalysisDf.write(analysis_df, fbf_fp)
-        plot_fp = os.path.join(dst_subdir, "scatter_plot", f"{name}.png")
-        AnalysisDf.make_location_scatterplot(scatter_df, corners_df, plot_fp)
-        # Summarising and binning analysis_df
-        AnalysisBinnedDf.summary_binned_behavs(
-            analysis_df,
-            dst_subdir,
-            name,
-            fps,
-            bins_ls,
-            cbins_ls,
-        )
+        # Making scatter plot
+        if dst_subdir is not None:
+            plot_fp = os.path.join(dst_subdir, "scatter_plot", f"{name}.png")
+            AnalysisDf.make_location_scatterplot(scatter_df, corners_df, plot_fp)
+        return analysis_df
+
+    @staticmethod
+    def occupancy(
+        keypoints_fp: str,
+        dst_dir: str,
+        configs_fp: str,
+    ) -> str:
+        """
+        Determines the time (in seconds) each subject spends in each cell of a grid over the arena
+        (from the average of given bodypoints), for the whole experiment and for each time bin
+        (`bins_sec` and `custom_bins_sec`).
+
+        The grid has `cell_mm` square cells and covers the video frame.
+        Saves the occupancy arrays (`.npz` files with the `occupancy_sec`, `bin_sec`, `indivs`,
+        `x_edges_px`, and `y_edges_px` arrays) and heatmap plots.
+        """
+        logger, io_obj = init_logger_io_obj()
+        name = get_name(keypoints_fp)
+        dst_subdir = os.path.join(dst_dir, "occupancy")
+        configs = ExperimentConfigs.read_json(configs_fp)
+        fps, width_px, height_px, px_per_mm, bins_ls, cbins_ls = configs.get_analysis_configs()
+        configs_filt = configs.user.analyse.occupancy
+        bpts = configs.get_ref(configs_filt.bodyparts)
+        cell_mm = configs.get_ref(configs_filt.cell_mm)
+        # Calculating more parameters
+        cell_px = cell_mm * px_per_mm
+        x_edges = np.arange(0, width_px + cell_px, cell_px)
+        y_edges = np.arange(0, height_px + cell_px, cell_px)
+
+        # Getting kinematics (unsmoothed bodyparts)
+        kinematics = Kinematics.load(keypoints_fp, bpts, 1)
+        assert kinematics.index.shape[0] > 0, "No frames in keypoints_df. Please check keypoints file."
+        # Getting timestamps (from when the experiment commenced)
+        frames = kinematics.index.get_level_values(AnalysisDf.IN.FRAME.value).to_numpy()
+        timestamps = (frames - frames[0]) / fps
+        # Whole experiment, each bin size, and custom bins
+        bins_dict = {SUMMARY: np.array([0, np.max(timestamps)])}
+        for bin_sec in bins_ls:
+            bins_dict[f"{BINNED}_{bin_sec}"] = np.arange(0, np.max(timestamps) + bin_sec, bin_sec)
+        if cbins_ls:
+            bins_dict[f"{BINNED}_{CUSTOM}"] = np.asarray(cbins_ls)
+        for bins_name, bins in bins_dict.items():
+            # Getting the time bin of each frame
+            time_bin_idx, bin_labels = get_time_bin_idx(timestamps, bins)
+            # Getting (time bins, indivs, y cells, x cells) occupancy (in seconds)
+            n_time_bins = bin_labels.shape[0]
+            occupancy_sec = occupancy_arr(kinematics.centroids, time_bin_idx, n_time_bins, x_edges, y_edges) / fps
+            # Saving occupancy arrays
+            arr_fp = os.path.join(dst_subdir, f"{bins_name}_heatmap", f"{name}.npz")
+            os.makedirs(os.path.dirname(arr_fp), exist_ok=True)
+            np.savez_compressed(
+                arr_fp,
+                occupancy_sec=occupancy_sec,
+                bin_sec=bin_labels,
+                indivs=np.array(kinematics.indivs),
+                x_edges_px=x_edges,
+                y_edges_px=y_edges,
+            )
+            # Making heatmap plot
+            plot_fp = os.path.join(dst_subdir, f"{bins_name}_heatmap_{PLOT}", f"{name}.png")
+            make_occupancy_plot(occupancy_sec, bin_labels, kinematics.indivs, plot_fp)
         return get_io_obj_content(io_obj)
 
     @staticmethod
@@ -152,13 +371,20 @@ class Analyse:
         """
         Determines the speed of the subject in each frame.
         """
-        logger, io_obj = init_logger_io_obj()
-        f_name = get_func_name_in_stack()
-        name = get_name(keypoints_fp)
-        dst_subdir = os.path.join(dst_dir, f_name)
+        return Analyse.analyse_all(keypoints_fp, dst_dir, configs_fp, (Analyse.speed,))
+
+    @staticmethod
+    def calc_speed(
+        keypoints_fp: str,
+        configs_fp: str,
+        dst_subdir: None | str,
+    ) -> pd.DataFrame:
+        """
+        Returns the fbf df of `speed`.
+        """
         # Calculating the deltas (changes in body position) between each frame for the subject
         configs = ExperimentConfigs.read_json(configs_fp)
-        fps, _, _, px_per_mm, bins_ls, cbins_ls = configs.get_analysis_configs()
+        fps, _, _, px_per_mm, _, _ = configs.get_analysis_configs()
         configs_filt = configs.user.analyse.speed
         bpts = configs.get_ref(configs_filt.bodyparts)
         smoothing_sec = configs.get_ref(configs_filt.smoothing_sec)
@@ -173,42 +399,22 @@ class Analyse:
         # Getting indivs and bpts list
         indivs, _ = KeypointsDf.get_indivs_bpts(keypoints_df)
 
+        # Getting kinematics, with a rolling window of 3 frames for the bodyparts
+        # Otherwise jitter contributes to movement
+        jitter_frames = 3
+        kinematics = Kinematics.load(keypoints_fp, bpts, jitter_frames)
+
         # Calculating speed of subject for each frame
         analysis_df = AnalysisDf.init_df(keypoints_df.index)
-        # keypoints_df.index = analysis_df.index
-        idx = pd.IndexSlice
-        for indiv in indivs:
-            # Making a rolling window of 3 frames for average body-centre
-            # Otherwise jitter contributes to movement
-            jitter_frames = 3
-            smoothed_xy_df = keypoints_df.rolling(window=jitter_frames, min_periods=1, center=True).agg(np.nanmean)
-            # Getting changes in x-y values between frames (deltas)
-            delta_x = smoothed_xy_df.loc[:, idx[indiv, bpts, "x"]].mean(axis=1).diff()  # type: ignore
-            delta_y = smoothed_xy_df.loc[:, idx[indiv, bpts, "y"]].mean(axis=1).diff()  # type: ignore
-            delta = np.array(np.sqrt(np.power(delta_x, 2) + np.power(delta_y, 2)))
-            # Storing speed (raw and smoothed)
-            analysis_df[(indiv, "SpeedMMperSec")] = (delta / px_per_mm) * fps
-            analysis_df[(indiv, "SpeedMMperSecSmoothed")] = (
-                analysis_df[(indiv, "SpeedMMperSec")]
-                .rolling(window=smoothing_frames, min_periods=1, center=True)
-                .agg(np.nanmean)
-            )
+        # Getting body-centre speed (raw and smoothed)
+        speed = kinematics.centroid_speeds / px_per_mm * fps
+        speed_smoothed = rolling_mean_arr(speed, smoothing_frames, min_periods=1, center=True)
+        for i, indiv in enumerate(indivs):
+            analysis_df[(indiv, "SpeedMMperSec")] = speed[:, i]
+            analysis_df[(indiv, "SpeedMMperSecSmoothed")] = speed_smoothed[:, i]
         # Backfilling the analysis_df so no nan's
         analysis_df = analysis_df.bfill()
-        # Saving analysis_df
-        fbf_fp = os.path.join(dst_subdir, FBF, f"{name}.{AnalysisDf.IO}")
-        AnalysisDf.write(analysis_df, fbf_fp)
-
-        # Summarising and binning analysis_df
-        AnalysisBinnedDf.summary_binned_quantitative(
-            analysis_df,
-            dst_subdir,
-            name,
-            fps,
-            bins_ls,
-            cbins_ls,
-        )
-        return get_io_obj_content(io_obj)
+        return analysis_df
 
     @staticmethod
     def social_distance(
@@ -217,15 +423,23 @@ class Analyse:
         configs_fp: str,
     ) -> str:
         """
-        Determines the speed of the subject in each frame.
+        Determines the distance between each pair of subjects (from the average
+        of given bodypoints) in each frame.
+        """
+        return Analyse.analyse_all(keypoints_fp, dst_dir, configs_fp, (Analyse.social_distance,))
+
+    @staticmethod
+    def calc_social_distance(
+        keypoints_fp: str,
+        configs_fp: str,
+        dst_subdir: None | str,
+    ) -> pd.DataFrame:
+        """
+        Returns the fbf df of `social_distance`.
         """
-        logger, io_obj = init_logger_io_obj()
-        f_name = get_func_name_in_stack()
-        name = get_name(keypoints_fp)
-        dst_subdir = os.path.join(dst_dir, f_name)
         # Calculating the deltas (changes in body position) between each frame for the subject
         configs = ExperimentConfigs.read_json(configs_fp)
-        fps, _, _, px_per_mm, bins_ls, cbins_ls = configs.get_analysis_configs()
+        fps, _, _, px_per_mm, _, _ = configs.get_analysis_configs()
         configs_filt = configs.user.analyse.social_distance
         bpts = configs.get_ref(configs_filt.bodyparts)
         smoothing_sec = configs.get_ref(configs_filt.smoothing_sec)
@@ -240,39 +454,73 @@ class Analyse:
         # Getting indivs and bpts list
         indivs, _ = KeypointsDf.get_indivs_bpts(keypoints_df)
 
-        # Calculating speed of subject for each frame
+        # Getting kinematics (unsmoothed bodyparts)
+        kinematics = Kinematics.load(keypoints_fp, bpts, 1)
+
+        # Calculating distance between each pair of subjects for each frame
         analysis_df = AnalysisDf.init_df(keypoints_df.index)
-        idx = pd.IndexSlice
-        # Assumes there are only two individuals
-        indiv_a = indivs[0]
-        indiv_b = indivs[1]
-        # Getting distances between each individual
-        idx_a = idx[indiv_b, bpts, "x"]
-        dist_x = (keypoints_df.loc[:, idx_a] - keypoints_df.loc[:, idx_a]).mean(axis=1)  # type: ignore
-        idx_b = idx[indiv_a, bpts, "y"]
-        dist_y = (keypoints_df.loc[:, idx_b] - keypoints_df.loc[:, idx_b]).mean(axis=1)  # type: ignore
-        dist = np.array(np.sqrt(np.power(dist_x, 2) + np.power(dist_y, 2)))
+        assert len(indivs) >= 2, "Need at least two individuals for social_distance."
+        # Getting (frames, pairs) distances between each individual's body-centre
+        dist_mm = pairwise_min_dists(kinematics.centroids[:, :, None]) / px_per_mm
+        dist_mm_smoothed = rolling_mean_arr(dist_mm, smoothing_frames, min_periods=1, center=True)
         # Adding mm distance to saved analysis_df table
-        analysis_df[(f"{indiv_a}_{indiv_b}", "DistMM")] = dist / px_per_mm
-        analysis_df[(f"{indiv_a}_{indiv_b}", "DistMMSmoothed")] = (
-            analysis_df[(f"{indiv_a}_{indiv_b}", "DistMM")]
-            .rolling(window=smoothing_frames, min_periods=1, center=True)
-            .agg(np.nanmean)
-        )
-        # Saving analysis_df
-        fbf_fp = os.path.join(dst_subdir, FBF, f"{name}.{AnalysisDf.IO}")
-        AnalysisDf.write(analysis_df, fbf_fp)
-
-        # Summarising and binning analysis_df
-        AnalysisBinnedDf.summary_binned_quantitative(
-            analysis_df,
-            dst_subdir,
-            name,
-            fps,
-            bins_ls,
-            cbins_ls,
-        )
-        return get_io_obj_content(io_obj)
+        for i, (indiv_a, indiv_b) in enumerate(kinematics.get_pairs()):
+            analysis_df[(f"{indiv_a}_{indiv_b}", "DistMM")] = dist_mm[:, i]
+            analysis_df[(f"{indiv_a}_{indiv_b}", "DistMMSmoothed")] = dist_mm_smoothed[:, i]
+        return analysis_df
+
+    @staticmethod
+    def social_contact(
+        keypoints_fp: str,
+        dst_dir: str,
+        configs_fp: str,
+    ) -> str:
+        """
+        Determines the frames in which each pair of subjects are in contact.
+
+        "Contact" is defined as any of the given bodypoints of the two subjects being
+        closer than `thresh_mm`, and only includes bouts that last longer than `window_sec` seconds.
+        """
+        return Analyse.analyse_all(keypoints_fp, dst_dir, configs_fp, (Analyse.social_contact,))
+
+    @staticmethod
+    def calc_social_contact(
+        keypoints_fp: str,
+        configs_fp: str,
+        dst_subdir: None | str,
+    ) -> pd.DataFrame:
+        """
+        Returns the fbf df of `social_contact`.
+        """
+        configs = ExperimentConfigs.read_json(configs_fp)
+        fps, _, _, px_per_mm, _, _ = configs.get_analysis_configs()
+        configs_filt = configs.user.analyse.social_contact
+        bpts = configs.get_ref(configs_filt.bodyparts)
+        thresh_mm = configs.get_ref(configs_filt.thresh_mm)
+        window_sec = configs.get_ref(configs_filt.window_sec)
+        # Calculating more parameters
+        window_frames = int(np.round(fps * window_sec, 0))
+
+        # Loading in dataframe
+        keypoints_df = KeypointsDf.clean_headings(KeypointsDf.read(keypoints_fp))
+        assert keypoints_df.shape[0] > 0, "No frames in keypoints_df. Please check keypoints file."
+        # Checking bodyparts exist
+        KeypointsDf.check_bpts_exist(keypoints_df, bpts)
+        # Getting indivs list
+        indivs, _ = KeypointsDf.get_indivs_bpts(keypoints_df)
+        assert len(indivs) >= 2, "Need at least two individuals for social_contact."
+
+        # Getting (frames, pairs) closest distance between each pair's (unsmoothed) bodyparts
+        dist_px, pairs = Kinematics.load_pairwise_min_dists(keypoints_fp, bpts)
+        dist_mm = dist_px / px_per_mm
+        # If ANY bodyparts are within `thresh_mm`
+        is_contact = dist_mm < thresh_mm
+        # If a contact bout is less than window_frames, then it is not actually contact
+        is_contact = remove_short_runs_arr(is_contact, window_frames)
+        analysis_df = AnalysisDf.init_df(keypoints_df.index)
+        for i, (indiv_a, indiv_b) in enumerate(pairs):
+            analysis_df[(f"{indiv_a}_{indiv_b}", "social_contact")] = is_contact[:, i].astype(np.int8)
+        return analysis_df
 
     @staticmethod
     def freezing(
@@ -288,13 +536,20 @@ class Analyse:
 
         NOTE: method is "greedy" because it looks at a freezing bout from earliest possible frame.
         """
-        logger, io_obj = init_logger_io_obj()
-        f_name = get_func_name_in_stack()
-        name = get_name(keypoints_fp)
-        dst_subdir = os.path.join(dst_dir, f_name)
+        return Analyse.analyse_all(keypoints_fp, dst_dir, configs_fp, (Analyse.freezing,))
+
+    @staticmethod
+    def calc_freezing(
+        keypoints_fp: str,
+        configs_fp: str,
+        dst_subdir: None | str,
+    ) -> pd.DataFrame:
+        """
+        Returns the fbf df of `freezing`.
+        """
         # Calculating the deltas (changes in body position) between each frame for the subject
         configs = ExperimentConfigs.read_json(configs_fp)
-        fps, _, _, px_per_mm, bins_ls, cbins_ls = configs.get_analysis_configs()
+        fps, _, _, px_per_mm, _, _ = configs.get_analysis_configs()
         configs_filt = configs.user.analyse.freezing
         bpts = configs.get_ref(configs_filt.bodyparts)
         thresh_mm = configs.get_ref(configs_filt.thresh_mm)
@@ -313,54 +568,372 @@ class Analyse:
         # Getting indivs and bpts list
         indivs, _ = KeypointsDf.get_indivs_bpts(keypoints_df)
 
-        # Calculating speed of subject for each frame
+        # Getting kinematics (unsmoothed bodyparts)
+        kinematics = Kinematics.load(keypoints_fp, bpts, 1)
+
+        # Calculating frame-by-frame delta distances for each bpt (smoothed)
+        speeds = rolling_mean_arr(kinematics.speeds, smoothing_frames, min_periods=1, center=True)
+        # If ALL bodypoints do not leave `thresh_px`
+        is_frozen = np.all(speeds < thresh_px, axis=2)
+        # If a freezing bout is less than window_frames, then it is not actually freezing
+        is_frozen = remove_short_runs_arr(is_frozen, window_frames)
         analysis_df = AnalysisDf.init_df(keypoints_df.index)
-        keypoints_df.index = analysis_df.index
-        for indiv in indivs:
-            temp_df = pd.DataFrame(index=analysis_df.index)
-            # Calculating frame-by-frame delta distances for current bpt
-            for bpt in bpts:
-                # Getting x and y changes
-                delta_x = keypoints_df[(indiv, bpt, "x")].diff()
-                delta_y = keypoints_df[(indiv, bpt, "y")].diff()
-                # Getting Euclidean distance between frames for bpt
-                delta = np.sqrt(np.power(delta_x, 2) + np.power(delta_y, 2))
-                # Converting from px to mm
-                temp_df[f"{bpt}_dist"] = delta
-                # Smoothing
-                temp_df[f"{bpt}_dist"] = (
-                    temp_df[f"{bpt}_dist"].rolling(window=smoothing_frames, min_periods=1, center=True).agg(np.nanmean)
+        for i, indiv in enumerate(indivs):
+            analysis_df[(indiv, "freezing")] = is_frozen[:, i].astype(np.int8)
+        return analysis_df
+
+    @staticmethod
+    def motion_energy(
+        keypoints_fp: str,
+        dst_dir: str,
+        configs_fp: str,
+    ) -> str:
+        """
+        Determines the pixel motion energy (the mean absolute greyscale difference from the
+        previous frame) of the experiment's formatted video in each frame.
+
+        The energy is calculated for the whole frame, each ROI (the `in_roi` ROIs, if `in_rois`),
+        and a box around each individual's bodyparts (padded by `padding_mm`).
+        The video is decoded at `scale` of its size, every `stride_frames` frames,
+        in `n_workers` parallel segments.
+        """
+        return Analyse.analyse_all(keypoints_fp, dst_dir, configs_fp, (Analyse.motion_energy,))
+
+    @staticmethod
+    def calc_motion_energy(
+        keypoints_fp: str,
+        configs_fp: str,
+        dst_subdir: None | str,
+    ) -> pd.DataFrame:
+        """
+        Returns the fbf df of `motion_energy`.
+
+        The video is the formatted video of the keypoints file's experiment (refer to `get_formatted_vid_fp`).
+        Each sampled frame's energy is divided by the number of frames since the previous sample
+        (so energies are comparable between strides), and is given to each of those frames.
+        """
+        configs = ExperimentConfigs.read_json(configs_fp)
+        fps, width_px, height_px, px_per_mm, _, _ = configs.get_analysis_configs()
+        configs_filt = configs.user.analyse.motion_energy
+        scale = configs.get_ref(configs_filt.scale)
+        stride_frames = configs.get_ref(configs_filt.stride_frames)
+        in_rois = configs.get_ref(configs_filt.in_rois)
+        padding_mm = configs.get_ref(configs_filt.padding_mm)
+        bpts = configs.get_ref(configs_filt.bodyparts)
+        n_workers = configs.get_ref(configs_filt.n_workers)
+        # Calculating more parameters
+        padding_px = padding_mm / px_per_mm
+        vid_fp = get_formatted_vid_fp(keypoints_fp)
+
+        # Loading in dataframe
+        keypoints_df = KeypointsDf.clean_headings(KeypointsDf.read(keypoints_fp))
+        assert keypoints_df.shape[0] > 0, "No frames in keypoints_df. Please check keypoints file."
+        # Getting indivs list
+        indivs, _ = KeypointsDf.get_indivs_bpts(keypoints_df)
+        # Getting the sampled frames (every `stride_frames`, from the sample before the first frame)
+        frames = keypoints_df.index.get_level_values(AnalysisDf.IN.FRAME.value).to_numpy()
+        first_frame = frames.min() - stride_frames if frames.min() >= stride_frames else frames.min()
+        samples = np.arange(first_frame, frames.max() + 1, stride_frames)
+        samples = np.append(samples, frames.max()) if samples[-1] < frames.max() else samples
+
+        # Getting the mask of each ROI (the downsampled pixels with centres in the ROI)
+        roi_names = []
+        masks = None
+        if in_rois:
+            polygons = []
+            for configs_roi in configs.user.analyse.in_roi:
+                roi_names.append(configs.get_ref(configs_roi.roi_name))
+                roi_corners = configs.get_ref(configs_roi.roi_corners)
+                roi_padding_px = configs.get_ref(configs_roi.padding_mm) / px_per_mm
+                corners_df = get_roi_corners_df(keypoints_df, roi_corners, roi_padding_px)
+                polygons.append(corners_df[[CoordsCols.X.value, CoordsCols.Y.value]].to_numpy())
+            width, height = get_downsampled_size(int(width_px), int(height_px), scale)
+            pixels_x, pixels_y = np.meshgrid((np.arange(width) + 0.5) / scale, (np.arange(height) + 0.5) / scale)
+            pixels = np.stack([pixels_x.ravel(), pixels_y.ravel()], axis=-1)[:, None, None]
+            in_polygons = pts_in_polygons(np.broadcast_to(pixels, (width * height, len(polygons), 1, 2)), polygons)
+            masks = in_polygons[:, :, 0].T.reshape(len(polygons), height, width)
+        # Getting each individual's box (the padded extent of the bodyparts) at each sample
+        boxes = None
+        if len(bpts) > 0:
+            kinematics = Kinematics.load(keypoints_fp, bpts, 1)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                boxes = np.concatenate(
+                    [
+                        np.nanmin(kinematics.positions, axis=2) - padding_px,
+                        np.nanmax(kinematics.positions, axis=2) + padding_px,
+                    ],
+                    axis=-1,
                 )
-            # If ALL bodypoints do not leave `thresh_px`
-            analysis_df[(indiv, f_name)] = temp_df.apply(lambda x: pd.Series(np.all(x < thresh_px)), axis=1).astype(
-                np.int8
-            )
+            boxes = boxes[np.clip(np.searchsorted(frames, samples), 0, frames.shape[0] - 1)]
+
+        # Calculating the motion energy of each sample
+        frame_energy, mask_energy, box_energy = motion_energy_arr(vid_fp, samples, scale, masks, boxes, n_workers)
+        # Getting the per-frame energy of each frame (from the first sample at or after the frame)
+        sample_gaps = np.diff(samples, prepend=samples[0] - 1)
+        sample_idx = np.searchsorted(samples, frames)
+        analysis_df = AnalysisDf.init_df(keypoints_df.index)
+        analysis_df[(IndivCols.SINGLE.value, "MotionEnergy")] = (frame_energy / sample_gaps)[sample_idx]
+        for j, roi_name in enumerate(roi_names):
+            analysis_df[(roi_name, "MotionEnergy")] = (mask_energy[:, j] / sample_gaps)[sample_idx]
+        if boxes is not None:
+            for k, indiv in enumerate(indivs):
+                analysis_df[(indiv, "MotionEnergy")] = (box_energy[:, k] / sample_gaps)[sample_idx]
+        # Backfilling the analysis_df so no nan's
+        analysis_df = analysis_df.bfill()
+        return analysis_df
+
+
+# The fbf calculation, summary function, and summary column (for plots) of each analysis
+AnalysisFuncs = tuple[
+    Callable[[str, str, None | str], pd.DataFrame],
+    Callable[[pd.DataFrame, float], pd.DataFrame],
+    str,
+]
+ANALYSES: dict[str, AnalysisFuncs] = {
+    "in_roi": (Analyse.calc_in_roi, AnalysisSummaryDf.agg_behavs, "bout_dur_total"),
+    "speed": (Analyse.calc_speed, AnalysisSummaryDf.agg_quantitative, "mean"),
+    "social_distance": (Analyse.calc_social_distance, AnalysisSummaryDf.agg_quantitative, "mean"),
+    "social_contact": (Analyse.calc_social_contact, AnalysisSummaryDf.agg_behavs, "bout_dur_total"),
+    "freezing": (Analyse.calc_freezing, AnalysisSummaryDf.agg_behavs, "bout_dur_total"),
+    "motion_energy": (Analyse.calc_motion_energy, AnalysisSummaryDf.agg_quantitative, "mean"),
+}
+# Analyses that write their own outputs (i.e. without fbf dfs)
+OTHER_ANALYSES = ["occupancy"]
+
+
+def is_analysis(func: Callable) -> bool:
+    """
+    Returns whether `func` is an analysis of `Analyse` (i.e. can be run with `Analyse.analyse_all`).
+    """
+    f_name = func.__name__
+    return (f_name in ANALYSES or f_name in OTHER_ANALYSES) and getattr(Analyse, f_name, None) is func
+
+
+def get_formatted_vid_fp(keypoints_fp: str) -> str:
+    """
+    Returns the formatted video filepath of the keypoints file's experiment
+    (i.e. the keypoints file is in a folder of the project, such as `Folders.PREPROCESSED`).
+    """
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(keypoints_fp)))
+    name = get_name(keypoints_fp)
+    return os.path.join(root_dir, Folders.FORMATTED_VID.value, f"{name}.{FileExts.FORMATTED_VID.value}")
+
 
-            # Getting start, stop, and duration of each freezing behav bout
-            freezingbouts_df = BehavScoredDf.vect2bouts_df(analysis_df[(indiv, f_name)] == 1)
-            # For each freezing bout, if there is less than window_frames, tehn
-            # it is not actually freezing
-            for _, row in freezingbouts_df.iterrows():
-                if row["dur"] < window_frames:
-                    analysis_df.loc[row["start"] : row["stop"], (indiv, f_name)] = 0
-        # Saving analysis_df
-        fbf_fp = os.path.join(dst_subdir, FBF, f"{name}.{AnalysisDf.IO}")
-        AnalysisDf.write(analysis_df, fbf_fp)
-
-        # Summarising and binning analysis_df
-        AnalysisBinnedDf.summary_binned_behavs(
-            analysis_df,
-            dst_subdir,
-            name,
-            fps,
-            bins_ls,
-            cbins_ls,
+def get_roi_corners_df(keypoints_df: pd.DataFrame, roi_corners: list[str], padding_px: float) -> pd.DataFrame:
+    """
+    Returns the (x, y) average coordinates of the ROI's corner points (assumes the arena does not move),
+    with each corner `padding_px` padded (away) from the ROI's centre.
+    """
+    x = CoordsCols.X.value
+    y = CoordsCols.Y.value
+    # Checking roi_corners exist
+    KeypointsDf.check_bpts_exist(keypoints_df, roi_corners)
+    # Getting average corner coordinates
+    corners_df = pd.DataFrame([keypoints_df[(IndivCols.SINGLE.value, pt)].mean() for pt in roi_corners]).drop(
+        columns=["likelihood"]
+    )
+    # Adjusting x-y to have `padding_px` dilation/erosion from the points themselves
+    roi_center = corners_df.mean()
+    for i in corners_df.index:
+        # Calculating angle from centre to point (going out from centre)
+        theta = np.arctan2(
+            corners_df.loc[i, y] - roi_center[y],
+            corners_df.loc[i, x] - roi_center[x],
         )
-        return get_io_obj_content(io_obj)
+        # Getting x, y distances so point is `padding_px` padded (away) from center
+        corners_df.loc[i, x] = corners_df.loc[i, x] + (padding_px * np.cos(theta))
+        corners_df.loc[i, y] = corners_df.loc[i, y] + (padding_px * np.sin(theta))
+    return corners_df
+
+
+def set_configs_value(model: Any, path: str, value: Any) -> None:
+    """
+    Sets the value at the dotted path of the configs model (in-place).
+    Numeric path parts are list indexes (e.g. `"in_roi.0.padding_mm"`).
+    """
+    *parents, last = path.split(".")
+    for part in parents:
+        model = model[int(part)] if part.isdigit() else getattr(model, part)
+    if last.isdigit():
+        model[int(last)] = value
+    else:
+        assert hasattr(model, last), f"{last} is not a field of {type(model).__name__} (in {path})."
+        setattr(model, last, value)
+
+
+def get_time_bin_idx(timestamps: np.ndarray, bins: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the time bin index of each timestamp, and the time bin labels (the bins' end times).
+    The bins are the same as `AnalysisBinnedDf.make_binned` (i.e. `(start, end]` intervals,
+    with the first bin including 0, and bins added to cover 0 to the last timestamp).
+    """
+    # Ensuring all bins are included (start frame and end frame)
+    bins = np.asarray(bins, dtype=np.float64)
+    bins = np.append(0, bins) if np.min(bins) > 0 else bins
+    t_max = np.max(timestamps)
+    bins = np.append(bins, t_max) if np.max(bins) < t_max else bins
+    # Getting the `(start, end]` bin of each timestamp
+    time_bin_idx = np.clip(np.searchsorted(bins, timestamps, side="left") - 1, 0, bins.shape[0] - 2)
+    return time_bin_idx, bins[1:]
+
+
+def occupancy_arr(
+    pts: np.ndarray,
+    time_bin_idx: np.ndarray,
+    n_time_bins: int,
+    x_edges: np.ndarray,
+    y_edges: np.ndarray,
+) -> np.ndarray:
+    """
+    Counts the frames each point is in each grid cell, for each time bin.
+
+    The cell (and time bin and point) of each frame is flattened to one index,
+    so all counts are made with a single `np.bincount`.
+
+    Parameters
+    ----------
+    pts : np.ndarray
+        `(frames, points, 2)` array of the (x, y) coordinates (e.g. each individual's centroid).
+    time_bin_idx : np.ndarray
+        `(frames,)` array of the time bin index of each frame.
+    n_time_bins : int
+        Number of time bins.
+    x_edges : np.ndarray
+        The (evenly spaced) x edges of the grid cells.
+    y_edges : np.ndarray
+        The (evenly spaced) y edges of the grid cells.
+
+    Returns
+    -------
+    np.ndarray
+        `(time bins, points, y cells, x cells)` array of frame counts.
+        NaN points and points outside of the grid are not counted.
+    """
+    n_frames, n_pts, _ = pts.shape
+    n_x = x_edges.shape[0] - 1
+    n_y = y_edges.shape[0] - 1
+    # Getting the (x, y) cell of each point
+    with np.errstate(invalid="ignore"):
+        x_idx = np.floor((pts[..., 0] - x_edges[0]) / (x_edges[1] - x_edges[0]))
+        y_idx = np.floor((pts[..., 1] - y_edges[0]) / (y_edges[1] - y_edges[0]))
+    is_valid = (x_idx >= 0) & (x_idx < n_x) & (y_idx >= 0) & (y_idx < n_y)
+    # Flattening the (time bin, point, y cell, x cell) indexes
+    pt_idx = np.broadcast_to(np.arange(n_pts), (n_frames, n_pts))
+    tb_idx = np.broadcast_to(time_bin_idx[:, None], (n_frames, n_pts))
+    flat_idx = ((tb_idx[is_valid] * n_pts + pt_idx[is_valid]) * n_y + y_idx[is_valid].astype(np.int64)) * n_x
+    flat_idx += x_idx[is_valid].astype(np.int64)
+    counts = np.bincount(flat_idx, minlength=n_time_bins * n_pts * n_y * n_x)
+    return counts.reshape(n_time_bins, n_pts, n_y, n_x)
+
+
+def make_occupancy_plot(occupancy_sec: np.ndarray, bin_labels: np.ndarray, indivs: list[str], dst_fp: str) -> None:
+    """
+    Makes the heatmap plot of the `(time bins, indivs, y cells, x cells)` occupancy array
+    (rendered with the active `PlotService`, refer to `occupancy_plot_fig`).
+    """
+    PlotService.render_active(PlotSpec(occupancy_plot_fig, dst_fp, occupancy_sec, bin_labels, indivs))
+
+
+def occupancy_plot_fig(occupancy_sec: np.ndarray, bin_labels: np.ndarray, indivs: list[str]) -> Figure:
+    """
+    Returns the heatmap plot figure of the `(time bins, indivs, y cells, x cells)` occupancy array.
+
+    Rows are individuals, and each row's time bins are tiled (left to right) in one image,
+    so the plot is fast to make for many time bins.
+    """
+    n_time_bins, n_indivs, n_y, n_x = occupancy_sec.shape
+    # Tiling time bins (with a 1 cell gap) for each individual
+    mosaic = np.full((n_indivs, n_y, n_time_bins * (n_x + 1) - 1), np.nan)
+    for i in range(n_time_bins):
+        mosaic[:, :, i * (n_x + 1) : i * (n_x + 1) + n_x] = occupancy_sec[i]
+    # Row height of 3 inches (widths are capped at 40 inches for many time bins)
+    ax_height = 3
+    ax_width = min(max(ax_height, ax_height * mosaic.shape[2] / max(n_y, 1)), 40)
+    fig, axes = plt.subplots(
+        nrows=n_indivs, ncols=1, figsize=(ax_width, ax_height * n_indivs), squeeze=False, layout="constrained"
+    )
+    for j, indiv in enumerate(indivs):
+        ax = axes[j, 0]
+        img = ax.imshow(mosaic[j], cmap="viridis", interpolation="nearest", aspect="equal")
+        ax.set_title(indiv)
+        ax.set_xticks(np.arange(n_time_bins) * (n_x + 1) + (n_x - 1) / 2)
+        ax.set_xticklabels([f"{label:g}" for label in bin_labels], rotation=90)
+        ax.set_xlabel("bin_sec")
+        ax.set_yticks([])
+        ax.grid(False)
+        fig.colorbar(img, ax=ax, label="sec")
+    return fig
+
+
+def remove_short_runs_arr(arr: np.ndarray, min_frames: int) -> np.ndarray:
+    """
+    Sets runs (i.e. bouts) of True values shorter than `min_frames` to False,
+    in each column of a (frames, columns) bool array.
+
+    All columns are filtered in one pass: as in `BoutArray.from_arr`, the columns are concatenated
+    (each followed by a False separator, so runs do not span columns) and run-length encoded at once.
+    """
+    n_frames, n_cols = arr.shape
+    padded = np.zeros((n_frames + 1, n_cols), dtype=bool)
+    padded[:n_frames] = arr
+    bouts = BoutArray.from_vect(padded.ravel(order="F")).filter_dur(min_frames)
+    return bouts.to_vect(padded.size).reshape(padded.shape, order="F")[:n_frames]
+
+
+def pts_in_polygons(pts: np.ndarray, polygons: list[np.ndarray], block_frames: int = 2**16) -> np.ndarray:
+    """
+    Determines whether each point is in its polygon with (vectorised) ray casting.
+    Gives identical results to `pt_in_roi` (the same arithmetic is done for each edge).
+
+    Parameters
+    ----------
+    pts : np.ndarray
+        `(frames, polygons, points, 2)` array of the (x, y) coordinates of the points
+        to test with each polygon (e.g. each individual's body centre for each ROI).
+    polygons : list[np.ndarray]
+        List of `(corners, 2)` arrays of each polygon's (x, y) corners (in order).
+        Polygons can have different numbers of corners.
+    block_frames : int
+        Number of frames processed at a time (bounds the memory use).
+
+    Returns
+    -------
+    np.ndarray
+        `(frames, polygons, points)` bool array. NaN points are not in the polygon.
+    """
+    n_polygons = len(polygons)
+    n_edges = max((corners.shape[0] for corners in polygons), default=0)
+    # Getting (c1 -> c2) edges of each polygon (looping back to the first corner),
+    # padded with zero-length edges (which are never crossed)
+    c1 = np.zeros((n_polygons, n_edges, 2))
+    c2 = np.zeros((n_polygons, n_edges, 2))
+    for i, corners in enumerate(polygons):
+        c1[i, : corners.shape[0]] = corners
+        c2[i, : corners.shape[0]] = np.roll(corners, -1, axis=0)
+    # Broadcasting edges to (frames, polygons, points, edges)
+    c1_x, c1_y = c1[None, :, None, :, 0], c1[None, :, None, :, 1]
+    c2_x, c2_y = c2[None, :, None, :, 0], c2[None, :, None, :, 1]
+    in_polygon = np.zeros(pts.shape[:3], dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for start in range(0, pts.shape[0], block_frames):
+            pt_x = pts[start : start + block_frames, :, :, 0, None]
+            pt_y = pts[start : start + block_frames, :, :, 1, None]
+            # Getting whether point-y is between corners-y
+            y_between = (c1_y > pt_y) != (c2_y > pt_y)
+            # Getting whether point-x is to the left (less than) the intersection of corners-x
+            x_left_of = pt_x < (c2_x - c1_x) * (pt_y - c1_y) / (c2_y - c1_y) + c1_x
+            # Odd number of crossings means point is in region
+            crossings = np.count_nonzero(y_between & x_left_of, axis=-1)
+            in_polygon[start : start + block_frames] = crossings % 2 == 1
+    return in_polygon
 
 
 def pt_in_roi(pt: pd.Series, corners_df: pd.DataFrame, logger: logging.Logger) -> bool:
-    """__summary__"""
+    """
+    Determines whether the point is in the polygon with ray casting.
+    Refer to `pts_in_polygons` for the vectorised version (for many points and polygons).
+    """
     # Counting crossings over edge in region when point is translated to the right
     crossings = 0
     # To loop back to the first point at the end
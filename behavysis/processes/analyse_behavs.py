@@ -32,6 +32,7 @@ class AnalyseBehavs:
         # Calculating the deltas (changes in body position) between each frame for the subject
         configs = ExperimentConfigs.read_json(configs_fp)
         fps, _, _, _, bins_ls, cbins_ls = configs.get_analysis_configs()
+        bout_attribution = configs.get_ref(configs.user.analyse.bout_attribution)
         # Loading in dataframe
         behavs_df = BehavScoredDf.read(behavs_fp)
         # Setting all na and undetermined behav to non-behav
@@ -56,5 +57,6 @@ class AnalyseBehavs:
             fps,
             bins_ls,
             cbins_ls,
+            bout_attribution,
         )
         return get_io_obj_content(io_obj)
@@ -14,7 +14,10 @@ str
     The outcome of the process.
 """
 
+import functools
 import logging
+import os
+import warnings
 
 import numpy as np
 import pandas as pd
@@ -27,6 +30,8 @@ from behavysis.df_classes.keypoints_df import (
 from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
 from behavysis.utils.io_utils import get_name
 from behavysis.utils.logging_utils import get_io_obj_content, init_logger_io_obj
+from behavysis.utils.resource_cache import ResourceCache
+from behavysis.utils.rolling_utils import rolling_mean_arr
 
 
 class CalculateParams:
@@ -97,6 +102,7 @@ class CalculateParams:
         Also expects the csv_fp to be a csv file,
         where the first column is the name of the video and the second column
         is the start time.
+        The csv file is shared by all experiments, so is only read once (refer to `read_start_times_csv`).
 
         Notes
         -----
@@ -121,8 +127,7 @@ class CalculateParams:
         if name is None:
             name = get_name(keypoints_fp)
         # Reading csv_fp
-        start_times_df = pd.read_csv(csv_fp, index_col=0)
-        start_times_df.index = start_times_df.index.astype(str)
+        start_times_df = read_start_times_csv(csv_fp)
         assert name in start_times_df.index.values, (
             f"{name} not in {csv_fp}.\n"
             "Update the `name` parameter in the configs file or check the start_frames csv file."
@@ -284,6 +289,23 @@ class CalculateParams:
         return get_io_obj_content(io_obj)
 
 
+def read_start_times_csv(csv_fp: str) -> pd.DataFrame:
+    """
+    Reads the start times csv file (refer to `CalculateParams.start_frame_from_csv`),
+    with the video names index as str.
+
+    Within a `ResourceCache.session()`, the file is parsed once and cached,
+    so the returned df must not be modified.
+    """
+
+    def loader():
+        start_times_df = pd.read_csv(csv_fp, index_col=0)
+        start_times_df.index = start_times_df.index.astype(str)
+        return start_times_df
+
+    return ResourceCache.load(read_start_times_csv.__name__, csv_fp, loader)
+
+
 def calc_exists_from_likelihood(keypoints_fp: str, configs_fp: str, logger: logging.Logger) -> tuple[int, int]:
     """
     Determines the start and stop frames of the experiment based on
@@ -293,6 +315,9 @@ def calc_exists_from_likelihood(keypoints_fp: str, configs_fp: str, logger: logg
     existing in each frame across the sliding window is greater than the defined pcutoff, then
     the determine this as the start time.
 
+    The existence vector is cached (refer to `get_exists_vect`), so calling this for the
+    start frame, stop frame, and duration only reads and computes it once.
+
     Notes
     -----
     The config file must contain the following parameters:
@@ -315,25 +340,54 @@ def calc_exists_from_likelihood(keypoints_fp: str, configs_fp: str, logger: logg
     assert fps != -1, "fps not yet set. Please calculate fps first with `proj.get_vid_metadata`."
     # Deriving more parameters
     window_frames = int(np.round(fps * window_sec, 0))
+    # Getting bool of frames where ALL indivs exist
+    # (keyed by the file's modification time so an updated file is re-read)
+    mtime_ns = os.stat(keypoints_fp).st_mtime_ns
+    exists_vect = get_exists_vect(keypoints_fp, mtime_ns, tuple(bpts), window_frames, pcutoff)
+    assert np.any(exists_vect), "The subject was not detected in any frames. Please also check the video."
+    # Getting when subject first and last exists in video
+    start_frame = exists_vect.index[exists_vect][0]
+    stop_frame = exists_vect.index[exists_vect][-1]
+    logger.debug(f"Subject exists from frame {start_frame} to {stop_frame}.")
+    return start_frame, stop_frame
+
+
+@functools.lru_cache(maxsize=8)
+def get_exists_vect(
+    keypoints_fp: str,
+    mtime_ns: int,
+    bpts: tuple[str, ...],
+    window_frames: int,
+    pcutoff: float,
+) -> pd.Series:
+    """
+    Returns the bool series of frames where ALL individuals likely exist.
+
+    An individual's likelihood of existing in each frame is the median likelihood of `bpts`,
+    and it exists in a frame if the (centred) rolling mean of this over `window_frames`
+    is greater than `pcutoff`.
+
+    The result is cached by all parameters. `mtime_ns` is the keypoints file's modification time,
+    so the cache is invalidated when the file changes.
+    The returned series is shared between calls and must not be modified.
+    """
     # Loading dataframe
     keypoints_df = KeypointsDf.clean_headings(KeypointsDf.read(keypoints_fp))
     # Getting likehoods of subject (given bpts) existing in each frame
-    KeypointsDf.check_bpts_exist(keypoints_df, bpts)
-    idx = pd.IndexSlice
-    lhood_name = CoordsCols.LIKELIHOOD.value
-    lhood_df = pd.DataFrame(index=keypoints_df.index)
+    KeypointsDf.check_bpts_exist(keypoints_df, list(bpts))
     indivs, _ = KeypointsDf.get_indivs_bpts(keypoints_df)
-    for indiv in indivs:
-        # Calculating likelihood of subject existing at each frame from median
-        lhood_df[(indiv, "current")] = keypoints_df.loc[:, idx[indiv, bpts, lhood_name]].apply(np.nanmedian, axis=1)  # type: ignore
-        # Calculating likelihood of subject existing over time window
-        lhood_df[(indiv, "rolling")] = lhood_df[(indiv, "current")].rolling(window_frames, center=True).agg(np.nanmean)
-    lhood_df.columns = pd.MultiIndex.from_tuples(lhood_df.columns)
+    lhood_idx = keypoints_df.columns.get_indexer(
+        [(indiv, bpt, CoordsCols.LIKELIHOOD.value) for indiv in indivs for bpt in bpts]
+    )
+    # (frames, indivs, bpts) array of likelihoods
+    lhood_arr = keypoints_df.iloc[:, lhood_idx].to_numpy(dtype=np.float64).reshape(-1, len(indivs), len(bpts))
+    # Calculating likelihood of subject existing at each frame from median
+    # (all-NaN frames are NaN)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        current_arr = np.nanmedian(lhood_arr, axis=2)
+    # Calculating likelihood of subject existing over time window
+    rolling_arr = rolling_mean_arr(current_arr, window_frames, center=True)
     # Getting bool of frames where ALL indivs exist
-    idx = pd.IndexSlice
-    exists_vect = (lhood_df.loc[:, idx[:, "rolling"]] > pcutoff).all(axis=1)  # type: ignore
-    assert np.any(exists_vect), "The subject was not detected in any frames. Please also check the video."
-    # Getting when subject first and last exists in video
-    start_frame = lhood_df[exists_vect].index[0]
-    stop_frame = lhood_df[exists_vect].index[-1]
-    return start_frame, stop_frame
+    exists_vect = pd.Series((rolling_arr > pcutoff).all(axis=1), index=keypoints_df.index)
+    return exists_vect
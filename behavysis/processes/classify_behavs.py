@@ -11,13 +11,13 @@ import pandas as pd
 from behavysis.behav_classifier.behav_classifier import BehavClassifier
 from behavysis.df_classes.behav_df import (
     BehavPredictedDf,
-    BehavScoredDf,
     BehavValues,
-    BoutCols,
     OutcomesPredictedCols,
 )
 from behavysis.df_classes.features_df import FeaturesDf
+from behavysis.processes.rule_behavs import calc_rule_behavs
 from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
+from behavysis.utils.bout_array import BoutArray
 from behavysis.utils.diagnostics_utils import file_exists_msg
 from behavysis.utils.logging_utils import get_io_obj_content, init_logger_io_obj
 
@@ -33,10 +33,13 @@ class ClassifyBehavs:
         behavs_fp: str,
         configs_fp: str,
         overwrite: bool,
+        keypoints_fp: None | str = None,
     ) -> str:
         """
         Given model config files in the BehavClassifier format, generates beahviour predidctions
         on the given extracted features dataframe.
+        The rule behaviours in the configs (`user.rule_behavs`) are also detected from the
+        keypoints' analyses (refer to `rule_behavs.py`).
 
         Parameters
         ----------
@@ -48,6 +51,8 @@ class ClassifyBehavs:
             _description_
         overwrite : bool
             Whether to overwrite the output file (if it exists).
+        keypoints_fp : None | str
+            The preprocessed keypoints filepath (required for rule behaviours).
 
         Returns
         -------
@@ -63,6 +68,7 @@ class ClassifyBehavs:
                 - models: list[str]
         ```
         Where the `models` list is a list of `model_config.json` filepaths.
+        The features file is only read if there are models (i.e. rule behaviours do not need it).
         """
         logger, io_obj = init_logger_io_obj()
         if not overwrite and os.path.exists(behavs_fp):
@@ -72,8 +78,8 @@ class ClassifyBehavs:
         configs = ExperimentConfigs.read_json(configs_fp)
         fps = configs.auto.formatted_vid.fps
         model_configs_ls = configs.user.classify_behavs
-        # Getting features data
-        features_df = FeaturesDf.read(features_fp)
+        # Getting features data (only needed for the classifier models)
+        features_df = FeaturesDf.read(features_fp) if len(model_configs_ls) > 0 else None
         # Initialising y_preds df
         # Getting predictions for each classifier model and saving
         # in a list of pd.DataFrames
@@ -98,6 +104,11 @@ class ClassifyBehavs:
             behavs_df_ls.append(behav_df_i)
             # Logging outcome
             logger.info(f"Completed {behav_name} classification.")
+        # Getting predictions for the rule behaviours
+        if len(configs.user.rule_behavs) > 0:
+            assert keypoints_fp is not None, "keypoints_fp is required for rule behaviours."
+            behavs_df_ls.append(calc_rule_behavs(keypoints_fp, configs_fp))
+            logger.info("Completed rule behaviours detection.")
         # If no models were run, then return outcome
         if len(behavs_df_ls) == 0:
             return get_io_obj_content(io_obj)
@@ -149,10 +160,8 @@ def merge_bouts(vect: pd.Series, min_window_frames: int, logger: logging.Logger)
         A scored_behavs dataframe, with the merged bouts.
     """
     vect = vect.copy()
-    # Getting start, stop, and duration of each non-behav bout
-    nonbouts_df = BehavScoredDf.vect2bouts_df(vect == BehavValues.NON_BEHAV.value)
-    # For each non-behav bout, if less than min_window_frames, then call it a behav
-    for _, row in nonbouts_df.iterrows():
-        if row[BoutCols.DUR.value] < min_window_frames:
-            vect.loc[row[BoutCols.START.value] : row[BoutCols.STOP.value]] = BehavValues.BEHAV.value  # type: ignore
+    # Getting each non-behav bout that is less than min_window_frames
+    nonbouts = BoutArray.from_vect(vect == BehavValues.NON_BEHAV.value).filter_dur(max_dur=min_window_frames - 1)
+    # Calling them behav
+    vect[nonbouts.to_vect(vect.shape[0])] = BehavValues.BEHAV.value
     return vect
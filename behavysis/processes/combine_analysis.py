@@ -32,7 +32,12 @@ class CombineAnalysis:
             return get_io_obj_content(io_obj)
         name = get_name(configs_fp)
         # For each analysis subdir, combining fbf files
-        analysis_subdir_ls = [i for i in os.listdir(analysis_dir) if os.path.isdir(os.path.join(analysis_dir, i))]
+        # (subdirs without fbf files, e.g. `occupancy`, are skipped)
+        analysis_subdir_ls = [
+            i
+            for i in os.listdir(analysis_dir)
+            if os.path.isfile(os.path.join(analysis_dir, i, FBF, f"{name}.{AnalysisDf.IO}"))
+        ]
         # If no analysis files, then return warning and don't make df
         if len(analysis_subdir_ls) == 0:
             logger.warning("no analysis fbf files made. Run `exp.analyse` first")
@@ -30,12 +30,14 @@ import os
 
 import pandas as pd
 import seaborn as sns
+from matplotlib.figure import Figure
 
 from behavysis.df_classes.behav_df import BehavScoredDf
 from behavysis.df_classes.keypoints_df import CoordsCols, KeypointsDf
 from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
 from behavysis.utils.diagnostics_utils import file_exists_msg
 from behavysis.utils.io_utils import get_name
+from behavysis.utils.plot_service import PlotService, PlotSpec
 
 
 class Evaluate:
@@ -81,7 +83,16 @@ class Evaluate:
         )
         # Adding the timestamp column
         df["timestamp"] = df[KeypointsDf.IN.FRAME.value] / fps
-        # Making plot
+        # Making and saving plot
+        PlotService.render_active(PlotSpec(Evaluate.keypoints_plot_fig, dst_fp, df))
+        return ""
+
+    @staticmethod
+    def keypoints_plot_fig(df: pd.DataFrame) -> Figure:
+        """
+        Returns the likelihood line plot figure of the long-format keypoints df
+        (with a timestamp column). Rows are individuals and lines are bodyparts.
+        """
         g = sns.FacetGrid(
             df,
             row=KeypointsDf.CN.INDIVIDUALS.value,
@@ -96,10 +107,7 @@ class Evaluate:
             alpha=0.4,
         )
         g.add_legend()
-        # Saving plot
-        g.savefig(dst_fp)
-        g.figure.clf()
-        return ""
+        return g.figure
 
     ###############################################################################################
     # MAKE BEHAVIOUR PLOTS
@@ -140,7 +148,16 @@ class Evaluate:
         )
         # Adding the timestamp column
         df["timestamp"] = df[BehavScoredDf.IN.FRAME.value] / fps
-        # Making plot
+        # Making and saving plot
+        PlotService.render_active(PlotSpec(Evaluate.behav_plot_fig, dst_fp, df))
+        return ""
+
+    @staticmethod
+    def behav_plot_fig(df: pd.DataFrame) -> Figure:
+        """
+        Returns the line plot figure of the long-format scored behavs df
+        (with a timestamp column). Rows are behaviours and lines are outcomes.
+        """
         g = sns.FacetGrid(
             df,
             row=BehavScoredDf.CN.BEHAVS.value,
@@ -155,7 +172,4 @@ class Evaluate:
             alpha=0.4,
         )
         g.add_legend()
-        # Saving plot
-        g.savefig(dst_fp)
-        g.figure.clf()
-        return ""
+        return g.figure
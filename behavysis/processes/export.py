@@ -1,10 +1,16 @@
 import os
+import shutil
+
+import numpy as np
+import pandas as pd
 
 from behavysis.behav_classifier.behav_classifier import BehavClassifier
+from behavysis.constants import Folders
 from behavysis.df_classes.behav_df import (
     BehavPredictedDf,
     BehavScoredDf,
 )
+from behavysis.df_classes.keypoints_df import KeypointsDf
 from behavysis.pydantic_models.bouts import BoutStruct
 from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
 from behavysis.utils.df_mixin import DFMixin
@@ -19,14 +25,22 @@ class Export:
         src_fp: str,
         dst_fp: str,
         overwrite: bool,
+        chunk_frames: None | int = None,
     ) -> str:
-        """__summary__"""
+        """
+        Copies the df file.
+        If `chunk_frames` is specified, the df is read and written in chunks of `chunk_frames` rows
+        (only for parquet files).
+        """
         logger, io_obj = init_logger_io_obj()
         if not overwrite and os.path.exists(dst_fp):
             logger.warning(file_exists_msg(dst_fp))
             return get_io_obj_content(io_obj)
-        df = DFMixin.read(src_fp)
-        DFMixin.write(df, dst_fp)
+        if chunk_frames is None:
+            df = DFMixin.read(src_fp)
+            DFMixin.write(df, dst_fp)
+        else:
+            DFMixin.write_parquet_chunks(DFMixin.iter_parquet(src_fp, chunk_frames), dst_fp)
         logger.info("df to df")
         return get_io_obj_content(io_obj)
 
@@ -47,6 +61,67 @@ class Export:
         logger.info("exported df to csv")
         return get_io_obj_content(io_obj)
 
+    @classmethod
+    def experiment2preview(
+        cls,
+        keypoints_fp: str,
+        configs_fp: str,
+        formatted_vid_fp: str,
+        preview_dir: str,
+        preview_sec: float,
+        offset_sec: float,
+        overwrite: bool,
+    ) -> str:
+        """
+        Makes a preview of the experiment in `preview_dir` (with the same folder structure as a project),
+        with the keypoints truncated to `preview_sec` seconds from `offset_sec` seconds after `start_frame`
+        (or after the first frame if `start_frame` is not calculated).
+
+        The configs are copied with `stop_frame` set to the preview's last frame, so the pipeline
+        (e.g. `Preprocess.start_stop_trim`) runs on the same window.
+        The keypoints frame numbers are kept, so the formatted video is linked (not copied).
+        Only the keypoints file's chunks up to the preview's last frame are read.
+        """
+        logger, io_obj = init_logger_io_obj()
+        name = os.path.basename(keypoints_fp)
+        preview_keypoints_fp = os.path.join(preview_dir, Folders.KEYPOINTS.value, name)
+        if not overwrite and os.path.exists(preview_keypoints_fp):
+            logger.warning(file_exists_msg(preview_keypoints_fp))
+            return get_io_obj_content(io_obj)
+        # Getting the preview's frames window
+        configs = ExperimentConfigs.read_json(configs_fp)
+        fps = configs.auto.formatted_vid.fps
+        assert fps > 0, "The formatted video's fps is not in the configs. Please run `get_vid_metadata` first."
+        start_frame = max(configs.auto.start_frame, 0) + int(np.round(offset_sec * fps))
+        stop_frame = start_frame + int(np.round(preview_sec * fps)) - 1
+        if configs.auto.stop_frame >= 0:
+            stop_frame = min(stop_frame, configs.auto.stop_frame)
+        # Reading the keypoints chunks up to the preview's last frame
+        chunk_frames = max(stop_frame - start_frame + 1, 1)
+        keypoints_df_ls = []
+        for keypoints_df in KeypointsDf.iter_parquet(keypoints_fp, chunk_frames):
+            keypoints_df_ls.append(keypoints_df.loc[start_frame:stop_frame])
+            if keypoints_df.shape[0] > 0 and keypoints_df.index[-1] >= stop_frame:
+                break
+        keypoints_df = pd.concat(keypoints_df_ls)
+        assert keypoints_df.shape[0] > 0, f"No keypoints frames between frames {start_frame} and {stop_frame}."
+        KeypointsDf.write(keypoints_df, preview_keypoints_fp)
+        # Writing the preview configs
+        configs.auto.stop_frame = stop_frame
+        configs.write_json(os.path.join(preview_dir, Folders.CONFIGS.value, os.path.basename(configs_fp)))
+        # Linking the formatted video (copying if links are not supported)
+        if os.path.isfile(formatted_vid_fp):
+            preview_vid_fp = os.path.join(preview_dir, Folders.FORMATTED_VID.value, os.path.basename(formatted_vid_fp))
+            os.makedirs(os.path.dirname(preview_vid_fp), exist_ok=True)
+            if os.path.lexists(preview_vid_fp):
+                os.remove(preview_vid_fp)
+            try:
+                os.symlink(os.path.abspath(formatted_vid_fp), preview_vid_fp)
+            except OSError:
+                shutil.copyfile(formatted_vid_fp, preview_vid_fp)
+        logger.info(f"experiment to preview (frames {start_frame} to {stop_frame}).")
+        return get_io_obj_content(io_obj)
+
     @classmethod
     def predictedbehavs2scoredbehavs(
         cls,
@@ -78,6 +153,11 @@ class Export:
             BehavClassifier.load(proj_dir, behav_name)
             # Adding to bouts_struct
             bouts_struct.append(BoutStruct(behav=behav_name, user_defined=user_defined))
+        # Adding the rule behaviours to bouts_struct
+        for rule_config in configs.user.rule_behavs:
+            behav_name = configs.get_ref(rule_config.behav_name)
+            user_defined = configs.get_ref(rule_config.user_defined)
+            bouts_struct.append(BoutStruct(behav=behav_name, user_defined=user_defined))
         # Getting scored behavs df from predicted behavs df and bouts_struct
         behavs_predicted_df = BehavPredictedDf.read(src_fp)
         behavs_scored_df = BehavScoredDf.predicted2scored(behavs_predicted_df, bouts_struct)
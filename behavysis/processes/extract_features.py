@@ -83,7 +83,7 @@ class ExtractFeatures:
         # Saving keypoints index to use in the SimBA features extraction df
         index = keypoints_df.index
         # Need to remove index name for SimBA to import correctly
-        keypoints_df.index.name = None
+        keypoints_df = keypoints_df.rename_axis(index=None)
         # Saving as csv
         keypoints_df.to_csv(simba_in_fp)
         # Running SimBA env and script to run SimBA feature extraction
@@ -26,6 +26,7 @@ import cv2
 from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
 from behavysis.pydantic_models.processes.format_vid import VidMetadata
 from behavysis.utils.diagnostics_utils import file_exists_msg
+from behavysis.utils.experiment_context import ExperimentContext
 from behavysis.utils.logging_utils import get_io_obj_content, init_logger_console, init_logger_io_obj
 from behavysis.utils.subproc_utils import run_subproc_console
 
@@ -197,15 +198,23 @@ def get_vid_metadata(vid_fp: str, logger: logging.Logger) -> VidMetadata:
     -------
     VidMetadata
         Object containing video metadata.
+
+    Notes
+    -----
+    If there is an active `ExperimentContext`, the video is only opened once.
     """
-    configs_meta = VidMetadata()
-    cap = cv2.VideoCapture(vid_fp)
-    if not cap.isOpened():
-        logger.warning(f"The file, {vid_fp}, does not exist or is corrupted. Please check this file.")
-    else:
-        configs_meta.height_px = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        configs_meta.width_px = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        configs_meta.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        configs_meta.fps = cap.get(cv2.CAP_PROP_FPS)
-    cap.release()
-    return configs_meta
+
+    def loader():
+        configs_meta = VidMetadata()
+        cap = cv2.VideoCapture(vid_fp)
+        if not cap.isOpened():
+            logger.warning(f"The file, {vid_fp}, does not exist or is corrupted. Please check this file.")
+        else:
+            configs_meta.height_px = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            configs_meta.width_px = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            configs_meta.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            configs_meta.fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        return configs_meta
+
+    return ExperimentContext.load_active(VidMetadata, vid_fp, loader)
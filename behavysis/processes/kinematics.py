@@ -0,0 +1,179 @@
+"""
+Shared kinematics of the individuals in an experiment.
+
+The smoothed bodypart positions, velocities, speeds, and centroids of each individual
+are computed once per (bodyparts, smoothing window), and reused by the analyses
+that need them (e.g. `Analyse.speed`, `Analyse.social_distance`, and `Analyse.freezing`).
+
+Pairwise measures (e.g. distances between individuals) are computed for all pairs of
+individuals at once (refer to `pairwise_min_dists`).
+
+While an `ExperimentContext` is active, the kinematics are cached with the
+experiment's keypoints file (and recomputed if the file changes).
+The kinematics' arrays are read-only, so the cached kinematics are shared (not copied).
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from behavysis.df_classes.keypoints_df import CoordsCols, KeypointsDf
+from behavysis.utils.experiment_context import ExperimentContext
+from behavysis.utils.rolling_utils import rolling_mean_arr
+
+
+class Kinematics:
+    """
+    Kinematics of each individual's bodyparts (in pixels and frames).
+
+    The arrays are read-only.
+
+    Attributes
+    ----------
+    index : pd.Index
+        The frames index.
+    indivs : list[str]
+        The individuals.
+    bpts : list[str]
+        The bodyparts.
+    positions : np.ndarray
+        `(frames, indivs, bpts, 2)` array of the smoothed (x, y) positions.
+    velocities : np.ndarray
+        `(frames, indivs, bpts, 2)` array of the (x, y) changes from the previous frame
+        (the first frame is NaN).
+    speeds : np.ndarray
+        `(frames, indivs, bpts)` array of the distances moved from the previous frame.
+    centroids : np.ndarray
+        `(frames, indivs, 2)` array of the mean (x, y) position of the bodyparts
+        (ignoring NaN bodyparts).
+    centroid_velocities : np.ndarray
+        `(frames, indivs, 2)` array of the centroids' (x, y) changes from the previous frame.
+    centroid_speeds : np.ndarray
+        `(frames, indivs)` array of the centroids' distances moved from the previous frame.
+    """
+
+    def __init__(self, keypoints_df: pd.DataFrame, bpts: list[str], smoothing_frames: int) -> None:
+        """
+        Computes the kinematics from the (clean headings) keypoints df.
+
+        Each bodypart's position is smoothed with a centred rolling mean of `smoothing_frames`
+        (ignoring NaN values). A `smoothing_frames` of 1 or less is no smoothing.
+        """
+        KeypointsDf.check_bpts_exist(keypoints_df, bpts)
+        self.index = keypoints_df.index
+        self.indivs, _ = KeypointsDf.get_indivs_bpts(keypoints_df)
+        self.bpts = list(bpts)
+        # Getting (frames, indivs, bpts, 2) array of positions
+        coords = [CoordsCols.X.value, CoordsCols.Y.value]
+        cols_idx = keypoints_df.columns.get_indexer(
+            [(indiv, bpt, coord) for indiv in self.indivs for bpt in self.bpts for coord in coords]
+        )
+        arr = keypoints_df.iloc[:, cols_idx].to_numpy(dtype=np.float64)
+        # Smoothing positions (reduces jitter contributing to movement)
+        if smoothing_frames > 1:
+            arr = rolling_mean_arr(arr, smoothing_frames, min_periods=1, center=True)
+        self.positions = arr.reshape(-1, len(self.indivs), len(self.bpts), 2)
+        # Getting bodypart velocities and speeds
+        self.velocities = diff_arr(self.positions)
+        self.speeds = np.sqrt(np.sum(np.power(self.velocities, 2), axis=-1))
+        # Getting centroids (ignoring NaN bodyparts) and their velocities and speeds
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            self.centroids = np.nanmean(self.positions, axis=2)
+        self.centroid_velocities = diff_arr(self.centroids)
+        self.centroid_speeds = np.sqrt(np.sum(np.power(self.centroid_velocities, 2), axis=-1))
+        # Making arrays read-only (so the kinematics can be shared)
+        for arr in (
+            self.positions,
+            self.velocities,
+            self.speeds,
+            self.centroids,
+            self.centroid_velocities,
+            self.centroid_speeds,
+        ):
+            arr.flags.writeable = False
+
+    @classmethod
+    def load(cls, keypoints_fp: str, bpts: list[str], smoothing_frames: int) -> "Kinematics":
+        """
+        Returns the kinematics of the keypoints file.
+
+        The kinematics are cached in the active `ExperimentContext` (if there is one)
+        by bodyparts and smoothing window, so are computed once per experiment.
+        """
+        return ExperimentContext.load_active(
+            (cls.__name__, tuple(bpts), smoothing_frames),
+            keypoints_fp,
+            lambda: cls(KeypointsDf.clean_headings(KeypointsDf.read(keypoints_fp)), bpts, smoothing_frames),
+            shared=True,
+        )
+
+    @classmethod
+    def load_pairwise_min_dists(cls, keypoints_fp: str, bpts: list[str]) -> tuple[np.ndarray, list[tuple[str, str]]]:
+        """
+        Returns the `(frames, pairs)` minimum distances between each pair's (unsmoothed) bodyparts
+        (refer to `pairwise_min_dists`), and the pairs.
+
+        The distances are cached in the active `ExperimentContext` (if there is one) by bodyparts.
+        """
+
+        def loader():
+            kinematics = cls.load(keypoints_fp, bpts, 1)
+            return pairwise_min_dists(kinematics.positions), kinematics.get_pairs()
+
+        return ExperimentContext.load_active((pairwise_min_dists.__name__, tuple(bpts)), keypoints_fp, loader)
+
+    def get_pairs(self) -> list[tuple[str, str]]:
+        """Returns the (a, b) individuals of each pair (in the order of `pairwise_min_dists`)."""
+        a_idx, b_idx = get_pairs_idx(len(self.indivs))
+        return [(self.indivs[a], self.indivs[b]) for a, b in zip(a_idx, b_idx)]
+
+
+def diff_arr(arr: np.ndarray) -> np.ndarray:
+    """Difference from the previous row along the first axis (the first row is NaN)."""
+    out = np.full(arr.shape, np.nan)
+    out[1:] = arr[1:] - arr[:-1]
+    return out
+
+
+def get_pairs_idx(n_indivs: int) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the indexes of the (a, b) individuals of each pair (with a before b)."""
+    return np.triu_indices(n_indivs, k=1)
+
+
+def pairwise_min_dists(positions: np.ndarray, block_size: int = 2**16) -> np.ndarray:
+    """
+    Returns the minimum distance between the points of each pair of individuals in each frame.
+
+    All pairs (and point pairs) are computed with one broadcasted operation for each block of frames.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        `(frames, indivs, points, 2)` array of the (x, y) positions of each individual's points
+        (e.g. `Kinematics.positions`, or `Kinematics.centroids[:, :, None]` for centroid distances).
+    block_size : int
+        Maximum number of point-pair distances computed at a time (bounds the memory use).
+
+    Returns
+    -------
+    np.ndarray
+        `(frames, pairs)` array of the distances (in the order of `get_pairs_idx`).
+        NaN points are ignored (and the distance is NaN if all point pairs are NaN).
+    """
+    n_frames, n_indivs, n_pts, _ = positions.shape
+    a_idx, b_idx = get_pairs_idx(n_indivs)
+    n_pairs = a_idx.shape[0]
+    block_frames = max(1, block_size // max(1, n_pairs * n_pts * n_pts))
+    out = np.full((n_frames, n_pairs), np.nan)
+    for start in range(0, n_frames, block_frames):
+        block_a = positions[start : start + block_frames, a_idx]
+        block_b = positions[start : start + block_frames, b_idx]
+        # Getting (frames, pairs, points_a * points_b) squared distances between each point pair
+        delta_x = block_a[:, :, :, None, 0] - block_b[:, :, None, :, 0]
+        delta_y = block_a[:, :, :, None, 1] - block_b[:, :, None, :, 1]
+        sq_dists = (delta_x * delta_x + delta_y * delta_y).reshape(block_a.shape[0], n_pairs, -1)
+        # Getting minimum distance (fmin ignores NaN point pairs)
+        out[start : start + block_frames] = np.sqrt(np.fmin.reduce(sq_dists, axis=-1))
+    return out
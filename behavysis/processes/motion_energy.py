@@ -0,0 +1,150 @@
+"""
+Pixel motion energy of an experiment's video.
+
+Frames are streamed (one at a time) from the video, converted to greyscale, and downsampled
+by `scale`. Each sampled frame is compared to the previous sampled frame, and the motion energy
+is the mean absolute difference of their pixels (in greyscale levels, 0 to 255):
+
+- over the whole frame,
+- in each region mask (e.g. ROIs), and
+- in each box (e.g. around each individual's keypoints), which can change each frame.
+
+Box means are computed from the integral image of each difference image, so the cost
+does not depend on the number or size of the boxes.
+
+The sampled frames can be split into contiguous segments that are decoded in parallel
+(each segment seeks to its first frame). Frames between sampled frames are grabbed
+but not retrieved (i.e. not converted or compared).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+def motion_energy_arr(
+    vid_fp: str,
+    frames: np.ndarray,
+    scale: float,
+    masks: None | np.ndarray = None,
+    boxes: None | np.ndarray = None,
+    n_workers: int = 1,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the motion energy of each sampled frame (compared to the previous sampled frame).
+
+    Parameters
+    ----------
+    vid_fp : str
+        The video filepath.
+    frames : np.ndarray
+        `(samples,)` array of the (increasing) video frame numbers to sample.
+    scale : float
+        The downsampling factor of the frames (e.g. 0.25 is a quarter of the width and height).
+    masks : None | np.ndarray
+        `(masks, height, width)` bool array of the regions (at the downsampled size),
+        e.g. from `get_downsampled_size`.
+    boxes : None | np.ndarray
+        `(samples, boxes, 4)` array of the (x_min, y_min, x_max, y_max) pixel coordinates
+        (at the video's size) of the boxes in each sampled frame. NaN boxes have NaN energy.
+    n_workers : int
+        The number of segments decoded in parallel.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        The `(samples,)` whole frame energy, `(samples, masks)` mask energies, and
+        `(samples, boxes)` box energies. The first sample, and samples after the end
+        of the video, are NaN.
+    """
+    frames = np.asarray(frames, dtype=np.int64)
+    n_samples = frames.shape[0]
+    masks = np.zeros((0, 0, 0), dtype=bool) if masks is None else masks
+    boxes = np.zeros((n_samples, 0, 4)) if boxes is None else boxes
+    frame_energy = np.full(n_samples, np.nan)
+    mask_energy = np.full((n_samples, masks.shape[0]), np.nan)
+    box_energy = np.full((n_samples, boxes.shape[1]), np.nan)
+    # Splitting samples into segments (each segment also decodes the previous segment's last sample)
+    n_segments = int(np.clip(n_workers, 1, max(1, n_samples // 2)))
+    bounds = np.linspace(0, n_samples, n_segments + 1).astype(np.int64)
+    segments = [(max(0, start - 1), stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def run_segment(segment: tuple[int, int]) -> None:
+        start, stop = segment
+        energies = _motion_energy_segment(vid_fp, frames[start:stop], scale, masks, boxes[start:stop])
+        # The segment's first sample has no previous sample (it is computed by the previous segment)
+        frame_energy[start + 1 : stop] = energies[0][1:]
+        mask_energy[start + 1 : stop] = energies[1][1:]
+        box_energy[start + 1 : stop] = energies[2][1:]
+
+    with ThreadPoolExecutor(max_workers=n_segments) as executor:
+        list(executor.map(run_segment, segments))
+    return frame_energy, mask_energy, box_energy
+
+
+def _motion_energy_segment(
+    vid_fp: str,
+    frames: np.ndarray,
+    scale: float,
+    masks: np.ndarray,
+    boxes: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the motion energies of consecutive samples (refer to `motion_energy_arr`)."""
+    n_samples = frames.shape[0]
+    frame_energy = np.full(n_samples, np.nan)
+    mask_energy = np.full((n_samples, masks.shape[0]), np.nan)
+    box_energy = np.full((n_samples, boxes.shape[1]), np.nan)
+    if n_samples == 0:
+        return frame_energy, mask_energy, box_energy
+    cap = cv2.VideoCapture(vid_fp)
+    assert cap.isOpened(), f"The video, {vid_fp}, does not exist or is corrupted."
+    width, height = get_downsampled_size(
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), scale
+    )
+    masks_u8 = [mask.astype(np.uint8) for mask in masks]
+    # Getting each box's (downsampled) pixel bounds and area
+    with np.errstate(invalid="ignore"):
+        x0 = np.clip(np.floor(boxes[..., 0] * scale), 0, width)
+        y0 = np.clip(np.floor(boxes[..., 1] * scale), 0, height)
+        x1 = np.clip(np.ceil(boxes[..., 2] * scale), 0, width)
+        y1 = np.clip(np.ceil(boxes[..., 3] * scale), 0, height)
+        areas = (x1 - x0) * (y1 - y0)
+        is_valid = np.isfinite(areas) & (areas > 0)
+    x0, y0, x1, y1 = (np.where(is_valid, i, 0).astype(np.int64) for i in (x0, y0, x1, y1))
+    # Seeking to the segment's first frame
+    cap.set(cv2.CAP_PROP_POS_FRAMES, int(frames[0]))
+    pos = int(frames[0])
+    prev = None
+    for i, frame_num in enumerate(frames):
+        # Grabbing (without retrieving) the frames between samples
+        is_read = True
+        while pos < frame_num and is_read:
+            is_read = cap.grab()
+            pos += 1
+        is_read, frame = cap.read() if is_read else (False, None)
+        pos += 1
+        if not is_read:
+            break
+        # Getting the downsampled greyscale frame
+        grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        curr = cv2.resize(grey, (width, height), interpolation=cv2.INTER_AREA)
+        if prev is not None:
+            diff = cv2.absdiff(curr, prev)
+            frame_energy[i] = cv2.mean(diff)[0]
+            for j, mask in enumerate(masks_u8):
+                mask_energy[i, j] = cv2.mean(diff, mask=mask)[0] if mask.any() else np.nan
+            if boxes.shape[1] > 0:
+                # Getting box sums from the integral image
+                integral = cv2.integral(diff, sdepth=cv2.CV_64F)
+                sums = integral[y1[i], x1[i]] - integral[y0[i], x1[i]] - integral[y1[i], x0[i]] + integral[y0[i], x0[i]]
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    box_energy[i] = np.where(is_valid[i], sums / areas[i], np.nan)
+        prev = curr
+    cap.release()
+    return frame_energy, mask_energy, box_energy
+
+
+def get_downsampled_size(width_px: int, height_px: int, scale: float) -> tuple[int, int]:
+    """Returns the (width, height) of the frames downsampled by `scale` (at least 1 pixel)."""
+    return max(1, int(round(width_px * scale))), max(1, int(round(height_px * scale)))
@@ -21,22 +21,40 @@ str
 
 import logging
 import os
+import warnings
+from typing import Callable, Iterable, Iterator
 
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import correlate1d
 
 from behavysis.df_classes.keypoints_df import (
     CoordsCols,
+    FlagCols,
     IndivCols,
     KeypointsDf,
 )
 from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
 from behavysis.utils.diagnostics_utils import file_exists_msg
 from behavysis.utils.logging_utils import get_io_obj_content, init_logger_io_obj
+from behavysis.utils.misc_utils import enum2list
+from behavysis.utils.rolling_utils import rolling_majority_arr
+
+GAP_FLAG = FlagCols.GAP.value
 
 
 class Preprocess:
-    """_summary_"""
+    """
+    Keypoints preprocessing functions.
+
+    If `user.preprocess.chunk_frames` is set in the configs, each function streams the keypoints
+    file in chunks of `chunk_frames` frames (reading and writing chunked parquet), so peak memory
+    is proportional to the chunk size rather than the recording length.
+    Each chunk is processed with a halo of extra frames on each side (sized from the function's
+    window), so the results are identical to the in-memory path.
+    Refer to `map_keypoints` for details.
+    """
 
     @classmethod
     def start_stop_trim(cls, src_fp: str, dst_fp: str, configs_fp: str, overwrite: bool) -> str:
@@ -80,11 +98,16 @@ class Preprocess:
         configs = ExperimentConfigs.read_json(configs_fp)
         start_frame = configs.auto.start_frame
         stop_frame = configs.auto.stop_frame
-        # Reading file
-        keypoints_df = KeypointsDf.read(src_fp)
+        chunk_frames = configs.get_ref(configs.user.preprocess.chunk_frames)
         # Trimming dataframe between start and stop frames
-        keypoints_df = keypoints_df.loc[start_frame:stop_frame, :]
-        KeypointsDf.write(keypoints_df, dst_fp)
+        map_keypoints(
+            src_fp,
+            dst_fp,
+            lambda df, *_: df.loc[start_frame:stop_frame, :],
+            0,
+            chunk_frames,
+            logger,
+        )
         return get_io_obj_content(io_obj)
 
     @classmethod
@@ -123,12 +146,23 @@ class Preprocess:
             raise ValueError(
                 "Width and height must be provided in the formatted video. Try running FormatVid.format_vid."
             )
-        # Reading file
-        keypoints_df = KeypointsDf.read(src_fp)
+        chunk_frames = configs.get_ref(configs.user.preprocess.chunk_frames)
         # Getting the scorer name
-        scorer = keypoints_df.columns.unique(KeypointsDf.CN.SCORER.value)[0]
-        # For each bodypart, filling in the given point
-        for configs_filt in configs_filt_ls:
+        scorer = read_keypoints_head(src_fp).columns.unique(KeypointsDf.CN.SCORER.value)[0]
+        # Getting the number of frames each bodypart is detected in (only reading the likelihood columns)
+        lhood_cols = [
+            (scorer, IndivCols.SINGLE.value, configs_filt.bodypart, CoordsCols.LIKELIHOOD.value)
+            for configs_filt in configs_filt_ls
+        ]
+        pcutoffs = np.array([configs_filt.pcutoff for configs_filt in configs_filt_ls])
+        n_detected = np.zeros(len(configs_filt_ls))
+        n_frames = 0
+        for lhood_df in iter_keypoints(src_fp, chunk_frames, lhood_cols):
+            n_detected += np.sum(lhood_df.loc[:, lhood_cols].to_numpy() >= pcutoffs, axis=0)
+            n_frames += lhood_df.shape[0]
+        # For each bodypart, getting the given point to fill in
+        fill_ls = []
+        for configs_filt, n_detected_i in zip(configs_filt_ls, n_detected):
             # Getting config parameters
             bodypart = configs_filt.bodypart
             pcutoff = configs_filt.pcutoff
@@ -138,13 +172,11 @@ class Preprocess:
             # Converting x and y from video proportions to pixel coordinates
             x = x * width_px
             y = y * height_px
-            # Getting "is_detected" for each frame for the bodypart
-            is_detected = keypoints_df[(scorer, "single", bodypart, CoordsCols.LIKELIHOOD.value)] >= pcutoff
+            # Getting the proportion of frames the bodypart is detected in
+            detected_prop = n_detected_i / n_frames if n_frames > 0 else np.nan
             # If the bodypart is detected in less than the given proportion of the video, then set the x and y coordinates to the given values
-            if is_detected.mean() < pcutoff_all:
-                keypoints_df[(scorer, "single", bodypart, CoordsCols.X.value)] = x
-                keypoints_df[(scorer, "single", bodypart, CoordsCols.Y.value)] = y
-                keypoints_df[(scorer, "single", bodypart, CoordsCols.LIKELIHOOD.value)] = pcutoff
+            if detected_prop < pcutoff_all:
+                fill_ls.append((bodypart, x, y, pcutoff))
                 logger.info(
                     f"{bodypart} is detected in less than {pcutoff_all} of the video."
                     f" Setting x and y coordinates to ({x}, {y})."
@@ -154,8 +186,87 @@ class Preprocess:
                     f"{bodypart} is detected in more than {pcutoff_all} of the video."
                     " No need for stationary interpolation."
                 )
-        # Saving
-        KeypointsDf.write(keypoints_df, dst_fp)
+
+        def _fill_stationary(keypoints_df: pd.DataFrame, *_) -> pd.DataFrame:
+            keypoints_df = keypoints_df.copy()
+            for bodypart, x, y, pcutoff in fill_ls:
+                keypoints_df[(scorer, IndivCols.SINGLE.value, bodypart, CoordsCols.X.value)] = x
+                keypoints_df[(scorer, IndivCols.SINGLE.value, bodypart, CoordsCols.Y.value)] = y
+                keypoints_df[(scorer, IndivCols.SINGLE.value, bodypart, CoordsCols.LIKELIHOOD.value)] = pcutoff
+            return keypoints_df
+
+        # Filling in the stationary points and saving
+        map_keypoints(src_fp, dst_fp, _fill_stationary, 0, chunk_frames, logger)
+        return get_io_obj_content(io_obj)
+
+    @classmethod
+    def remove_outliers(cls, src_fp: str, dst_fp: str, configs_fp: str, overwrite: bool) -> str:
+        """
+        Removes physically implausible points, by setting their x and y coordinates to NaN
+        and their likelihood to 0 (so `Preprocess.interpolate` fills them afterwards).
+
+        A point (with likelihood above `pcutoff`) is an outlier if:
+        - Its speeds from the previous frame and to the next frame are both above `max_speed_mm_per_sec`
+          (i.e. it jumps away and comes back, so only the spiked frame is removed).
+          A single implausible step (e.g. a real relocation) is kept.
+        - It is further than `max_body_length_mult` body lengths from the individual's centroid
+          (median of the individual's bodyparts).
+          The body length of each individual is the `body_length_percentile` percentile of the
+          distance between the two `body_length_bodyparts` across the experiment.
+          Only checked for animal individuals (not the "single" individual).
+
+        Each check is skipped if its threshold is None.
+
+        Notes
+        -----
+        The config file must contain the following parameters:
+        ```
+        - user
+            - preprocess
+                - remove_outliers
+                    - pcutoff: float
+                    - max_speed_mm_per_sec: None | float
+                    - body_length_bodyparts: list[str] (2 bodyparts)
+                    - body_length_percentile: float (between 0 and 100)
+                    - max_body_length_mult: None | float
+        ```
+        """
+        logger, io_obj = init_logger_io_obj()
+        if not overwrite and os.path.exists(dst_fp):
+            logger.warning(file_exists_msg(dst_fp))
+            return get_io_obj_content(io_obj)
+        # Getting necessary config parameters
+        configs = ExperimentConfigs.read_json(configs_fp)
+        configs_filt = configs.user.preprocess.remove_outliers
+        pcutoff = configs.get_ref(configs_filt.pcutoff)
+        max_speed_mm_per_sec = configs.get_ref(configs_filt.max_speed_mm_per_sec)
+        bl_bpts = configs.get_ref(configs_filt.body_length_bodyparts)
+        bl_percentile = configs.get_ref(configs_filt.body_length_percentile)
+        max_bl_mult = configs.get_ref(configs_filt.max_body_length_mult)
+        fps = configs.auto.formatted_vid.fps
+        px_per_mm = configs.auto.px_per_mm
+        chunk_frames = configs.get_ref(configs.user.preprocess.chunk_frames)
+        # Calculating more parameters
+        max_jump_px = None if max_speed_mm_per_sec is None else max_speed_mm_per_sec * px_per_mm / fps
+        # Estimating the body length of each individual (only reading the body length bodyparts columns)
+        body_lengths = None
+        if max_bl_mult is not None:
+            head_df = read_keypoints_head(src_fp)
+            KeypointsDf.check_bpts_exist(head_df, bl_bpts)
+            scorer = head_df.columns.unique(KeypointsDf.CN.SCORER.value)[0]
+            indivs, _ = KeypointsDf.get_indivs_bpts(head_df)
+            bl_cols = [(scorer, i, b, c) for i in indivs for b in bl_bpts for c in enum2list(CoordsCols)]
+            bl_dfs = iter_keypoints(src_fp, chunk_frames, bl_cols)
+            body_lengths = get_body_lengths(bl_dfs, bl_bpts, pcutoff, bl_percentile, logger)
+        # Removing outliers (jumps are checked with the neighbouring frames)
+        map_keypoints(
+            src_fp,
+            dst_fp,
+            lambda df, *_: remove_outliers_df(df, pcutoff, max_jump_px, body_lengths, max_bl_mult, logger),
+            1,
+            chunk_frames,
+            logger,
+        )
         return get_io_obj_content(io_obj)
 
     @classmethod
@@ -166,6 +277,12 @@ class Preprocess:
         does this by linearly interpolating the frames of a body part that are below a given
         likelihood pcutoff.
 
+        All bodyparts are masked and interpolated along the frames axis in one array operation.
+        Gaps longer than `max_gap_frames` are not bridged and stay NaN
+        (if `max_gap_frames` is None, all gaps are filled).
+        If `flag_gaps` is True, a `gap` column is added (under the `processed` individual)
+        for each bodypart, marking the frames that were left unfilled.
+
         Notes
         -----
         The config file must contain the following parameters:
@@ -174,6 +291,8 @@ class Preprocess:
             - preprocess
                 - interpolate
                     - pcutoff: float
+                    - max_gap_frames: None | int
+                    - flag_gaps: bool
         ```
         """
         logger, io_obj = init_logger_io_obj()
@@ -183,26 +302,101 @@ class Preprocess:
         # Getting necessary config parameters
         configs = ExperimentConfigs.read_json(configs_fp)
         configs_filt = configs.user.preprocess.interpolate
-        # Reading file
-        keypoints_df = KeypointsDf.read(src_fp)
-        # Gettings the unique groups of (individual, bodypart) groups.
-        unique_cols = keypoints_df.columns.droplevel(["coords"]).unique()
-        # Setting low-likelihood points to Nan to later interpolate
-        for scorer, indiv, bp in unique_cols:
-            # Imputing Nan likelihood points with 0
-            keypoints_df[(scorer, indiv, bp, CoordsCols.LIKELIHOOD.value)].fillna(value=0, inplace=True)
-            # Setting x and y coordinates of points that have low likelihood to Nan
-            to_remove = keypoints_df[(scorer, indiv, bp, CoordsCols.LIKELIHOOD.value)] < configs_filt.pcutoff
-            keypoints_df.loc[to_remove, (scorer, indiv, bp, CoordsCols.X.value)] = np.nan
-            keypoints_df.loc[to_remove, (scorer, indiv, bp, CoordsCols.Y.value)] = np.nan
-        # linearly interpolating Nan x and y points.
-        # Also backfilling points at the start.
-        # Also forward filling points at the end.
-        # Also imputing nan points with 0 (if the ENTIRE column is nan, then it's imputed)
-        keypoints_df = keypoints_df.interpolate(method="linear").bfill().ffill()
-        # if df.isnull().values.any() then the entire column is nan (log warning)
-        # keypoints_df = keypoints_df.fillna(0)
-        KeypointsDf.write(keypoints_df, dst_fp)
+        pcutoff = configs.get_ref(configs_filt.pcutoff)
+        max_gap_frames = configs.get_ref(configs_filt.max_gap_frames)
+        flag_gaps = configs.get_ref(configs_filt.flag_gaps)
+        chunk_frames = configs.get_ref(configs.user.preprocess.chunk_frames)
+        # A gap can only be filled from its neighbouring valid points (at most max_gap_frames + 1 frames away)
+        if chunk_frames is not None and max_gap_frames is None:
+            raise ValueError(
+                "max_gap_frames must be set to interpolate in chunks (i.e. when chunk_frames is set),"
+                " as unlimited gaps can span the whole recording."
+            )
+        halo_frames = 0 if max_gap_frames is None else max_gap_frames + 1
+        # Masking low-likelihood points and interpolating
+        map_keypoints(
+            src_fp,
+            dst_fp,
+            lambda df, is_start, is_end: interpolate_df(
+                df, pcutoff, max_gap_frames, flag_gaps, logger, fill_leading=is_start, fill_trailing=is_end
+            ),
+            halo_frames,
+            chunk_frames,
+            logger,
+        )
+        return get_io_obj_content(io_obj)
+
+    @classmethod
+    def smooth(cls, src_fp: str, dst_fp: str, configs_fp: str, overwrite: bool) -> str:
+        """
+        Smooths the x and y trajectories of all individuals and bodyparts.
+        Observations are weighted by their likelihood, and NaN points stay NaN.
+
+        The `method` can be:
+        - `savgol`: likelihood-weighted Savitzky-Golay filter (local polynomial fit of
+          order `polyorder` over `window_sec`). Points below `pcutoff` have zero weight.
+        - `median`: rolling median over `window_sec`, ignoring points below `pcutoff`.
+        - `kalman`: constant-velocity Kalman filter with a Rauch-Tung-Striebel smoother.
+          Points below `pcutoff` are not used as observations, and the measurement noise
+          of the other points is scaled by `1 / likelihood`.
+
+        Intended to be run after `Preprocess.interpolate`.
+
+        Notes
+        -----
+        The config file must contain the following parameters:
+        ```
+        - user
+            - preprocess
+                - smooth
+                    - method: ["savgol", "median", "kalman"]
+                    - window_sec: float
+                    - polyorder: int
+                    - pcutoff: float
+                    - process_noise: float
+                    - measurement_noise: float
+        ```
+        """
+        logger, io_obj = init_logger_io_obj()
+        if not overwrite and os.path.exists(dst_fp):
+            logger.warning(file_exists_msg(dst_fp))
+            return get_io_obj_content(io_obj)
+        # Getting necessary config parameters
+        configs = ExperimentConfigs.read_json(configs_fp)
+        configs_filt = configs.user.preprocess.smooth
+        method = configs.get_ref(configs_filt.method)
+        window_sec = configs.get_ref(configs_filt.window_sec)
+        polyorder = configs.get_ref(configs_filt.polyorder)
+        pcutoff = configs.get_ref(configs_filt.pcutoff)
+        process_noise = configs.get_ref(configs_filt.process_noise)
+        measurement_noise = configs.get_ref(configs_filt.measurement_noise)
+        fps = configs.auto.formatted_vid.fps
+        chunk_frames = configs.get_ref(configs.user.preprocess.chunk_frames)
+        # Calculating more parameters
+        window_frames = int(np.round(fps * window_sec, 0))
+        if chunk_frames is not None and method == "kalman":
+            raise ValueError(
+                "The kalman method cannot be run in chunks (i.e. when chunk_frames is set),"
+                " as the smoother runs over the whole recording."
+            )
+        # Smoothing all bodyparts at once
+        map_keypoints(
+            src_fp,
+            dst_fp,
+            lambda df, *_: smooth_df(
+                df,
+                method,
+                window_frames,
+                polyorder,
+                pcutoff,
+                process_noise,
+                measurement_noise,
+                logger,
+            ),
+            window_frames // 2,
+            chunk_frames,
+            logger,
+        )
         return get_io_obj_content(io_obj)
 
     @classmethod
@@ -229,8 +423,6 @@ class Preprocess:
         if not overwrite and os.path.exists(dst_fp):
             logger.warning(file_exists_msg(dst_fp))
             return get_io_obj_content(io_obj)
-        # Reading file
-        keypoints_df = KeypointsDf.read(src_fp)
         # Getting necessary config parameters
         configs = ExperimentConfigs.read_json(configs_fp)
         configs_filt = configs.user.preprocess.refine_ids
@@ -241,30 +433,697 @@ class Preprocess:
         bpts = configs.get_ref(configs_filt.bodyparts)
         metric = configs.get_ref(configs_filt.metric)
         fps = configs.auto.formatted_vid.fps
+        chunk_frames = configs.get_ref(configs.user.preprocess.chunk_frames)
         # Calculating more parameters
         window_frames = int(np.round(fps * window_sec, 0))
+        # Reading the first frame (for the columns and the start frame)
+        head_df = read_keypoints_head(src_fp)
         # Error checking for invalid/non-existent column names marked, unmarked, and marking
         for column, level in [
             (marked, "individuals"),
             (unmarked, "individuals"),
             (marking, "bodyparts"),
         ]:
-            if column not in keypoints_df.columns.unique(level):
+            if column not in head_df.columns.unique(level):
                 raise ValueError(
                     f'The marking value in the config file, "{column}", is not a column name in the DLC file.'
                 )
         # Checking that bodyparts are all valid
-        KeypointsDf.check_bpts_exist(keypoints_df, bpts)
-        # Calculating the distances between the averaged bodycentres and the marking
-        mark_dists_df = get_mark_dists_df(keypoints_df, marked, unmarked, [marking], bpts, logger)
-        # Getting "to_switch" decision series for each frame
-        switch_df = get_id_switch_df(mark_dists_df, window_frames, marked, unmarked, logger)
-        # Updating df with the switched values
-        switched_keypoints_df = switch_identities(keypoints_df, switch_df[metric], marked, unmarked, logger)
-        KeypointsDf.write(switched_keypoints_df, dst_fp)
+        KeypointsDf.check_bpts_exist(head_df, bpts)
+        # The binned metric's bins start from the first frame of the whole recording
+        bins_origin = head_df.index.get_level_values(KeypointsDf.IN.FRAME.value)[0] if head_df.shape[0] else 0
+        # Switching identities (the rolling and binned metrics depend on window_frames frames either side)
+        map_keypoints(
+            src_fp,
+            dst_fp,
+            lambda df, *_: refine_ids_df(
+                df, marked, unmarked, marking, bpts, window_frames, metric, bins_origin, logger
+            ),
+            window_frames,
+            chunk_frames,
+            logger,
+        )
         return get_io_obj_content(io_obj)
 
 
+def iter_keypoints(fp: str, chunk_frames: None | int, columns: None | list[tuple] = None) -> Iterator[pd.DataFrame]:
+    """
+    Iterates over the keypoints file in chunks of `chunk_frames` frames
+    (or the whole file as one chunk if `chunk_frames` is None).
+    Only the given columns are read if `columns` is specified.
+    """
+    if KeypointsDf.IO == "parquet":
+        yield from KeypointsDf.iter_parquet(fp, chunk_frames, columns)
+    elif chunk_frames is None:
+        keypoints_df = KeypointsDf.read(fp)
+        yield keypoints_df if columns is None else keypoints_df.loc[:, columns]
+    else:
+        raise ValueError(f"Keypoints can only be read in chunks from parquet files, not {KeypointsDf.IO} files.")
+
+
+def read_keypoints_head(fp: str) -> pd.DataFrame:
+    """
+    Reads the first frame of the keypoints file (e.g. to get the columns without reading the whole file).
+    """
+    if KeypointsDf.IO == "parquet":
+        head_df = next(KeypointsDf.iter_parquet(fp, 1), None)
+        if head_df is not None:
+            return head_df
+    return KeypointsDf.read(fp).iloc[:1]
+
+
+def map_keypoints(
+    src_fp: str,
+    dst_fp: str,
+    func: Callable[[pd.DataFrame, bool, bool], pd.DataFrame],
+    halo_frames: int,
+    chunk_frames: None | int,
+    logger: logging.Logger,
+) -> None:
+    """
+    Applies `func` to the keypoints file and writes the result to `dst_fp`.
+
+    If `chunk_frames` is None, `func` is applied to the whole keypoints df.
+    Otherwise, the keypoints file is streamed in chunks of `chunk_frames` frames.
+    `func` is applied to each chunk with `halo_frames` extra frames on each side,
+    and only the chunk's frames are kept.
+    So the results are identical to the in-memory path, as long as each frame's output only
+    depends on the frames within `halo_frames` of it.
+
+    `func` is called as `func(df, is_start, is_end)`, where `is_start` and `is_end` are whether
+    `df` includes the first and last frame of the file, respectively.
+    `func` may drop frames, but must not change the frame index otherwise.
+    """
+    if chunk_frames is None:
+        keypoints_df = KeypointsDf.read(src_fp)
+        keypoints_df = func(keypoints_df, True, True)
+        KeypointsDf.write(keypoints_df, dst_fp)
+        return
+    if KeypointsDf.IO != "parquet":
+        raise ValueError(f"Keypoints can only be streamed from parquet files, not {KeypointsDf.IO} files.")
+    logger.debug(f"Processing keypoints in chunks of {chunk_frames} frames (with {halo_frames} halo frames).")
+    # Writing to a temporary file first, as src_fp and dst_fp can be the same file
+    tmp_fp = f"{dst_fp}.tmp"
+    try:
+        KeypointsDf.write_parquet_chunks(iter_mapped_chunks(src_fp, func, halo_frames, chunk_frames), tmp_fp)
+        os.replace(tmp_fp, dst_fp)
+    finally:
+        if os.path.exists(tmp_fp):
+            os.remove(tmp_fp)
+
+
+def iter_mapped_chunks(
+    src_fp: str,
+    func: Callable[[pd.DataFrame, bool, bool], pd.DataFrame],
+    halo_frames: int,
+    chunk_frames: int,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yields the output of `func` for each chunk of the keypoints file.
+    Refer to `map_keypoints` for details.
+
+    Only the current chunk, its halos, and the most recently read chunk are kept in memory.
+    """
+    chunks = KeypointsDf.iter_parquet(src_fp, chunk_frames)
+    # Buffer of frames, starting with the halo before the current chunk
+    buffer_df = next(chunks)
+    n_before = 0
+    n_dropped = 0
+    is_exhausted = False
+    # Handling edge case where the file has no frames
+    if buffer_df.shape[0] == 0:
+        yield func(buffer_df, True, True)
+        return
+    while True:
+        # Reading until the buffer has the current chunk and the halo after it (or the file ends)
+        while not is_exhausted and buffer_df.shape[0] < n_before + chunk_frames + halo_frames:
+            chunk_df = next(chunks, None)
+            if chunk_df is None:
+                is_exhausted = True
+            else:
+                buffer_df = pd.concat([buffer_df, chunk_df])
+        # Stopping when all frames have been processed
+        if n_before >= buffer_df.shape[0]:
+            return
+        # Applying func to the chunk with its halos and keeping only the chunk's frames
+        stop = min(n_before + chunk_frames, buffer_df.shape[0])
+        window_stop = min(stop + halo_frames, buffer_df.shape[0])
+        is_end = is_exhausted and window_stop == buffer_df.shape[0]
+        out_df = func(buffer_df.iloc[:window_stop], n_dropped == 0, is_end)
+        chunk_index = buffer_df.index[n_before:stop]
+        yield out_df.loc[chunk_index[0] : chunk_index[-1]]
+        # Keeping only the halo before the next chunk
+        start = max(stop - halo_frames, 0)
+        buffer_df = buffer_df.iloc[start:]
+        n_dropped += start
+        n_before = stop - start
+
+
+def get_coords_idx(columns: pd.MultiIndex) -> tuple[pd.Index, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the unique (scorer, individual, bodypart) groups of the keypoints columns
+    (not incl. the `processed` individual), and the positional indexes of each
+    group's x, y, and likelihood columns.
+
+    Parameters
+    ----------
+    columns : pd.MultiIndex
+        Keypoints pd.DataFrame columns.
+
+    Returns
+    -------
+    tuple[pd.Index, np.ndarray, np.ndarray, np.ndarray]
+        `(groups, x_idx, y_idx, lhood_idx)` tuple. The i-th element of each index
+        array corresponds to the i-th group.
+    """
+    columns_filter = columns.get_level_values(KeypointsDf.CN.INDIVIDUALS.value) != IndivCols.PROCESSED.value
+    groups = columns[columns_filter].droplevel(KeypointsDf.CN.COORDS.value).unique()
+    x_idx = columns.get_indexer([(*group, CoordsCols.X.value) for group in groups])
+    y_idx = columns.get_indexer([(*group, CoordsCols.Y.value) for group in groups])
+    lhood_idx = columns.get_indexer([(*group, CoordsCols.LIKELIHOOD.value) for group in groups])
+    return groups, x_idx, y_idx, lhood_idx
+
+
+def get_body_lengths(
+    keypoints_dfs: Iterable[pd.DataFrame],
+    bl_bpts: list[str],
+    pcutoff: float,
+    bl_percentile: float,
+    logger: logging.Logger,
+) -> pd.Series:
+    """
+    Estimates the body length (px) of each animal individual, as the `bl_percentile` percentile
+    of the distance between the two `bl_bpts` bodyparts (in frames where both are above `pcutoff`).
+
+    `keypoints_dfs` are consecutive chunks of the keypoints df (only the `bl_bpts` columns are needed).
+
+    Returns
+    -------
+    pd.Series
+        Body length of each individual.
+    """
+    if len(bl_bpts) != 2:
+        raise ValueError(f"body_length_bodyparts must be 2 bodyparts. Got {bl_bpts}.")
+    bpt_a, bpt_b = bl_bpts
+    coords = enum2list(CoordsCols)
+    # Getting the distances between the two bodyparts in each chunk
+    dists_dict: dict[str, list[np.ndarray]] = {}
+    for keypoints_df in keypoints_dfs:
+        scorer = keypoints_df.columns.unique(KeypointsDf.CN.SCORER.value)[0]
+        indivs, _ = KeypointsDf.get_indivs_bpts(keypoints_df)
+        for indiv in indivs:
+            # Getting the (frames, 3) arrays of each bodypart
+            a = keypoints_df.iloc[:, keypoints_df.columns.get_indexer([(scorer, indiv, bpt_a, c) for c in coords])]
+            b = keypoints_df.iloc[:, keypoints_df.columns.get_indexer([(scorer, indiv, bpt_b, c) for c in coords])]
+            a, b = a.to_numpy(dtype=np.float64), b.to_numpy(dtype=np.float64)
+            is_valid = (a[:, 2] >= pcutoff) & (b[:, 2] >= pcutoff)
+            dists = np.hypot(a[is_valid, 0] - b[is_valid, 0], a[is_valid, 1] - b[is_valid, 1])
+            dists_dict.setdefault(indiv, []).append(dists)
+    # Getting the body length of each individual
+    body_lengths = pd.Series(np.nan, index=pd.Index(list(dists_dict), name=KeypointsDf.CN.INDIVIDUALS.value))
+    for indiv, dists_ls in dists_dict.items():
+        dists = np.concatenate(dists_ls)
+        if dists.shape[0] == 0:
+            logger.warning(f"{indiv} has no frames where {bpt_a} and {bpt_b} are both above {pcutoff} likelihood.")
+            continue
+        body_lengths[indiv] = np.nanpercentile(dists, bl_percentile)
+        logger.info(f"{indiv} body length estimated as {body_lengths[indiv]:.1f} px.")
+    return body_lengths
+
+
+def remove_outliers_df(
+    keypoints_df: pd.DataFrame,
+    pcutoff: float,
+    max_jump_px: None | float,
+    body_lengths: None | pd.Series,
+    max_bl_mult: None | float,
+    logger: logging.Logger,
+) -> pd.DataFrame:
+    """
+    Sets the x and y coordinates of outlier points to NaN and their likelihood to 0.
+    Refer to `Preprocess.remove_outliers` for details.
+
+    Parameters
+    ----------
+    keypoints_df : pd.DataFrame
+        Keypoints pd.DataFrame.
+    pcutoff : float
+        Likelihood cutoff. Points below this are ignored (they are already masked by `interpolate`).
+    max_jump_px : None | float
+        Maximum displacement (px) between consecutive frames. Not checked if None.
+    body_lengths : None | pd.Series
+        Body length (px) of each individual. Refer to `get_body_lengths`.
+    max_bl_mult : None | float
+        Maximum distance from the individual's centroid (in body lengths). Not checked if None.
+
+    Returns
+    -------
+    pd.DataFrame
+        Keypoints pd.DataFrame.
+    """
+    keypoints_df = keypoints_df.copy()
+    groups, x_idx, y_idx, lhood_idx = get_coords_idx(keypoints_df.columns)
+    # Getting (frames, bodyparts) arrays. Points below pcutoff are ignored
+    lhood = np.nan_to_num(keypoints_df.iloc[:, lhood_idx].to_numpy(dtype=np.float64), nan=0)
+    is_valid = lhood >= pcutoff
+    x = np.where(is_valid, keypoints_df.iloc[:, x_idx].to_numpy(dtype=np.float64), np.nan)
+    y = np.where(is_valid, keypoints_df.iloc[:, y_idx].to_numpy(dtype=np.float64), np.nan)
+    is_outlier = np.zeros(x.shape, dtype=bool)
+    # Flagging spikes (implausible jumps from the previous frame and to the next frame)
+    if max_jump_px is not None:
+        with np.errstate(invalid="ignore"):
+            is_jump = np.hypot(np.diff(x, axis=0), np.diff(y, axis=0)) > max_jump_px
+        is_outlier[1:-1] = is_jump[:-1] & is_jump[1:]
+        logger.debug(f"{int(is_outlier.sum())} points flagged as jumps above {max_jump_px:.1f} px per frame.")
+    # Flagging points too far from the individual's centroid
+    if max_bl_mult is not None and body_lengths is not None:
+        n_jumps = int(is_outlier.sum())
+        group_indivs = groups.get_level_values(KeypointsDf.CN.INDIVIDUALS.value)
+        for indiv, body_length in body_lengths.dropna().items():
+            indiv_idx = np.flatnonzero(group_indivs == indiv)
+            with warnings.catch_warnings():
+                # Frames where all bodyparts are NaN give an "All-NaN slice" warning
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                centroid_x = np.nanmedian(x[:, indiv_idx], axis=1, keepdims=True)
+                centroid_y = np.nanmedian(y[:, indiv_idx], axis=1, keepdims=True)
+            with np.errstate(invalid="ignore"):
+                is_far = np.hypot(x[:, indiv_idx] - centroid_x, y[:, indiv_idx] - centroid_y)
+                is_far = is_far > max_bl_mult * body_length
+            is_outlier[:, indiv_idx] |= is_far
+        logger.debug(
+            f"{int(is_outlier.sum()) - n_jumps} more points flagged as further than "
+            f"{max_bl_mult} body lengths from the centroid."
+        )
+    # Removing outlier points (x and y to NaN, and likelihood to 0)
+    x_all = keypoints_df.iloc[:, x_idx].to_numpy(dtype=np.float64)
+    y_all = keypoints_df.iloc[:, y_idx].to_numpy(dtype=np.float64)
+    keypoints_df.iloc[:, x_idx] = np.where(is_outlier, np.nan, x_all)
+    keypoints_df.iloc[:, y_idx] = np.where(is_outlier, np.nan, y_all)
+    keypoints_df.iloc[:, lhood_idx] = np.where(is_outlier, 0, lhood)
+    return keypoints_df
+
+
+def interpolate_arr(
+    arr: np.ndarray,
+    max_gap_frames: None | int = None,
+    fill_leading: bool = True,
+    fill_trailing: bool = True,
+) -> np.ndarray:
+    """
+    Linearly interpolates the NaN values of every column of `arr` (frames x columns)
+    along the frames axis at once.
+
+    Leading and trailing NaN values take the first and last valid value of the column
+    (same as `df.interpolate(method="linear").bfill().ffill()`).
+    Gaps longer than `max_gap_frames` are left as NaN (no limit if None).
+    Columns with no valid values are left as NaN.
+
+    Parameters
+    ----------
+    arr : np.ndarray
+        2D array of (frames, columns).
+    max_gap_frames : None | int
+        Maximum number of consecutive NaN frames to fill.
+    fill_leading : bool
+        Whether to fill leading NaN values. False if `arr` is a chunk that is not at the start of
+        the recording (i.e. the previous valid value is unknown).
+    fill_trailing : bool
+        Whether to fill trailing NaN values. False if `arr` is a chunk that is not at the end of
+        the recording (i.e. the next valid value is unknown).
+
+    Returns
+    -------
+    np.ndarray
+        Interpolated 2D array.
+    """
+    # Working on the transposed (columns, frames) array so each column is contiguous
+    arr_t = np.array(np.transpose(arr), dtype=np.float64, order="C")
+    is_nan = np.isnan(arr_t)
+    if not is_nan.any():
+        return arr_t.T
+    n = arr_t.shape[1]
+    frames = np.arange(n, dtype=np.int32)
+    # Getting the index of the previous and next valid value for each NaN (-1 and n if none)
+    prev_idx = np.maximum.accumulate(np.where(is_nan, np.int32(-1), frames), axis=1)
+    next_idx = np.minimum.accumulate(np.where(is_nan, np.int32(n), frames)[:, ::-1], axis=1)[:, ::-1]
+    nan_flat = np.flatnonzero(is_nan)
+    prev_idx = prev_idx.ravel()[nan_flat]
+    next_idx = next_idx.ravel()[nan_flat]
+    has_prev = prev_idx >= 0
+    has_next = next_idx < n
+    # Only filling gaps that have a valid value and are not longer than max_gap_frames
+    to_fill = (has_prev | has_next) & (has_prev | fill_leading) & (has_next | fill_trailing)
+    if max_gap_frames is not None:
+        to_fill &= next_idx - prev_idx - 1 <= max_gap_frames
+    if not to_fill.all():
+        nan_flat, prev_idx, next_idx = nan_flat[to_fill], prev_idx[to_fill], next_idx[to_fill]
+        has_prev, has_next = has_prev[to_fill], has_next[to_fill]
+    nan_cols, nan_rows = np.divmod(nan_flat, n)
+    col_starts = nan_cols * n
+    prev_val = arr_t.ravel()[col_starts + np.maximum(prev_idx, 0)]
+    next_val = arr_t.ravel()[col_starts + np.minimum(next_idx, n - 1)]
+    # Linearly interpolating between valid values (same arithmetic as np.interp)
+    # Leading and trailing gaps take the nearest valid value
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (next_val - prev_val) / (next_idx - prev_idx)
+        arr_t.ravel()[nan_flat] = np.where(
+            has_prev & has_next,
+            slope * (nan_rows - prev_idx) + prev_val,
+            np.where(has_prev, prev_val, next_val),
+        )
+    return arr_t.T
+
+
+def interpolate_df(
+    keypoints_df: pd.DataFrame,
+    pcutoff: float,
+    max_gap_frames: None | int,
+    flag_gaps: bool,
+    logger: logging.Logger,
+    fill_leading: bool = True,
+    fill_trailing: bool = True,
+) -> pd.DataFrame:
+    """
+    Sets the x and y coordinates of all points below `pcutoff` to NaN and linearly
+    interpolates them. Refer to `interpolate_arr` for details.
+
+    Parameters
+    ----------
+    keypoints_df : pd.DataFrame
+        Keypoints pd.DataFrame.
+    pcutoff : float
+        Likelihood cutoff.
+    max_gap_frames : None | int
+        Maximum number of consecutive frames to interpolate (no limit if None).
+    flag_gaps : bool
+        Whether to add a `gap` column for each bodypart, marking the unfilled frames.
+
+    Returns
+    -------
+    pd.DataFrame
+        Keypoints pd.DataFrame.
+    """
+    keypoints_df = keypoints_df.copy()
+    groups, x_idx, y_idx, lhood_idx = get_coords_idx(keypoints_df.columns)
+    n = groups.shape[0]
+    # Imputing Nan likelihood points with 0
+    lhood = np.nan_to_num(keypoints_df.iloc[:, lhood_idx].to_numpy(dtype=np.float64), nan=0)
+    # Setting x and y coordinates of points that have low likelihood to Nan
+    xy = keypoints_df.iloc[:, np.concatenate([x_idx, y_idx])].to_numpy(dtype=np.float64)
+    xy[np.tile(lhood < pcutoff, 2)] = np.nan
+    # Linearly interpolating Nan x and y points for all bodyparts at once
+    xy = interpolate_arr(xy, max_gap_frames, fill_leading, fill_trailing)
+    keypoints_df.iloc[:, lhood_idx] = lhood
+    keypoints_df.iloc[:, x_idx] = xy[:, :n]
+    keypoints_df.iloc[:, y_idx] = xy[:, n:]
+    # Logging unfilled gaps
+    is_gap = np.isnan(xy[:, :n]) | np.isnan(xy[:, n:])
+    if is_gap.any():
+        logger.warning(
+            f"{int(is_gap.sum())} points (across {int(is_gap.any(axis=0).sum())} bodyparts) "
+            f"are in gaps longer than {max_gap_frames} frames or have no valid points. Leaving these as NaN."
+        )
+    # Adding gap flag columns (under the "processed" individual, refer to `KeypointsDf`)
+    if flag_gaps:
+        flag_columns = pd.MultiIndex.from_tuples(
+            [
+                (scorer, IndivCols.PROCESSED.value, f"{indiv}_{bpt}", GAP_FLAG)
+                for scorer, indiv, bpt in groups
+            ],
+            names=keypoints_df.columns.names,
+        )
+        flags_df = pd.DataFrame(is_gap.astype(np.float64), index=keypoints_df.index, columns=flag_columns)
+        keypoints_df = keypoints_df.drop(columns=flag_columns, errors="ignore")
+        keypoints_df = pd.concat([keypoints_df, flags_df], axis=1)
+        logger.debug(f"Added {GAP_FLAG} columns under the `{IndivCols.PROCESSED.value}` individual.")
+    return keypoints_df
+
+
+def smooth_df(
+    keypoints_df: pd.DataFrame,
+    method: str,
+    window_frames: int,
+    polyorder: int,
+    pcutoff: float,
+    process_noise: float,
+    measurement_noise: float,
+    logger: logging.Logger,
+) -> pd.DataFrame:
+    """
+    Smooths the x and y coordinates of all bodyparts with the given `method`.
+    Refer to `Preprocess.smooth` for details.
+
+    Returns
+    -------
+    pd.DataFrame
+        Keypoints pd.DataFrame.
+    """
+    keypoints_df = keypoints_df.copy()
+    _, x_idx, y_idx, lhood_idx = get_coords_idx(keypoints_df.columns)
+    # Getting (frames, bodyparts) arrays
+    x = keypoints_df.iloc[:, x_idx].to_numpy(dtype=np.float64)
+    y = keypoints_df.iloc[:, y_idx].to_numpy(dtype=np.float64)
+    lhood = np.nan_to_num(keypoints_df.iloc[:, lhood_idx].to_numpy(dtype=np.float64), nan=0)
+    # Smoothing x and y together (the likelihood is shared by each x-y pair)
+    xy = np.concatenate([x, y], axis=1)
+    lhood = np.concatenate([lhood, lhood], axis=1)
+    if method == "savgol":
+        # Points below pcutoff have zero weight
+        xy_smoothed = smooth_savgol_arr(xy, np.where(lhood >= pcutoff, lhood, 0), window_frames, polyorder)
+    elif method == "median":
+        xy_smoothed = smooth_median_arr(xy, lhood, window_frames, pcutoff)
+    elif method == "kalman":
+        xy_smoothed = smooth_kalman_arr(xy, lhood, pcutoff, process_noise, measurement_noise)
+    else:
+        raise ValueError(f'Invalid smoothing method "{method}". Must be one of "savgol", "median", or "kalman".')
+    logger.info(f"Smoothed {xy.shape[1] // 2} bodyparts with the {method} method.")
+    # NaN points (i.e. unfilled gaps) stay NaN
+    xy_smoothed[np.isnan(xy)] = np.nan
+    n = x_idx.shape[0]
+    keypoints_df.iloc[:, x_idx] = xy_smoothed[:, :n]
+    keypoints_df.iloc[:, y_idx] = xy_smoothed[:, n:]
+    return keypoints_df
+
+
+def smooth_savgol_arr(arr: np.ndarray, weights: np.ndarray, window_frames: int, polyorder: int) -> np.ndarray:
+    """
+    Likelihood-weighted Savitzky-Golay filter of every column of `arr` (frames x columns).
+
+    For each frame, a polynomial of order `polyorder` is fitted (weighted least squares)
+    to the points in the centred window, and evaluated at the frame.
+    The normal equations' moment sums are computed for all frames and columns with
+    1D correlations, and the small linear systems are solved together.
+    NaN points have zero weight, and points outside the array are ignored
+    (so the fit is one-sided at the edges).
+    Windows with fewer than `polyorder + 1` weighted points keep the original value.
+    With equal weights, interior values are the same as `scipy.signal.savgol_filter`.
+
+    Parameters
+    ----------
+    arr : np.ndarray
+        2D array of (frames, columns).
+    weights : np.ndarray
+        2D array of (frames, columns) of observation weights (e.g. likelihoods).
+    window_frames : int
+        Window size (rounded up to the nearest odd number).
+    polyorder : int
+        Order of the fitted polynomial.
+
+    Returns
+    -------
+    np.ndarray
+        Smoothed 2D array.
+    """
+    half = window_frames // 2
+    if polyorder >= 2 * half + 1:
+        raise ValueError(f"polyorder ({polyorder}) must be less than the window size ({2 * half + 1} frames).")
+    n_coefs = polyorder + 1
+    # Working on the transposed (columns, frames) arrays so each column is contiguous
+    arr_t = np.ascontiguousarray(np.transpose(arr), dtype=np.float64)
+    is_nan = np.isnan(arr_t)
+    weights_t = np.where(is_nan, 0, np.transpose(weights))
+    arr_w = np.where(is_nan, 0, arr_t) * weights_t
+    offsets = np.arange(-half, half + 1, dtype=np.float64)
+    # Getting the weighted moment sums (sum of w * s^k and w * y * s^k) for each frame and column
+    moments = [correlate1d(weights_t, offsets**k, axis=1, mode="constant") for k in range(2 * n_coefs - 1)]
+    rhs = [correlate1d(arr_w, offsets**k, axis=1, mode="constant") for k in range(n_coefs)]
+    n_pts = correlate1d((weights_t > 0).astype(np.float64), np.ones(offsets.shape[0]), axis=1, mode="constant")
+    # Solving the (n_coefs x n_coefs) normal equations of all frames and columns at once
+    # (Gaussian elimination, which is stable without pivoting as the matrices are symmetric positive definite)
+    lhs = [[moments[j + k] for k in range(n_coefs)] for j in range(n_coefs)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for j in range(n_coefs):
+            for i in range(j + 1, n_coefs):
+                factor = lhs[i][j] / lhs[j][j]
+                for k in range(j, n_coefs):
+                    lhs[i][k] = lhs[i][k] - factor * lhs[j][k]
+                rhs[i] = rhs[i] - factor * rhs[j]
+        coefs = [np.empty(0)] * n_coefs
+        for j in range(n_coefs - 1, -1, -1):
+            coefs[j] = rhs[j] - sum(lhs[j][k] * coefs[k] for k in range(j + 1, n_coefs))
+            coefs[j] = coefs[j] / lhs[j][j]
+    # The fitted polynomial evaluated at the frame (offset 0) is the constant coefficient
+    # Windows with too few weighted points keep the original value
+    smoothed = np.where(n_pts >= n_coefs - 0.5, coefs[0], arr_t)
+    return np.transpose(smoothed)
+
+
+def smooth_median_arr(arr: np.ndarray, weights: np.ndarray, window_frames: int, pcutoff: float) -> np.ndarray:
+    """
+    Rolling (centred) median of every column of `arr` (frames x columns), ignoring
+    points with weights (likelihoods) below `pcutoff`.
+    Windows with no points above `pcutoff` keep the original value.
+    Same as `df.where(lhood >= pcutoff).rolling(window, center=True, min_periods=1).median()`
+    for each column (with an odd window).
+
+    Parameters
+    ----------
+    arr : np.ndarray
+        2D array of (frames, columns).
+    weights : np.ndarray
+        2D array of (frames, columns) of observation likelihoods.
+    window_frames : int
+        Window size (rounded up to the nearest odd number).
+    pcutoff : float
+        Likelihood cutoff.
+
+    Returns
+    -------
+    np.ndarray
+        Smoothed 2D array.
+    """
+    half = window_frames // 2
+    n_frames = arr.shape[0]
+    masked = np.where(weights >= pcutoff, arr, np.nan)
+    # Padding with NaN so the windows at the edges are shrunk
+    padded = np.pad(masked, ((half, half), (0, 0)), constant_values=np.nan)
+    smoothed = arr.copy()
+    # Chunking frames to limit the memory of the (frames, columns, window) sorted array
+    chunk_frames = max(1, 2**22 // max(1, arr.shape[1] * (2 * half + 1)))
+    for start in range(0, n_frames, chunk_frames):
+        stop = min(start + chunk_frames, n_frames)
+        windows = sliding_window_view(padded[start : stop + 2 * half], 2 * half + 1, axis=0)
+        # Sorting each window (NaN values are sorted to the end) and taking the middle valid values
+        windows = np.sort(windows, axis=-1)
+        n_valid = np.sum(~np.isnan(windows), axis=-1)
+        lo = np.take_along_axis(windows, np.maximum((n_valid - 1) // 2, 0)[..., None], axis=-1)[..., 0]
+        hi = np.take_along_axis(windows, (n_valid // 2)[..., None], axis=-1)[..., 0]
+        smoothed[start:stop] = np.where(n_valid > 0, (lo + hi) / 2, arr[start:stop])
+    return smoothed
+
+
+def smooth_kalman_arr(
+    arr: np.ndarray,
+    weights: np.ndarray,
+    pcutoff: float,
+    process_noise: float,
+    measurement_noise: float,
+) -> np.ndarray:
+    """
+    Constant-velocity Kalman filter and Rauch-Tung-Striebel smoother of every column
+    of `arr` (frames x columns). Each column is an independent 1D (position, velocity) model.
+
+    The filter steps through the frames, with each step computed for all columns at once.
+    Points that are NaN or have weights (likelihoods) below `pcutoff` are not used as
+    observations. The measurement noise variance of the other points is
+    `measurement_noise / likelihood`.
+    Columns with no observations stay unchanged.
+
+    Parameters
+    ----------
+    arr : np.ndarray
+        2D array of (frames, columns).
+    weights : np.ndarray
+        2D array of (frames, columns) of observation likelihoods.
+    pcutoff : float
+        Likelihood cutoff.
+    process_noise : float
+        Acceleration noise variance (px^2 / frame^4).
+    measurement_noise : float
+        Measurement noise variance (px^2) of a point with likelihood 1.
+
+    Returns
+    -------
+    np.ndarray
+        Smoothed 2D array.
+    """
+    n_frames, n_cols = arr.shape
+    q = process_noise
+    is_obs = (weights >= pcutoff) & ~np.isnan(arr)
+    has_obs = is_obs.any(axis=0)
+    meas_var = measurement_noise / np.maximum(weights, 1e-6)
+    # Initialising the state at the first observation (with zero velocity)
+    pos = arr[np.argmax(is_obs, axis=0), np.arange(n_cols)]
+    pos = np.where(has_obs, pos, 0)
+    vel = np.zeros(n_cols)
+    p00 = np.full(n_cols, measurement_noise, dtype=np.float64)
+    p01 = np.zeros(n_cols)
+    p11 = np.full(n_cols, 1e3, dtype=np.float64)
+    # Storing the filtered states and covariances for the backward pass
+    pos_f = np.zeros((n_frames, n_cols))
+    vel_f = np.zeros((n_frames, n_cols))
+    cov_f = np.zeros((n_frames, 3, n_cols))
+    for i in range(n_frames):
+        if i > 0:
+            # Predicting (x' = x + v, discrete white noise acceleration)
+            pos = pos + vel
+            p00, p01, p11 = p00 + 2 * p01 + p11 + q / 4, p01 + p11 + q / 2, p11 + q
+        # Updating with the observations
+        obs = is_obs[i]
+        s = p00 + meas_var[i]
+        k0 = np.where(obs, p00 / s, 0)
+        k1 = np.where(obs, p01 / s, 0)
+        innov = np.where(obs, arr[i] - pos, 0)
+        pos = pos + k0 * innov
+        vel = vel + k1 * innov
+        p00, p01, p11 = (1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01
+        pos_f[i], vel_f[i] = pos, vel
+        cov_f[i] = p00, p01, p11
+    # Backward (RTS) pass
+    pos_s = pos_f.copy()
+    pos_next, vel_next = pos_f[-1], vel_f[-1]
+    for i in range(n_frames - 2, -1, -1):
+        p00, p01, p11 = cov_f[i]
+        # Predicted covariance of the next frame
+        pp00, pp01, pp11 = p00 + 2 * p01 + p11 + q / 4, p01 + p11 + q / 2, p11 + q
+        det = pp00 * pp11 - pp01**2
+        # Smoother gain C = P F^T inv(P_pred)
+        a00, a01, a10, a11 = p00 + p01, p01, p01 + p11, p11
+        c00 = (a00 * pp11 - a01 * pp01) / det
+        c01 = (a01 * pp00 - a00 * pp01) / det
+        c10 = (a10 * pp11 - a11 * pp01) / det
+        c11 = (a11 * pp00 - a10 * pp01) / det
+        d_pos = pos_next - (pos_f[i] + vel_f[i])
+        d_vel = vel_next - vel_f[i]
+        pos_next = pos_f[i] + c00 * d_pos + c01 * d_vel
+        vel_next = vel_f[i] + c10 * d_pos + c11 * d_vel
+        pos_s[i] = pos_next
+    return np.where(has_obs, pos_s, arr)
+
+
+def refine_ids_df(
+    keypoints_df: pd.DataFrame,
+    marked: str,
+    unmarked: str,
+    marking: str,
+    bpts: list[str],
+    window_frames: int,
+    metric: str,
+    bins_origin: int,
+    logger: logging.Logger,
+) -> pd.DataFrame:
+    """
+    Switches the marked and unmarked individuals' keypoints in the frames where the
+    given `metric` decides they are swapped. Refer to `Preprocess.refine_ids` for details.
+    """
+    # Calculating the distances between the averaged bodycentres and the marking
+    mark_dists_df = get_mark_dists_df(keypoints_df, marked, unmarked, [marking], bpts, logger)
+    # Getting "to_switch" decision series for each frame
+    switch_df = get_id_switch_df(mark_dists_df, window_frames, marked, unmarked, logger, bins_origin)
+    # Updating df with the switched values
+    return switch_identities(keypoints_df, switch_df[metric], marked, unmarked, logger)
+
+
 def get_mark_dists_df(
     keypoints_df: pd.DataFrame,
     marked_indiv: str,
@@ -319,11 +1178,16 @@ def get_id_switch_df(
     marked: str,
     unmarked: str,
     logger: logging.Logger,
+    bins_origin: None | int = None,
 ) -> pd.DataFrame:
     """
     Calculating different metrics for whether to swap the mice identities, depending
     on the current distance, rolling decision, and average binned decision.
 
+    The binned decision is the majority decision (ties are not switched) in bins of
+    `window_frames`, starting from `bins_origin` (the first frame if None).
+    Bins are right-closed, and the first bin also includes `bins_origin`.
+
     Parameters
     ----------
     df_aggr : pd.DataFrame
@@ -344,15 +1208,13 @@ def get_id_switch_df(
     #   - Current decision
     switch_df["current"] = mark_dists_df[(marked, "dist")] > mark_dists_df[(unmarked, "dist")]
     #   - Decision rolling
-    switch_df["rolling"] = (
-        switch_df["current"].rolling(window_frames, min_periods=1).apply(lambda x: x.mode()[0]).map({1: True, 0: False})
-    )
+    switch_df["rolling"] = rolling_majority_arr(switch_df["current"].to_numpy(), window_frames)
     #   - Decision binned
-    bins = np.arange(switch_df.index.min(), switch_df.index.max() + window_frames, window_frames)
-    df_switch_x = pd.DataFrame()
-    df_switch_x["bins"] = pd.Series(pd.cut(switch_df.index, bins=bins, labels=bins[1:], include_lowest=True))
-    df_switch_x["current"] = switch_df["current"]
-    switch_df["binned"] = df_switch_x.groupby("bins")["current"].transform(lambda x: x.mode())
+    frames = switch_df.index.get_level_values(KeypointsDf.IN.FRAME.value).to_numpy()
+    if bins_origin is None:
+        bins_origin = frames.min() if frames.shape[0] > 0 else 0
+    bin_ids = np.maximum((frames - bins_origin + window_frames - 1) // window_frames - 1, 0)
+    switch_df["binned"] = switch_df["current"].groupby(bin_ids).transform("mean") > 0.5
     return switch_df
 
 
@@ -380,15 +1242,23 @@ def switch_identities(
     """
     keypoints_df = keypoints_df.copy()
     header = keypoints_df.columns.unique(0)[0]
-    keypoints_df["isSwitch"] = is_switch
-
-    def _f(row: pd.Series, marked: str, unmarked: str) -> pd.Series:
-        if row["isSwitch"][0]:
-            temp = list(row.loc[header, unmarked].copy())
-            row[header, unmarked] = list(row[header, marked].copy())
-            row[header, marked] = temp
-        return row
-
-    keypoints_df = keypoints_df.apply(lambda row: _f(row, marked_indiv, unmarked_indiv), axis=1)
-    keypoints_df = keypoints_df.drop(columns="isSwitch")
+    # Getting the positional indexes of each individual's columns
+    columns = keypoints_df.columns
+    is_header = columns.get_level_values(KeypointsDf.CN.SCORER.value) == header
+    indivs = columns.get_level_values(KeypointsDf.CN.INDIVIDUALS.value)
+    marked_idx = np.flatnonzero(is_header & (indivs == marked_indiv))
+    unmarked_idx = np.flatnonzero(is_header & (indivs == unmarked_indiv))
+    # Pairing the columns by their (bodyparts, coords) labels
+    label_levels = [KeypointsDf.CN.SCORER.value, KeypointsDf.CN.INDIVIDUALS.value]
+    marked_labels = columns[marked_idx].droplevel(label_levels)
+    unmarked_labels = columns[unmarked_idx].droplevel(label_levels)
+    if set(marked_labels) != set(unmarked_labels):
+        raise ValueError(f"{marked_indiv} and {unmarked_indiv} must have the same bodyparts to switch identities.")
+    unmarked_idx = unmarked_idx[unmarked_labels.get_indexer(marked_labels)]
+    # Swapping the marked and unmarked values in the switched frames
+    is_switch_arr = is_switch.reindex(keypoints_df.index).fillna(False).to_numpy(dtype=bool)[:, None]
+    marked_vals = keypoints_df.iloc[:, marked_idx].to_numpy()
+    unmarked_vals = keypoints_df.iloc[:, unmarked_idx].to_numpy()
+    keypoints_df.iloc[:, marked_idx] = np.where(is_switch_arr, unmarked_vals, marked_vals)
+    keypoints_df.iloc[:, unmarked_idx] = np.where(is_switch_arr, marked_vals, unmarked_vals)
     return keypoints_df
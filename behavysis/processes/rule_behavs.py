@@ -0,0 +1,105 @@
+"""
+Rule-based behaviour detection.
+
+Behaviours that are easy to define with thresholds (e.g. in-ROI dwelling, approach, or huddling)
+are defined in the configs (`user.rule_behavs`) with a boolean expression over analysis quantities,
+instead of a trained `BehavClassifier` (so they do not need the extracted features).
+
+Each variable of the expression is a column of an analysis's frame-by-frame df
+(refer to `ANALYSES` in `behavysis.processes.analyse`, e.g. the `("speed", "mouse1", "SpeedMMperSecSmoothed")`
+column), so the quantities use the same configs (e.g. ROIs and thresholds) as the analyses.
+Each analysis is computed once for all rules.
+
+The expression is evaluated for all frames at once with `pd.eval` (e.g. `"(dist < 30) & (speed < 20)"`).
+Then, gaps shorter than `min_empty_window_secs` are filled, and bouts shorter than `min_bout_secs` are removed.
+
+The predictions are a `BehavPredictedDf` (with a `prob` of 0 or 1), so are compatible with
+`Export.predictedbehavs2scoredbehavs` and the behaviour analyses.
+"""
+
+import numpy as np
+import pandas as pd
+
+from behavysis.df_classes.behav_df import BehavPredictedDf, BehavValues, OutcomesPredictedCols
+from behavysis.processes.analyse import ANALYSES
+from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
+from behavysis.utils.bout_array import BoutArray
+
+
+def calc_rule_behavs(keypoints_fp: str, configs_fp: str) -> pd.DataFrame:
+    """
+    Returns the predicted behavs df of the configs' rule behaviours (`user.rule_behavs`).
+
+    Parameters
+    ----------
+    keypoints_fp : str
+        The preprocessed keypoints filepath (the analyses' input).
+    configs_fp : str
+        The experiment's JSON configs file.
+
+    Returns
+    -------
+    pd.DataFrame
+        The `BehavPredictedDf` of the rule behaviours (with the keypoints' frames index).
+    """
+    configs = ExperimentConfigs.read_json(configs_fp)
+    fps = configs.auto.formatted_vid.fps
+    analysis_dfs = {}
+    behavs_df_ls = []
+    for rule_configs in configs.user.rule_behavs:
+        behav_name = configs.get_ref(rule_configs.behav_name)
+        expression = configs.get_ref(rule_configs.expression)
+        min_bout_secs = configs.get_ref(rule_configs.min_bout_secs)
+        min_window_secs = configs.get_ref(rule_configs.min_empty_window_secs)
+        assert len(rule_configs.variables) > 0, f"The {behav_name} rule has no variables."
+        # Getting the expression's variables (computing each analysis once)
+        variables = {}
+        for var_name, var_configs in rule_configs.variables.items():
+            analysis = configs.get_ref(var_configs.analysis)
+            column = (configs.get_ref(var_configs.individual), configs.get_ref(var_configs.measure))
+            assert analysis in ANALYSES, f"{analysis} is not an analysis. Possible analyses are {list(ANALYSES)}."
+            if analysis not in analysis_dfs:
+                analysis_dfs[analysis] = ANALYSES[analysis][0](keypoints_fp, configs_fp, None)
+            analysis_df = analysis_dfs[analysis]
+            assert column in analysis_df.columns, (
+                f"{column} is not a column of the {analysis} analysis.\n"
+                f"The columns are: {analysis_df.columns.to_list()}"
+            )
+            variables[var_name] = analysis_df[column].to_numpy()
+        index = next(iter(analysis_dfs.values())).index
+        # Evaluating the rule for all frames
+        is_behav = eval_rule(expression, variables, index.shape[0])
+        # Filling short gaps and removing short bouts
+        bouts = BoutArray.from_vect(is_behav)
+        bouts = bouts.merge_gaps(int(np.round(min_window_secs * fps)) - 1)
+        bouts = bouts.filter_dur(min_dur=int(np.round(min_bout_secs * fps)))
+        pred = bouts.to_vect(index.shape[0])
+        # Making the predicted behavs df
+        behav_df_i = BehavPredictedDf.init_df(index)
+        behav_df_i[(behav_name, OutcomesPredictedCols.PROB.value)] = pred.astype(np.float64)
+        behav_df_i[(behav_name, OutcomesPredictedCols.PRED.value)] = np.where(
+            pred, BehavValues.BEHAV.value, BehavValues.NON_BEHAV.value
+        )
+        behavs_df_ls.append(behav_df_i)
+    if len(behavs_df_ls) == 0:
+        return BehavPredictedDf.init_df(pd.Index([], name=BehavPredictedDf.IN.FRAME.value))
+    return pd.concat(behavs_df_ls, axis=1)
+
+
+def eval_rule(expression: str, variables: dict[str, np.ndarray], n_frames: int) -> np.ndarray:
+    """
+    Evaluates the boolean expression of the variables (each a `(frames,)` array) for all frames at once.
+
+    Comparisons with NaN values are False.
+
+    Raises
+    ------
+    ValueError
+        The expression is not valid (refer to `pd.eval`), or does not give a value for each frame.
+    """
+    out = np.asarray(pd.eval(expression, local_dict=variables))
+    if out.shape == ():
+        out = np.full(n_frames, out)
+    if out.shape != (n_frames,):
+        raise ValueError(f"The expression, {expression}, must give a value for each of the {n_frames} frames.")
+    return out.astype(bool)
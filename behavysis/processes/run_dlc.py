@@ -61,6 +61,7 @@ class RunDLC:
         # Getting model_fp
         configs = ExperimentConfigs.read_json(configs_fp)
         model_fp = configs.get_ref(configs.user.run_dlc.model_fp)
+        precision_px = configs.get_ref(configs.user.run_dlc.keypoints_precision_px)
         # Derive more parameters
         temp_dlc_dir = os.path.join(CACHE_DIR, f"dlc_{gputouse}")
         keypoints_dir = os.path.dirname(keypoints_fp)
@@ -78,7 +79,7 @@ class RunDLC:
         run_dlc_subproc(model_fp, [formatted_vid_fp], temp_dlc_dir, CACHE_DIR, gputouse, logger)
 
         # Exporting the h5 to chosen file format
-        export2df(formatted_vid_fp, temp_dlc_dir, keypoints_dir, logger)
+        export2df(formatted_vid_fp, temp_dlc_dir, keypoints_dir, logger, precision_px)
         silent_remove(temp_dlc_dir)
 
         return get_io_obj_content(io_obj)
@@ -121,6 +122,8 @@ class RunDLC:
         dlc_fp_ls = [os.path.join(configs_dir, f"{i}.json") for i in dlc_fp_ls]
         # Reading their configs
         dlc_fp_ls = [ExperimentConfigs.read_json(i) for i in dlc_fp_ls]
+        # Getting their keypoints storage precision
+        precision_px_ls = [i.get_ref(i.user.run_dlc.keypoints_precision_px) for i in dlc_fp_ls]
         # Getting their model_fp
         dlc_fp_ls = [i.user.run_dlc.model_fp for i in dlc_fp_ls]
         # Converting to a set
@@ -139,8 +142,8 @@ class RunDLC:
         run_dlc_subproc(model_fp, vid_fp_ls, temp_dlc_dir, CACHE_DIR, gputouse, logger)
 
         # Exporting the h5 to chosen file format
-        for vid_fp in vid_fp_ls:
-            export2df(vid_fp, temp_dlc_dir, keypoints_dir, logger)
+        for vid_fp, precision_px in zip(vid_fp_ls, precision_px_ls):
+            export2df(vid_fp, temp_dlc_dir, keypoints_dir, logger, precision_px)
         silent_remove(temp_dlc_dir)
         return get_io_obj_content(io_obj)
 
@@ -188,9 +191,18 @@ def run_dlc_subproc(
     silent_remove(script_fp)
 
 
-def export2df(name: str, src_dir: str, dst_dir: str, logger: logging.Logger) -> None:
+def export2df(
+    name: str,
+    src_dir: str,
+    dst_dir: str,
+    logger: logging.Logger,
+    precision_px: None | float = None,
+) -> None:
     """
-    __summary__
+    Exports the DLC .h5 file of the video to the keypoints file.
+
+    If `precision_px` is specified, the keypoints are stored with the quantised codec
+    (refer to `KeypointsDf.write_quantised`).
     """
     name = get_name(name)
     # Get the corresponding .h5 filename
@@ -209,7 +221,11 @@ def export2df(name: str, src_dir: str, dst_dir: str, logger: logging.Logger) ->
         lhoods_idx = pd.IndexSlice[:, :, :, CoordsCols.LIKELIHOOD.value]
         df.loc[:, lhoods_idx] = df.loc[:, lhoods_idx].clip(0, 1)  # type: ignore
         # Writing the file
-        KeypointsDf.write(df, os.path.join(dst_dir, f"{name}.{KeypointsDf.IO}"))
+        dst_fp = os.path.join(dst_dir, f"{name}.{KeypointsDf.IO}")
+        if precision_px is None:
+            KeypointsDf.write(df, dst_fp)
+        else:
+            KeypointsDf.write_quantised(df, dst_fp, precision_px)
         logger.info("Outputted DLC file.")
 
     else:
@@ -11,16 +11,20 @@ from behavysis.pydantic_models.processes.analyse import (
     AnalyseConfigs,
     FreezingConfigs,
     InRoiConfigs,
+    MotionEnergyConfigs,
+    OccupancyConfigs,
+    SocialContactConfigs,
     SocialDistanceConfigs,
     SpeedConfigs,
 )
 from behavysis.pydantic_models.processes.calculate_params import CalculateParamsConfigs, FromLikelihoodConfigs
-from behavysis.pydantic_models.processes.classify_behavs import ClassifyBehavConfigs
+from behavysis.pydantic_models.processes.classify_behavs import ClassifyBehavConfigs, RuleBehavConfigs
 from behavysis.pydantic_models.processes.evaluate_vid import EvaluateVidConfigs
 from behavysis.pydantic_models.processes.extract_features import ExtractFeaturesConfigs
 from behavysis.pydantic_models.processes.format_vid import FormatVidConfigs, VidMetadata
 from behavysis.pydantic_models.processes.preprocess import PreprocessConfigs, RefineIdsConfigs
 from behavysis.pydantic_models.processes.run_dlc import RunDlcConfigs
+from behavysis.utils.bout_array import BOUT_ATTRIBUTIONS
 from behavysis.utils.pydantic_base_model import PydanticBaseModel
 
 
@@ -31,6 +35,7 @@ class UserConfigs(PydanticBaseModel):
     preprocess: PreprocessConfigs = PreprocessConfigs()
     extract_features: ExtractFeaturesConfigs = ExtractFeaturesConfigs()
     classify_behavs: list[ClassifyBehavConfigs] = list()
+    rule_behavs: list[RuleBehavConfigs] = list()
     analyse: AnalyseConfigs = AnalyseConfigs()
     evaluate_vid: EvaluateVidConfigs = EvaluateVidConfigs()
 
@@ -87,11 +92,22 @@ class ExperimentConfigs(PydanticBaseModel):
         -------
         tuple[ float, float, float, float, list, list, ]
             _description_
+
+        Raises
+        ------
+        ValueError
+            The `user.analyse.bout_attribution` (once resolved) is not one of `BOUT_ATTRIBUTIONS`.
         """
         assert self.auto.formatted_vid.fps
         assert self.auto.formatted_vid.width_px
         assert self.auto.formatted_vid.height_px
         assert self.auto.px_per_mm
+        bout_attribution = self.get_ref(self.user.analyse.bout_attribution)
+        if bout_attribution not in BOUT_ATTRIBUTIONS:
+            raise ValueError(
+                f"The bout_attribution, {bout_attribution}, is not valid. "
+                f"Possible bout attributions are {BOUT_ATTRIBUTIONS}."
+            )
         return (
             float(self.auto.formatted_vid.fps),
             float(self.auto.formatted_vid.width_px),
@@ -114,7 +130,10 @@ def get_default_configs() -> ExperimentConfigs:
                 in_roi=[InRoiConfigs(roi_corners="--bpts_corners", bodyparts="--bpts_front")],
                 speed=SpeedConfigs(bodyparts="--bpts_centre"),
                 social_distance=SocialDistanceConfigs(bodyparts="--bpts_centre"),
+                social_contact=SocialContactConfigs(bodyparts="--bpts_simba"),
                 freezing=FreezingConfigs(bodyparts="--bpts_centre"),
+                occupancy=OccupancyConfigs(bodyparts="--bpts_centre"),
+                motion_energy=MotionEnergyConfigs(bodyparts="--bpts_simba"),
             ),
         ),
         ref=RefConfigs.model_validate(
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from behavysis.constants import BPTS_CORNERS, BPTS_SIMBA
 from behavysis.utils.pydantic_base_model import PydanticBaseModel
 
@@ -12,6 +14,12 @@ class SocialDistanceConfigs(PydanticBaseModel):
     bodyparts: list[str] | str = BPTS_SIMBA
 
 
+class SocialContactConfigs(PydanticBaseModel):
+    window_sec: float | str = 0.5
+    thresh_mm: float | str = 10
+    bodyparts: list[str] | str = BPTS_SIMBA
+
+
 class FreezingConfigs(PydanticBaseModel):
     window_sec: float | str = 2
     thresh_mm: float | str = 5
@@ -19,6 +27,20 @@ class FreezingConfigs(PydanticBaseModel):
     bodyparts: list[str] | str = BPTS_SIMBA
 
 
+class OccupancyConfigs(PydanticBaseModel):
+    cell_mm: float | str = 20
+    bodyparts: list[str] | str = BPTS_SIMBA
+
+
+class MotionEnergyConfigs(PydanticBaseModel):
+    scale: float | str = 0.25
+    stride_frames: int | str = 1
+    in_rois: bool | str = False
+    padding_mm: float | str = 20
+    bodyparts: list[str] | str = BPTS_SIMBA
+    n_workers: int | str = 1
+
+
 class InRoiConfigs(PydanticBaseModel):
     roi_name: str = "in_my_roi"
     is_in: bool | str = True
@@ -30,8 +52,12 @@ class InRoiConfigs(PydanticBaseModel):
 class AnalyseConfigs(PydanticBaseModel):
     bins_sec: list[int] | str = [30, 60, 120]
     custom_bins_sec: list[int] | str = [60, 120, 300, 600]
+    bout_attribution: Literal["split", "start", "majority"] | str = "split"
 
     speed: SpeedConfigs = SpeedConfigs()
     social_distance: SocialDistanceConfigs = SocialDistanceConfigs()
+    social_contact: SocialContactConfigs = SocialContactConfigs()
     freezing: FreezingConfigs = FreezingConfigs()
     in_roi: list[InRoiConfigs] = list()
+    occupancy: OccupancyConfigs = OccupancyConfigs()
+    motion_energy: MotionEnergyConfigs = MotionEnergyConfigs()
@@ -9,3 +9,18 @@ class ClassifyBehavConfigs(PydanticBaseModel):
     pcutoff: float | str = -1
     min_empty_window_secs: float | str = 0.2
     user_defined: list[str] | str = []
+
+
+class RuleVariableConfigs(PydanticBaseModel):
+    analysis: str = "speed"
+    individual: str = "mouse1marked"
+    measure: str = "SpeedMMperSecSmoothed"
+
+
+class RuleBehavConfigs(PydanticBaseModel):
+    behav_name: str = "behav_name"
+    expression: str = "speed < 20"
+    variables: dict[str, RuleVariableConfigs] = {"speed": RuleVariableConfigs()}
+    min_bout_secs: float | str = 0
+    min_empty_window_secs: float | str = 0.2
+    user_defined: list[str] | str = []
@@ -1,4 +1,6 @@
-from matplotlib import pyplot as plt
+import functools
+
+import matplotlib
 from pydantic import field_validator
 
 from behavysis.df_classes.keypoints_df import KeypointsDf
@@ -6,6 +8,12 @@ from behavysis.utils.misc_utils import enum2tuple
 from behavysis.utils.pydantic_base_model import PydanticBaseModel
 
 
+@functools.cache
+def get_cmaps() -> tuple[str, ...]:
+    """Returns the names of the registered matplotlib colormaps (cached, as this is slow)."""
+    return tuple(sorted(matplotlib.colormaps))
+
+
 class EvaluateVidConfigs(PydanticBaseModel):
     funcs: list[str] | str = ["keypoints", "analysis"]
     pcutoff: float | str = 0.8
@@ -17,7 +25,7 @@ class EvaluateVidConfigs(PydanticBaseModel):
     @field_validator("cmap")
     @classmethod
     def validate_cmap(cls, v):
-        return cls.validate_attr_closed_set(v, plt.colormaps())
+        return cls.validate_attr_closed_set(v, get_cmaps())
 
     @field_validator("colour_level")
     @classmethod
@@ -35,7 +43,7 @@ class KeypointsConfigs(PydanticBaseModel):
     @field_validator("cmap")
     @classmethod
     def validate_cmap(cls, v):
-        return cls.validate_attr_closed_set(v, plt.colormaps())
+        return cls.validate_attr_closed_set(v, get_cmaps())
 
     @field_validator("colour_level")
     @classmethod
@@ -4,8 +4,18 @@ from behavysis.constants import BPTS_SIMBA
 from behavysis.utils.pydantic_base_model import PydanticBaseModel
 
 
+class RemoveOutliersConfigs(PydanticBaseModel):
+    pcutoff: float | str = 0.5
+    max_speed_mm_per_sec: None | float | str = 1000
+    body_length_bodyparts: list[str] | str = ["Nose", "TailBase1"]
+    body_length_percentile: float | str = 95
+    max_body_length_mult: None | float | str = 1.5
+
+
 class InterpolateConfigs(PydanticBaseModel):
     pcutoff: float | str = 0.5
+    max_gap_frames: None | int | str = None
+    flag_gaps: bool | str = False
 
 
 class InterpolateStationaryConfigs(PydanticBaseModel):
@@ -25,7 +35,19 @@ class RefineIdsConfigs(PydanticBaseModel):
     metric: Literal["current", "rolling", "binned"] | str = "current"
 
 
+class SmoothConfigs(PydanticBaseModel):
+    method: Literal["savgol", "median", "kalman"] | str = "savgol"
+    window_sec: float | str = 0.2
+    polyorder: int | str = 2
+    pcutoff: float | str = 0.5
+    process_noise: float | str = 1.0
+    measurement_noise: float | str = 1.0
+
+
 class PreprocessConfigs(PydanticBaseModel):
+    remove_outliers: RemoveOutliersConfigs = RemoveOutliersConfigs()
     interpolate: InterpolateConfigs = InterpolateConfigs()
+    smooth: SmoothConfigs = SmoothConfigs()
     interpolate_stationary: list[InterpolateStationaryConfigs] = list()
     refine_ids: RefineIdsConfigs = RefineIdsConfigs()
+    chunk_frames: None | int | str = None
@@ -5,3 +5,5 @@ from behavysis.utils.pydantic_base_model import PydanticBaseModel
 
 class RunDlcConfigs(PydanticBaseModel):
     model_fp: str = os.path.join("path", "to", "DEEPLABCUT_model", "config.yaml")
+    # If set, keypoints are stored with the quantised codec (refer to `KeypointsDf.write_quantised`)
+    keypoints_precision_px: None | float | str = None
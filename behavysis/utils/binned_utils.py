@@ -0,0 +1,275 @@
+"""
+Binned statistics of the columns of a (frames, columns) array, for many bin sizes at once.
+
+Frames are binned by timestamp in the same way as `pd.cut(timestamps, edges, include_lowest=True)`,
+i.e. `(e[i - 1], e[i]]` bins, with the first bin also including its left edge (refer to `get_bins_idx`).
+
+The bins of all bin sizes are merged into the finest common bins (each bin of each bin size is a
+contiguous run of the finest bins), and mergeable partial aggregates are computed once for the finest bins:
+
+- Quantitative columns: the count, sum, and sum of squared deviations (from the bin mean)
+  of the non-NaN values. The bins of each bin size are rolled up from these partials
+  (the sums of squared deviations are merged as in Chan et al.'s parallel variance algorithm).
+- Order statistics (min, quantiles, and max) are not mergeable, so each column is sorted once. The sorted values
+  are regrouped by the bins of each bin size with a stable (radix) sort of their bin indexes,
+  which keeps the values sorted within each bin.
+- Behaviour columns: the bouts (runs of 1 values) are run-length encoded once, and attributed to
+  the bins of each bin size with `np.searchsorted` on the bins' frame bounds (so each bin size costs
+  O(bouts + bins), rather than O(frames)).
+
+So computing the binned statistics of N bin sizes costs about the same as one.
+"""
+
+import numpy as np
+
+from behavysis.utils.bout_array import BoutArray
+
+QUANTITATIVE_AGGS = ["mean", "std", "min", "Q1", "median", "Q3", "max"]
+BEHAVS_AGGS = [
+    "bout_freq",
+    "bout_dur_total",
+    "bout_dur_mean",
+    "bout_dur_std",
+    "bout_dur_min",
+    "bout_dur_Q1",
+    "bout_dur_median",
+    "bout_dur_Q3",
+    "bout_dur_max",
+]
+
+
+def get_bins_idx(timestamps: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Returns the bin index of each timestamp, given the (increasing) bin edges
+    (the same as the codes of `pd.cut(timestamps, edges, include_lowest=True)`).
+
+    Timestamps outside the edges have an index of -1.
+    """
+    timestamps = np.asarray(timestamps)
+    edges = np.asarray(edges)
+    bins_idx = np.searchsorted(edges, timestamps, side="left") - 1
+    # The first bin includes its left edge
+    bins_idx[timestamps == edges[0]] = 0
+    bins_idx[(timestamps < edges[0]) | (timestamps > edges[-1])] = -1
+    return bins_idx
+
+
+def get_bins_bounds(timestamps: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    Returns the `(bins + 1,)` frame bounds of the bins, given the (increasing) timestamps and bin edges
+    (the bin `i` is the frames `bounds[i]` to `bounds[i + 1] - 1`, the same as `get_bins_idx`).
+    """
+    bounds = np.searchsorted(timestamps, edges, side="right")
+    # The first bin includes its left edge
+    bounds[0] = np.searchsorted(timestamps, edges[0], side="left")
+    return bounds
+
+
+def sorted_order_stats(sorted_vals: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Returns the min, Q1, median, Q3, and max of each group of sorted values
+    (the group `i` is `sorted_vals[starts[i] : starts[i] + counts[i]]`).
+
+    The quantiles are linearly interpolated between the closest ranks (the same as `np.nanquantile`).
+    Groups with a count of 0 have NaN statistics.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    last = np.maximum(counts - 1, 0)
+    # Clipping indexes of empty groups (their statistics are NaN)
+    n_max = max(sorted_vals.shape[0] - 1, 0)
+
+    def get_vals(idx: np.ndarray) -> np.ndarray:
+        return sorted_vals[np.minimum(starts + idx, n_max)] if sorted_vals.shape[0] > 0 else np.full(idx.shape, np.nan)
+
+    def get_quantile(q: float) -> np.ndarray:
+        # Same as `np.quantile`'s `_lerp`
+        pos = last * q
+        lo = np.floor(pos).astype(np.int64)
+        t = pos - lo
+        a = get_vals(lo)
+        b = get_vals(np.ceil(pos).astype(np.int64))
+        diff = b - a
+        return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+    with np.errstate(invalid="ignore"):
+        stats = {
+            "min": get_vals(np.zeros_like(counts)),
+            "Q1": get_quantile(0.25),
+            # Middle (or two middle) values
+            "median": (get_vals(last // 2) + get_vals(counts // 2)) / 2,
+            "Q3": get_quantile(0.75),
+            "max": get_vals(last),
+        }
+    return {agg: np.where(counts > 0, values, np.nan) for agg, values in stats.items()}
+
+
+def get_finest_bins_idx(bins_idx_ls: list[np.ndarray], n_frames: int) -> np.ndarray:
+    """
+    Returns the finest common bin index of each frame, given each bin size's bin indexes
+    of the frames (a new finest bin starts wherever any bin size's bin changes).
+    """
+    is_change = np.zeros(n_frames, dtype=bool)
+    for bins_idx in bins_idx_ls:
+        is_change[1:] |= bins_idx[1:] != bins_idx[:-1]
+    return np.cumsum(is_change)
+
+
+def binned_quantitative_stats(
+    arr: np.ndarray, timestamps: np.ndarray, edges_ls: list[np.ndarray]
+) -> list[dict[str, np.ndarray]]:
+    """
+    Returns the mean, std, min, Q1, median, Q3, and max of each column of the `(frames, columns)` array
+    in each bin of each bin size (refer to `AnalysisSummaryDf.agg_quantitative`), ignoring NaN values.
+
+    Parameters
+    ----------
+    arr : np.ndarray
+        `(frames, columns)` array of the values.
+    timestamps : np.ndarray
+        `(frames,)` array of the (increasing) timestamps of the frames.
+    edges_ls : list[np.ndarray]
+        Each bin size's bin edges (refer to `get_bins_idx`). Frames outside the edges are excluded.
+
+    Returns
+    -------
+    list[dict[str, np.ndarray]]
+        Each bin size's `(bins, columns)` arrays of each statistic.
+        Bins without frames have statistics of 0 (the same as `agg_quantitative` of an empty df).
+    """
+    arr = np.asarray(arr, dtype=np.float64)
+    n_frames, n_cols = arr.shape
+    bins_idx_ls = [get_bins_idx(timestamps, edges) for edges in edges_ls]
+    # Getting the finest bins' partial aggregates
+    fine_idx = get_finest_bins_idx(bins_idx_ls, n_frames)
+    fine_starts = np.flatnonzero(np.diff(fine_idx, prepend=-1))
+    is_valid = ~np.isnan(arr)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fine_counts = _reduceat(np.add, is_valid.astype(np.int64), fine_starts)
+        fine_sums = _reduceat(np.add, np.where(is_valid, arr, 0), fine_starts)
+        fine_means = fine_sums / fine_counts
+        devs = np.where(is_valid, arr - fine_means[fine_idx], 0)
+        fine_m2s = _reduceat(np.add, devs * devs, fine_starts)
+    # Sorting each column once (NaN values are sorted to the end)
+    order = np.argsort(arr, axis=0, kind="stable")
+    sorted_arr = np.take_along_axis(arr, order, axis=0)
+    stats_ls = []
+    for edges, bins_idx in zip(edges_ls, bins_idx_ls):
+        n_bins = len(edges) - 1
+        # Rolling up the finest bins' partials to the bins
+        coarse_idx = bins_idx[fine_starts]
+        is_in = coarse_idx >= 0
+        coarse_idx = coarse_idx[is_in]
+        counts = _group_reduce(np.add, fine_counts[is_in], coarse_idx, n_bins)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = _group_reduce(np.add, fine_sums[is_in], coarse_idx, n_bins) / counts
+            # Merging the sums of squared deviations (Chan et al.)
+            mean_devs = np.where(fine_counts[is_in] > 0, fine_means[is_in] - means[coarse_idx], 0)
+            m2s = _group_reduce(np.add, fine_m2s[is_in] + fine_counts[is_in] * mean_devs**2, coarse_idx, n_bins)
+            stats = {"mean": means, "std": np.sqrt(m2s / counts)}
+        # Regrouping the sorted values by bin (a stable sort, so each bin's values stay sorted).
+        # Frames outside the bins are grouped first.
+        sorted_bins_idx = (bins_idx[order] + 1).astype(np.min_scalar_type(n_bins))
+        perm = np.argsort(sorted_bins_idx, axis=0, kind="stable")
+        grouped_arr = np.take_along_axis(sorted_arr, perm, axis=0)
+        # Getting each (bin, column) group's start in the column-major flattened grouped array
+        bin_n_frames = np.bincount(bins_idx + 1, minlength=n_bins + 1)
+        bin_starts = np.cumsum(bin_n_frames) - bin_n_frames
+        starts = bin_starts[1:, None] + np.arange(n_cols) * n_frames
+        order_stats = sorted_order_stats(grouped_arr.ravel(order="F"), starts.ravel(), counts.ravel())
+        stats.update({agg: values.reshape(n_bins, n_cols) for agg, values in order_stats.items()})
+        # Bins without frames have statistics of 0
+        is_empty = (bin_n_frames[1:] == 0)[:, None]
+        stats_ls.append({agg: np.where(is_empty, 0.0, stats[agg]) for agg in QUANTITATIVE_AGGS})
+    return stats_ls
+
+
+def binned_behavs_stats(
+    arr: np.ndarray, timestamps: np.ndarray, edges_ls: list[np.ndarray], fps: float, attribution: str = "split"
+) -> list[dict[str, np.ndarray]]:
+    """
+    Returns the number of bouts, and the total, mean, std, min, Q1, median, Q3, and max of the bout durations
+    (in seconds) of each column of the `(frames, columns)` behaviour array in each bin of each bin size
+    (refer to `AnalysisSummaryDf.agg_behavs`).
+
+    Bouts are the runs of 1 values. Bouts that span more than one bin are attributed to the bins
+    by `attribution` (refer to `BoutArray.split_bins`).
+
+    Parameters
+    ----------
+    arr : np.ndarray
+        `(frames, columns)` array of the behaviour values.
+    timestamps : np.ndarray
+        `(frames,)` array of the (increasing) timestamps of the frames.
+    edges_ls : list[np.ndarray]
+        Each bin size's bin edges (refer to `get_bins_idx`). Frames outside the edges are excluded.
+    fps : float
+        The frames per second of the bout durations.
+    attribution : str
+        How bouts that span more than one bin are attributed: `"split"` (a bout in each bin),
+        `"start"` (the bin of the first frame), or `"majority"` (the bin with the most frames).
+
+    Returns
+    -------
+    list[dict[str, np.ndarray]]
+        Each bin size's `(bins, columns)` arrays of each statistic.
+        Bins without bouts have duration statistics of 0.
+    """
+    n_cols = arr.shape[1]
+    # Getting the bouts of all columns once
+    bouts_ls = BoutArray.from_arr(np.asarray(arr) == 1)
+    stats_ls = []
+    for edges in edges_ls:
+        n_bins = len(edges) - 1
+        bounds = get_bins_bounds(timestamps, edges)
+        # Attributing each column's bouts to the bins
+        durs_ls, groups_ls = [], []
+        for i, bouts in enumerate(bouts_ls):
+            bins_idx, bins_bouts = bouts.split_bins(bounds, attribution)
+            durs_ls.append(bins_bouts.durs / fps)
+            groups_ls.append(bins_idx * n_cols + i)
+        durs = np.concatenate(durs_ls + [np.zeros(0)])
+        groups = np.concatenate(groups_ls + [np.zeros(0, dtype=np.int64)])
+        stats_ls.append(_grouped_durs_stats(durs, groups, n_bins, n_cols))
+    return stats_ls
+
+
+def _grouped_durs_stats(durs: np.ndarray, groups: np.ndarray, n_bins: int, n_cols: int) -> dict[str, np.ndarray]:
+    """Returns the `(bins, columns)` bout statistics of the durations in each `bin * n_cols + col` group."""
+    n_groups = n_bins * n_cols
+    # Sorting durations by group, then duration
+    order = np.lexsort((durs, groups))
+    durs = durs[order]
+    groups = groups[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    totals = np.bincount(groups, weights=durs, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = totals / counts
+        devs = durs - means[groups]
+        stds = np.sqrt(np.bincount(groups, weights=devs * devs, minlength=n_groups) / counts)
+    order_stats = sorted_order_stats(durs, np.cumsum(counts) - counts, counts)
+    stats = {
+        "bout_freq": counts.astype(np.float64),
+        "bout_dur_total": totals,
+        "bout_dur_mean": means,
+        "bout_dur_std": stds,
+        **{f"bout_dur_{agg}": values for agg, values in order_stats.items()},
+    }
+    # Groups without bouts have duration statistics of 0
+    return {agg: np.where(counts > 0, stats[agg], 0.0).reshape(n_bins, n_cols) for agg in BEHAVS_AGGS}
+
+
+def _reduceat(ufunc: np.ufunc, arr: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """`ufunc.reduceat` along the first axis of the contiguous segments starting at `starts` (can be empty)."""
+    if starts.shape[0] == 0:
+        return np.zeros((0, *arr.shape[1:]), dtype=arr.dtype)
+    return ufunc.reduceat(arr, starts, axis=0)
+
+
+def _group_reduce(ufunc: np.ufunc, arr: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """Reduces the rows of each (non-decreasing) group along the first axis (groups without rows are 0)."""
+    out = np.zeros((n_groups, *arr.shape[1:]), dtype=arr.dtype)
+    is_first = np.diff(groups, prepend=-1) != 0
+    out[groups[is_first]] = _reduceat(ufunc, arr, np.flatnonzero(is_first))
+    return out
+
@@ -0,0 +1,226 @@
+"""
+Run-length encoded bouts.
+
+A `BoutArray` stores bouts (i.e. runs of consecutive frames) as parallel `starts`, `stops`,
+and `values` arrays, so bout operations (construction from frame vectors, gap merging,
+duration filtering, set operations, clipping, and summary statistics) are vectorised
+instead of looping over each bout.
+
+Bouts use frame positions (i.e. 0 is the first frame of the vector they were made from),
+and `stops` are inclusive (the same as `BoutCols` and the `Bout` model).
+"""
+
+from typing import Any
+
+import numpy as np
+
+BOUT_ATTRIBUTIONS = ["split", "start", "majority"]
+
+
+class BoutArray:
+    """
+    Bouts as parallel `starts`, `stops` (inclusive), and `values` arrays.
+
+    Bouts are sorted and do not overlap.
+    Bouts made from bool vectors (i.e. the True runs) all have the value True.
+    """
+
+    def __init__(self, starts: Any, stops: Any, values: Any = None) -> None:
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.stops = np.asarray(stops, dtype=np.int64)
+        self.values = np.ones(self.starts.shape[0], dtype=bool) if values is None else np.asarray(values)
+
+    def __len__(self) -> int:
+        return self.starts.shape[0]
+
+    def __repr__(self) -> str:
+        return f"BoutArray(starts={self.starts}, stops={self.stops}, values={self.values})"
+
+    @property
+    def durs(self) -> np.ndarray:
+        """Number of frames of each bout."""
+        return self.stops - self.starts + 1
+
+    ###############################################################################################
+    #               CONSTRUCTION
+    ###############################################################################################
+
+    @classmethod
+    def from_vect(cls, vect: Any) -> "BoutArray":
+        """Bouts of the True runs of a bool vector."""
+        # Padding with False so runs at the edges have a start and stop
+        z = np.concatenate(([0], np.asarray(vect, dtype=np.int8), [0]))
+        changes = np.diff(z)
+        return cls(np.flatnonzero(changes == 1), np.flatnonzero(changes == -1) - 1)
+
+    @classmethod
+    def from_arr(cls, arr: Any) -> list["BoutArray"]:
+        """
+        Bouts of the True runs of each column of a (frames, columns) bool array.
+
+        All columns are run-length encoded in one pass: the columns are concatenated
+        (separated by a False value) and the run starts and stops are found with `np.diff`.
+        """
+        arr = np.asarray(arr, dtype=np.int8)
+        n_frames, n_cols = arr.shape
+        # Concatenating columns, each followed by a False separator
+        padded = np.zeros((n_frames + 1, n_cols), dtype=np.int8)
+        padded[:n_frames] = arr
+        changes = np.diff(np.concatenate(([0], padded.ravel(order="F"))))
+        starts = np.flatnonzero(changes == 1)
+        stops = np.flatnonzero(changes == -1) - 1
+        # Splitting the bouts by column
+        splits = np.searchsorted(starts, np.arange(1, n_cols) * (n_frames + 1))
+        return [
+            cls(col_starts - i * (n_frames + 1), col_stops - i * (n_frames + 1))
+            for i, (col_starts, col_stops) in enumerate(zip(np.split(starts, splits), np.split(stops, splits)))
+        ]
+
+    @classmethod
+    def from_runs(cls, vect: Any) -> "BoutArray":
+        """Bouts of every run of equal values in a vector (with each run's value)."""
+        vect = np.asarray(vect)
+        if vect.shape[0] == 0:
+            return cls([], [], vect[:0])
+        starts = np.concatenate(([0], np.flatnonzero(vect[1:] != vect[:-1]) + 1))
+        stops = np.concatenate((starts[1:] - 1, [vect.shape[0] - 1]))
+        return cls(starts, stops, vect[starts])
+
+    def to_vect(self, n_frames: int) -> np.ndarray:
+        """Bool vector of `n_frames` that is True in the bouts' frames."""
+        marks = np.bincount(self.starts, minlength=n_frames + 1)[: n_frames + 1]
+        marks -= np.bincount(self.stops + 1, minlength=n_frames + 1)[: n_frames + 1]
+        return np.cumsum(marks[:n_frames]) > 0
+
+    ###############################################################################################
+    #               OPERATIONS
+    ###############################################################################################
+
+    def _select(self, is_selected: np.ndarray) -> "BoutArray":
+        return BoutArray(self.starts[is_selected], self.stops[is_selected], self.values[is_selected])
+
+    def filter_dur(self, min_dur: int = 0, max_dur: None | int = None) -> "BoutArray":
+        """Bouts with a duration (in frames) between `min_dur` and `max_dur` (inclusive)."""
+        durs = self.durs
+        is_selected = durs >= min_dur
+        if max_dur is not None:
+            is_selected &= durs <= max_dur
+        return self._select(is_selected)
+
+    def merge_gaps(self, max_gap: int) -> "BoutArray":
+        """
+        Merges consecutive bouts separated by gaps of `max_gap` frames or fewer.
+        Merged bouts have the value of their first bout.
+        """
+        gaps = self.starts[1:] - self.stops[:-1] - 1
+        # Each merged bout starts at a bout after a long gap, and stops at a bout before a long gap
+        is_long_gap = gaps > max_gap
+        is_first = np.concatenate(([True], is_long_gap))[: len(self)]
+        is_last = np.concatenate((is_long_gap, [True]))[: len(self)]
+        return BoutArray(self.starts[is_first], self.stops[is_last], self.values[is_first])
+
+    def intersection(self, other: "BoutArray") -> "BoutArray":
+        """Bouts of the frames in both bout arrays."""
+        n_frames = self._get_n_frames(other)
+        return BoutArray.from_vect(self.to_vect(n_frames) & other.to_vect(n_frames))
+
+    def union(self, other: "BoutArray") -> "BoutArray":
+        """Bouts of the frames in either bout array (adjacent bouts are joined)."""
+        n_frames = self._get_n_frames(other)
+        return BoutArray.from_vect(self.to_vect(n_frames) | other.to_vect(n_frames))
+
+    def _get_n_frames(self, other: "BoutArray") -> int:
+        return int(max(self.stops.max(initial=-1), other.stops.max(initial=-1))) + 1
+
+    def clip(self, start: int, stop: int) -> "BoutArray":
+        """Bouts clipped to the frames `start` to `stop` (inclusive). Bouts outside are removed."""
+        starts = np.maximum(self.starts, start)
+        stops = np.minimum(self.stops, stop)
+        is_selected = starts <= stops
+        return BoutArray(starts[is_selected], stops[is_selected], self.values[is_selected])
+
+    def split_bins(self, bounds: Any, attribution: str = "split") -> tuple[np.ndarray, "BoutArray"]:
+        """
+        Bouts attributed to the contiguous bins of frames `bounds[i]` to `bounds[i + 1] - 1`,
+        and the bin index of each bout.
+
+        Bouts are clipped to the bins' frames, and each bout's first and last bin are found with
+        `np.searchsorted` on the bounds, so this is O(bouts + bins).
+        Bouts that span more than one bin are:
+
+        - `"split"`: split into a bout in each bin (clipped to the bin).
+        - `"start"`: attributed to the bin of their first frame (not split).
+        - `"majority"`: attributed to the bin with the most of their frames (not split).
+          Ties are attributed to the earliest bin.
+        """
+        if attribution not in BOUT_ATTRIBUTIONS:
+            raise ValueError(
+                f"The attribution, {attribution}, is not valid. Possible attributions are {BOUT_ATTRIBUTIONS}."
+            )
+        bounds = np.asarray(bounds, dtype=np.int64)
+        bouts = self.clip(bounds[0], bounds[-1] - 1)
+        first_bins = np.searchsorted(bounds, bouts.starts, side="right") - 1
+        if attribution == "start":
+            return first_bins, bouts
+        last_bins = np.searchsorted(bounds, bouts.stops, side="right") - 1
+        # Getting the part of each bout in each bin from its first to last bin (bins without frames have no part)
+        n_parts = last_bins - first_bins + 1
+        parts_firsts = np.cumsum(n_parts) - n_parts
+        parts_bouts = np.repeat(np.arange(len(bouts)), n_parts)
+        parts_bins = first_bins[parts_bouts] + np.arange(parts_bouts.shape[0]) - parts_firsts[parts_bouts]
+        parts_starts = np.maximum(bouts.starts[parts_bouts], bounds[parts_bins])
+        parts_stops = np.minimum(bouts.stops[parts_bouts], bounds[parts_bins + 1] - 1)
+        if attribution == "split":
+            is_part = parts_starts <= parts_stops
+            parts = BoutArray(parts_starts[is_part], parts_stops[is_part], bouts.values[parts_bouts[is_part]])
+            return parts_bins[is_part], parts
+        # Getting the (first) bin with each bout's longest part
+        parts_durs = parts_stops - parts_starts + 1
+        max_durs = np.maximum.reduceat(parts_durs, parts_firsts) if len(bouts) > 0 else parts_durs
+        is_max = np.flatnonzero(parts_durs == np.repeat(max_durs, n_parts))
+        is_first_max = np.diff(parts_bouts[is_max], prepend=-1) != 0
+        return parts_bins[is_max[is_first_max]], bouts
+
+    ###############################################################################################
+    #               SUMMARIES
+    ###############################################################################################
+
+    def get_modes(self, vect: Any) -> np.ndarray:
+        """
+        The mode of the vector's values in each bout's frames.
+        Same as `scipy.stats.mode` for each bout (the smallest mode is used for ties).
+        """
+        vect = np.asarray(vect)
+        uniques = np.unique(vect)
+        # Counting each unique value in each bout with cumulative counts
+        counts = np.zeros((len(self), uniques.shape[0]), dtype=np.int64)
+        for i, value in enumerate(uniques):
+            cum_counts = np.concatenate(([0], np.cumsum(vect == value)))
+            counts[:, i] = cum_counts[self.stops + 1] - cum_counts[self.starts]
+        return uniques[np.argmax(counts, axis=1)]
+
+    def get_sums(self, vect: Any) -> np.ndarray:
+        """The sum of the vector's values in each bout's frames."""
+        cum_sums = np.concatenate(([0], np.cumsum(np.asarray(vect, dtype=np.float64))))
+        return cum_sums[self.stops + 1] - cum_sums[self.starts]
+
+    def summary(self, fps: float = 1.0) -> dict[str, float]:
+        """
+        Number of bouts, and the total, mean, std, min, Q1, median, Q3, and max
+        of the bout durations (in seconds, given `fps`).
+        The duration statistics are 0 if there are no bouts.
+        """
+        durs = self.durs / fps
+        # Handling edge case where there are no bouts
+        durs = np.array([0.0]) if durs.shape[0] == 0 else durs.astype(np.float64)
+        return {
+            "bout_freq": len(self),
+            "bout_dur_total": np.nansum(durs),
+            "bout_dur_mean": np.nanmean(durs),
+            "bout_dur_std": np.nanstd(durs),
+            "bout_dur_min": np.nanmin(durs),
+            "bout_dur_Q1": np.nanquantile(durs, q=0.25),
+            "bout_dur_median": np.nanmedian(durs),
+            "bout_dur_Q3": np.nanquantile(durs, q=0.75),
+            "bout_dur_max": np.nanmax(durs),
+        }
@@ -0,0 +1,113 @@
+"""
+Batched configs updates.
+
+While a `ConfigsSession` is active for a configs file, `PydanticBaseModel.read_json`
+returns (copies of) the session's in-memory model, and `PydanticBaseModel.write_json`
+updates this model instead of the file.
+The file is parsed and validated once when first read, and all updates are committed
+with a single atomic write when the session exits.
+Sessions with `persist=False` discard their updates instead (e.g. to try config values
+without changing the file).
+
+Example
+-------
+>>> with ConfigsSession(configs_fp):
+...     CalculateParams.start_frame_from_likelihood(keypoints_fp, configs_fp)
+...     CalculateParams.stop_frame_from_likelihood(keypoints_fp, configs_fp)
+...     # configs_fp is written once here
+"""
+
+import copy
+import os
+import stat
+import tempfile
+from contextvars import ContextVar, Token
+from typing import Any, Callable
+
+from behavysis.utils.experiment_context import ExperimentContext
+
+_ACTIVE_SESSIONS: ContextVar[dict[str, "ConfigsSession"]] = ContextVar("configs_sessions", default={})
+
+
+class ConfigsSession:
+    """
+    Holds a configs file's model in memory and commits it once on exit
+    (only if it was written to).
+
+    The commit is atomic (refer to `write_atomic`).
+    Updates are committed even if the session exits with an exception,
+    as each `write_json` call is a completed update.
+    """
+
+    def __init__(self, fp: str, persist: bool = True) -> None:
+        self.fp = os.path.abspath(fp)
+        self.persist = persist
+        self.model: Any = None
+        self.is_dirty = False
+        self._token: None | Token = None
+
+    def __enter__(self) -> "ConfigsSession":
+        self._token = _ACTIVE_SESSIONS.set({**_ACTIVE_SESSIONS.get(), self.fp: self})
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        if self._token is not None:
+            _ACTIVE_SESSIONS.reset(self._token)
+            self._token = None
+        self.commit()
+
+    @staticmethod
+    def get_active(fp: str) -> "ConfigsSession | None":
+        """Returns the active session for the file (or None if there is no active session)."""
+        return _ACTIVE_SESSIONS.get().get(os.path.abspath(fp))
+
+    def read(self, model_cls: type, loader: Callable[[], Any]) -> Any:
+        """
+        Returns a copy of the session's model as `model_cls`.
+        The model is loaded with `loader()` on the first read.
+        """
+        if self.model is None:
+            self.model = loader()
+        if isinstance(self.model, model_cls):
+            return copy.deepcopy(self.model)
+        return model_cls.model_validate(self.model.model_dump())
+
+    def write(self, model: Any) -> None:
+        """Updates the session's model (committed on exit)."""
+        self.model = copy.deepcopy(model)
+        self.is_dirty = True
+
+    def commit(self) -> None:
+        """Writes the session's model to the file (if it was updated and the session persists)."""
+        if self.is_dirty and self.persist:
+            write_atomic(self.fp, self.model.model_dump_json(indent=2))
+            ExperimentContext.invalidate_active(self.fp)
+            self.is_dirty = False
+
+
+def write_atomic(fp: str, content: str) -> None:
+    """
+    Writes the text content to the file atomically.
+
+    The content is written to a temporary file in the same directory,
+    which is then renamed to `fp`. Readers (including other processes on shared storage)
+    therefore only ever see the old or new file, never a partially written one.
+
+    Makes the directory if it doesn't exist.
+    The file keeps its permissions if it already exists.
+    """
+    fp_dir = os.path.dirname(fp)
+    os.makedirs(fp_dir, exist_ok=True) if fp_dir else None
+    # Getting permissions (temp files are only readable by the owner)
+    mode = stat.S_IMODE(os.stat(fp).st_mode) if os.path.exists(fp) else 0o644
+    fd, temp_fp = tempfile.mkstemp(dir=fp_dir or None, prefix=f".{os.path.basename(fp)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_fp, mode)
+        os.replace(temp_fp, fp)
+    finally:
+        if os.path.exists(temp_fp):
+            os.remove(temp_fp)
@@ -31,11 +31,13 @@ def cluster_process(cluster: SpecCluster):
     """
     Makes a Dask cluster and client, runs the body in the context manager,
     then closes the client and cluster.
+
+    The client is yielded (e.g. to scatter data to the workers).
     """
     client = Client(cluster)
     print(client.dashboard_link)
     try:
-        yield
+        yield client
     finally:
         client.close()
         cluster.close()
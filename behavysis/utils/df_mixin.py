@@ -2,13 +2,19 @@
 Utility functions.
 """
 
+import json
 import os
 from enum import EnumType
+from typing import Iterable, Iterator
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from behavysis.constants import DF_IO_FORMAT
+from behavysis.utils.experiment_context import ExperimentContext
 from behavysis.utils.misc_utils import enum2tuple
+from behavysis.utils.quantised_codec import decode_quantised, encode_quantised, get_codec_meta
 
 
 class DFMixin:
@@ -50,16 +56,64 @@ class DFMixin:
 
     @classmethod
     def read_parquet(cls, fp: str) -> pd.DataFrame:
-        """Reading dataframe parquet file."""
+        """
+        Reading dataframe parquet file.
+        Files written with `write_parquet_quantised` are decoded.
+        """
         df = pd.read_parquet(fp)
+        codec_meta = get_codec_meta(pq.read_schema(fp))
+        if codec_meta is not None:
+            df = decode_quantised(df, codec_meta)
         df = cls.basic_clean(df)
         return df
 
+    @classmethod
+    def iter_parquet(
+        cls, fp: str, chunk_size: None | int, columns: None | list[tuple] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Reading dataframe parquet file in chunks of `chunk_size` rows
+        (or the whole file as one chunk if `chunk_size` is None).
+        Only the given columns (and the index) are read if `columns` is specified.
+
+        Note that memory use is also bounded by the file's row group size.
+        Files written with `write_parquet_quantised` are decoded.
+        """
+        parquet_file = pq.ParquetFile(fp)
+        index_cols = json.loads(parquet_file.schema_arrow.metadata[b"pandas"])["index_columns"]
+        codec_meta = get_codec_meta(parquet_file.schema_arrow)
+        carry: dict[str, float] = {}
+        read_cols = None
+        if columns is not None:
+            read_cols = [str(col) for col in columns] + [col for col in index_cols if isinstance(col, str)]
+        if chunk_size is None:
+            df = parquet_file.read(columns=read_cols).to_pandas()
+            if codec_meta is not None:
+                df = decode_quantised(df, codec_meta)
+            yield cls.basic_clean(df)
+            return
+        offset = 0
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=read_cols):
+            df = pa.Table.from_batches([batch]).to_pandas()
+            # A RangeIndex is stored as metadata (not a column), so offsetting it for each chunk
+            if index_cols and isinstance(index_cols[0], dict):
+                range_meta = index_cols[0]
+                start = range_meta["start"] + offset * range_meta["step"]
+                df.index = pd.RangeIndex(
+                    start, start + df.shape[0] * range_meta["step"], range_meta["step"], name=range_meta["name"]
+                )
+            offset += df.shape[0]
+            if codec_meta is not None:
+                df = decode_quantised(df, codec_meta, carry)
+            yield cls.basic_clean(df)
+
     @classmethod
     def read(cls, fp: str) -> pd.DataFrame:
         """
         Default dataframe read method.
         Based on `IO` class attribute.
+
+        If there is an active `ExperimentContext`, the df is read once and cached.
         """
         methods = {
             "csv": cls.read_csv,
@@ -70,7 +124,7 @@ class DFMixin:
         assert cls.IO in methods, (
             f"File type, {cls.IO}, not supported.\nSupported IO types are: {list(methods.keys())}."
         )
-        return methods[cls.IO](fp)
+        return ExperimentContext.load_active(cls, fp, lambda: methods[cls.IO](fp))
 
     ###############################################################################################
     # DF Write Functions
@@ -104,6 +158,46 @@ class DFMixin:
         os.makedirs(os.path.dirname(fp), exist_ok=True)
         df.to_parquet(fp)
 
+    @classmethod
+    def write_parquet_chunks(cls, dfs: Iterable[pd.DataFrame], fp: str) -> None:
+        """
+        Writing dataframe chunks to a parquet file (one row group per chunk),
+        so only one chunk is in memory at a time.
+        The chunks must have the same columns.
+        """
+        os.makedirs(os.path.dirname(fp), exist_ok=True)
+        writer = None
+        try:
+            for df in dfs:
+                df = cls.basic_clean(df)
+                table = pa.Table.from_pandas(df, preserve_index=True)
+                if writer is None:
+                    writer = pq.ParquetWriter(fp, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+            ExperimentContext.invalidate_active(fp)
+
+    @classmethod
+    def write_parquet_quantised(
+        cls,
+        df: pd.DataFrame,
+        fp: str,
+        delta_cols: list | pd.Index,
+        precision: float,
+        unit_cols: list | pd.Index,
+    ) -> None:
+        """
+        Writing dataframe to a parquet file with the lossy-bounded quantised codec
+        (refer to `behavysis.utils.quantised_codec`).
+        The file is decoded transparently when read.
+        """
+        df = cls.basic_clean(df)
+        os.makedirs(os.path.dirname(fp), exist_ok=True)
+        pq.write_table(encode_quantised(df, delta_cols, precision, unit_cols), fp)
+        ExperimentContext.invalidate_active(fp)
+
     @classmethod
     def write(cls, df: pd.DataFrame, fp: str) -> None:
         """
@@ -119,7 +213,8 @@ class DFMixin:
         assert cls.IO in methods, (
             f"File type, {cls.IO}, not supported.\nSupported IO types are: {list(methods.keys())}."
         )
-        return methods[cls.IO](df, fp)
+        methods[cls.IO](df, fp)
+        ExperimentContext.invalidate_active(fp)
 
     ###############################################################################################
     # DF init functions
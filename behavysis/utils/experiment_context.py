@@ -0,0 +1,149 @@
+"""
+Shared per-experiment data context.
+
+While an `ExperimentContext` is active, the default readers (e.g. `DFMixin.read`,
+`PydanticBaseModel.read_json`, and `get_vid_metadata`) load each file once and return the
+cached object, so consecutive stage functions of an experiment do not re-read and
+re-parse the same keypoints, configs, features, or video.
+Writers invalidate the cached entry of the written file.
+
+Cached data is shared with the callers (not deep copied):
+- DataFrames are returned as shallow copies (i.e. new df objects that share the cached data).
+  Adding, replacing, or renaming columns and indexes (including `df.index.name = ...`) does not change the cache,
+  but callers must not modify the values in place (e.g. with `df.iloc[...] = ...`)
+  without `df.copy()` first.
+- numpy arrays (and tuples of them) are made read-only.
+- Other objects (e.g. configs) are small, so are returned as deep copies.
+
+Without an active context, the readers behave as usual (i.e. read from disk each call),
+so the file-path function signatures work the same for external callers.
+
+Example
+-------
+>>> with ExperimentContext():
+...     Analyse.in_roi(keypoints_fp, dst_dir, configs_fp)
+...     Analyse.speed(keypoints_fp, dst_dir, configs_fp)  # keypoints and configs are not re-read
+"""
+
+import copy
+import os
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Hashable
+
+import numpy as np
+import pandas as pd
+
+_ACTIVE_CONTEXT: ContextVar["ExperimentContext | None"] = ContextVar("experiment_context", default=None)
+
+
+class ExperimentContext:
+    """
+    Lazily loads and caches an experiment's files.
+
+    Entries are keyed by `(kind, filepath)` and validated against the file's
+    modification time, size, and inode, so files changed outside of the
+    context (e.g. by a subprocess) are re-read.
+
+    Use as a context manager to make it the active context
+    (the cache is cleared on exit).
+    """
+
+    def __init__(self) -> None:
+        self._cache: dict[tuple[Hashable, str], tuple[tuple[int, int, int], Any]] = {}
+        self._tokens: list[Token] = []
+
+    def __enter__(self) -> "ExperimentContext":
+        self._tokens.append(_ACTIVE_CONTEXT.set(self))
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        _ACTIVE_CONTEXT.reset(self._tokens.pop())
+        self.clear()
+
+    @staticmethod
+    def get_active() -> "ExperimentContext | None":
+        """Returns the active context (or None if there is no active context)."""
+        return _ACTIVE_CONTEXT.get()
+
+    @classmethod
+    def load_active(cls, kind: Hashable, fp: str, loader: Callable[[], Any], shared: bool = False) -> Any:
+        """
+        Loads the file with the active context.
+        If there is no active context, returns `loader()`.
+        """
+        ctx = cls.get_active()
+        if ctx is None:
+            return loader()
+        return ctx.load(kind, fp, loader, shared)
+
+    @classmethod
+    def invalidate_active(cls, fp: str) -> None:
+        """Invalidates the file's entries in the active context (if there is one)."""
+        ctx = cls.get_active()
+        if ctx is not None:
+            ctx.invalidate(fp)
+
+    def load(self, kind: Hashable, fp: str, loader: Callable[[], Any], shared: bool = False) -> Any:
+        """
+        Returns the cached object for `(kind, fp)`, calling `loader()`
+        if it is not cached or the file has changed.
+
+        DataFrames are returned as shallow copies, numpy arrays are read-only,
+        and other objects are deep copied (refer to the module docstring).
+        If `shared`, the cached object itself is returned
+        (for read-only objects, e.g. `Kinematics`).
+
+        Missing files are not cached (i.e. `loader` handles them every call).
+        """
+        fp = os.path.abspath(fp)
+        try:
+            stat = os.stat(fp)
+        except OSError:
+            return loader()
+        file_id = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        entry = self._cache.get((kind, fp))
+        if entry is None or entry[0] != file_id:
+            entry = (file_id, set_read_only(loader()))
+            self._cache[(kind, fp)] = entry
+        if shared:
+            return entry[1]
+        return share(entry[1])
+
+    def invalidate(self, fp: str) -> None:
+        """Removes all cached entries of the file."""
+        fp = os.path.abspath(fp)
+        for key in [key for key in self._cache if key[1] == fp]:
+            del self._cache[key]
+
+    def clear(self) -> None:
+        """Removes all cached entries."""
+        self._cache.clear()
+
+
+def set_read_only(obj: Any) -> Any:
+    """Makes the numpy arrays (and tuples of them) read-only, so they can be shared without copying."""
+    if isinstance(obj, np.ndarray):
+        obj.flags.writeable = False
+    elif isinstance(obj, tuple):
+        for i in obj:
+            set_read_only(i)
+    return obj
+
+
+def share(obj: Any) -> Any:
+    """
+    Returns the object to give to a caller, without deep copying large data
+    (DataFrames are shallow copied, read-only arrays are returned as is).
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        out = obj.copy(deep=False)
+        # New index objects (sharing the data), so renaming them does not change the cache
+        out.index = obj.index.copy()
+        if isinstance(obj, pd.DataFrame):
+            out.columns = obj.columns.copy()
+        return out
+    if isinstance(obj, np.ndarray):
+        return obj
+    if isinstance(obj, tuple):
+        return tuple(share(i) for i in obj)
+    return copy.deepcopy(obj)
@@ -0,0 +1,177 @@
+"""
+Headless plot rendering.
+
+Plots are described by plot specs (`PlotSpec`): the plot type (a function that draws the data
+on a new figure and returns the figure), the data (the function's arguments), and the destination file.
+Specs are rendered with `PlotService.render_active`:
+
+- With the non-interactive Agg backend (set in each rendering process).
+- Every figure made while rendering is closed (`plt.close`) as soon as the plot is saved,
+  even if plotting fails, so figures do not accumulate in pyplot's figure manager.
+- Artists with many points (e.g. scatter or line plots of every frame) are rasterised
+  (refer to `rasterise_large_artists`).
+
+While a `PlotService` is active, specs are rendered in its dedicated process pool, so plotting
+does not block the analysis. At most `max_workers` plots are rendered at a time, and at most
+`max_pending` specs are queued (submitting more waits for a render to finish), which bounds the
+memory of the queued data. Exiting the service waits for all of its plots to be rendered.
+
+Without an active service (or in processes that cannot start child processes, e.g. daemonic
+workers), specs are rendered in the calling process.
+
+Example
+-------
+>>> with PlotService(max_workers=2):
+...     AnalysisBinnedDf.make_binned_plot(binned_df, dst_fp, "mean")  # returns once the spec is queued
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextvars import ContextVar, Token
+from multiprocessing import current_process
+from typing import Any, Callable
+
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+from behavysis.constants import PLOT_MAX_WORKERS, PLOT_RASTERISE_MIN_POINTS
+from behavysis.utils.logging_utils import init_logger_console
+
+_ACTIVE_SERVICE: ContextVar["PlotService | None"] = ContextVar("plot_service", default=None)
+
+
+class PlotSpec:
+    """
+    A plot to render: `plot_func(*args, **kwargs)` makes the figure, which is saved to `dst_fp`.
+
+    `plot_func` must be importable (e.g. a module-level function or a class's static or class method),
+    and the arguments picklable, so the spec can be rendered in another process.
+    """
+
+    def __init__(self, plot_func: Callable[..., Figure], dst_fp: str, *args: Any, **kwargs: Any) -> None:
+        self.plot_func = plot_func
+        self.dst_fp = dst_fp
+        self.args = args
+        self.kwargs = kwargs
+
+    def __repr__(self) -> str:
+        return f"PlotSpec(plot_func={self.plot_func.__qualname__}, dst_fp={self.dst_fp})"
+
+
+class PlotService:
+    """
+    Renders plot specs in a dedicated process pool.
+
+    Use as a context manager to make it the active service
+    (exiting waits for all submitted plots to be rendered, then stops the pool).
+    Failed plots are logged (and do not stop the other plots).
+    """
+
+    def __init__(self, max_workers: int = PLOT_MAX_WORKERS, max_pending: None | int = None) -> None:
+        self.max_workers = max_workers
+        self.max_pending = 2 * max_workers if max_pending is None else max_pending
+        self._executor: None | ProcessPoolExecutor = None
+        self._slots = threading.BoundedSemaphore(max(1, self.max_pending))
+        self._futures: list[Future] = []
+        self._tokens: list[Token] = []
+        self.logger = init_logger_console(self.__class__.__name__)
+
+    def __enter__(self) -> "PlotService":
+        # Daemonic processes (e.g. dask workers) cannot start child processes, so render inline
+        if self.max_workers > 0 and not current_process().daemon:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._tokens.append(_ACTIVE_SERVICE.set(self))
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        _ACTIVE_SERVICE.reset(self._tokens.pop())
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @staticmethod
+    def get_active() -> "PlotService | None":
+        """Returns the active service (or None if there is no active service)."""
+        return _ACTIVE_SERVICE.get()
+
+    @classmethod
+    def render_active(cls, spec: PlotSpec) -> None:
+        """
+        Renders the plot spec with the active service.
+        If there is no active service, renders the spec in this process.
+        """
+        service = cls.get_active()
+        if service is None:
+            render_plot(spec)
+        else:
+            service.submit(spec)
+
+    def submit(self, spec: PlotSpec) -> None:
+        """
+        Queues the plot spec to be rendered in the pool
+        (waits if `max_pending` specs are already queued).
+        """
+        if self._executor is None:
+            render_plot(spec)
+            return
+        self._slots.acquire()
+        future = self._executor.submit(render_plot, spec)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def wait(self) -> int:
+        """Waits for all submitted plots to be rendered. Returns the number of failed plots (which are logged)."""
+        n_failed = 0
+        futures, self._futures = self._futures, []
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                n_failed += 1
+                self.logger.error(f"Failed to make plot: {error}")
+        return n_failed
+
+
+def render_plot(spec: PlotSpec) -> str:
+    """
+    Makes, saves, and closes the spec's plot (with the Agg backend). Returns the saved filepath.
+
+    All figures opened while rendering are closed, even if plotting fails.
+    """
+    matplotlib.use("Agg")
+    fignums = set(plt.get_fignums())
+    try:
+        fig = spec.plot_func(*spec.args, **spec.kwargs)
+        save_fig(fig, spec.dst_fp)
+    finally:
+        for fignum in set(plt.get_fignums()) - fignums:
+            plt.close(fignum)
+    return spec.dst_fp
+
+
+def save_fig(fig: Figure, dst_fp: str, min_points: int = PLOT_RASTERISE_MIN_POINTS) -> None:
+    """Saves the figure (rasterising large artists, refer to `rasterise_large_artists`), then closes it."""
+    try:
+        rasterise_large_artists(fig, min_points)
+        os.makedirs(os.path.dirname(dst_fp) or ".", exist_ok=True)
+        # Drawing long paths in chunks (faster, and avoids Agg's path size limit)
+        with plt.rc_context({"agg.path.chunksize": 10000}):
+            fig.savefig(dst_fp)
+    finally:
+        plt.close(fig)
+
+
+def rasterise_large_artists(fig: Figure, min_points: int = PLOT_RASTERISE_MIN_POINTS) -> None:
+    """
+    Rasterises the figure's scatter and line artists with `min_points` or more points,
+    so vector outputs (e.g. pdf or svg) store an image of them (rather than every point).
+    """
+    for ax in fig.axes:
+        for collection in ax.collections:
+            if len(collection.get_offsets()) >= min_points:
+                collection.set_rasterized(True)
+        for line in ax.get_lines():
+            if len(line.get_xdata()) >= min_points:
+                line.set_rasterized(True)
@@ -2,10 +2,11 @@
 Utility functions.
 """
 
-import os
-
 from pydantic import BaseModel, ConfigDict
 
+from behavysis.utils.configs_session import ConfigsSession, write_atomic
+from behavysis.utils.experiment_context import ExperimentContext
+
 
 class PydanticBaseModel(BaseModel):
     """Helper class for Pydantic models (i.e. configs)."""
@@ -26,29 +27,43 @@ class PydanticBaseModel(BaseModel):
         -----
         This class method reads the contents of the JSON config file located at `fp` and
         returns the config model.
+        If there is an active `ConfigsSession` for the file, returns its in-memory model.
+        Otherwise if there is an active `ExperimentContext`, the file is read and validated once.
 
         Example
         -------
         >>> config = ConfigModel.read_json("/path/to/config.json")
         """
-        with open(fp, "r", encoding="utf-8") as f:
-            return cls.model_validate_json(f.read())
+
+        def loader():
+            with open(fp, "r", encoding="utf-8") as f:
+                return cls.model_validate_json(f.read())
+
+        session = ConfigsSession.get_active(fp)
+        if session is not None:
+            return session.read(cls, lambda: ExperimentContext.load_active(cls, fp, loader))
+        return ExperimentContext.load_active(cls, fp, loader)
 
     def write_json(self, fp: str) -> None:
         """
         Writes the given configs model to the configs file (i.e. hence updating the file).
 
         Makes the directory if it doesn't exist.
+        The file is written atomically (refer to `write_atomic`).
+        If there is an active `ConfigsSession` for the file, the session's model is updated
+        instead (and written when the session exits).
 
         Parameters
         ----------
         fp : str
             File to save configs to.
         """
-        fp_dir = os.path.dirname(fp)
-        os.makedirs(fp_dir, exist_ok=True) if fp_dir else None
-        with open(fp, "w", encoding="utf-8") as f:
-            f.write(self.model_dump_json(indent=2))
+        session = ConfigsSession.get_active(fp)
+        if session is not None:
+            session.write(self)
+            return
+        write_atomic(fp, self.model_dump_json(indent=2))
+        ExperimentContext.invalidate_active(fp)
 
     @staticmethod
     def validate_attrs(model, field_names, model_cls):
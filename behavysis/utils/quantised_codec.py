@@ -0,0 +1,124 @@
+"""
+Lossy-bounded quantised codec for parquet dataframes (e.g. keypoints files).
+
+Encoded columns are either:
+- Delta columns: quantised to a `precision` and delta-encoded along the rows
+  (i.e. frames), so are stored as small integers.
+  The maximum error is `precision / 2`.
+- Unit columns: values in [0, 1] quantised to 8 bits.
+  The maximum error is `1 / (2 * UNIT_LEVELS)`.
+
+NaN values are stored as nulls (and decoded back to NaN).
+Other columns are stored unchanged.
+
+The codec parameters are stored in the parquet schema metadata (under `CODEC_KEY`),
+so encoded files are decoded transparently by `DFMixin.read_parquet` and `DFMixin.iter_parquet`.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+CODEC_KEY = b"behavysis_quantised"
+CODEC_VERSION = 1
+UNIT_LEVELS = 255
+DELTA_DTYPE = np.int32
+
+
+def encode_quantised(
+    df: pd.DataFrame,
+    delta_cols: list | pd.Index,
+    precision: float,
+    unit_cols: list | pd.Index,
+) -> pa.Table:
+    """
+    Returns the arrow table of the df with the `delta_cols` and `unit_cols` encoded
+    (and the codec parameters in the schema metadata).
+
+    Raises
+    ------
+    ValueError
+        The quantised deltas do not fit in `DELTA_DTYPE` (i.e. `precision` is too small).
+    """
+    if precision <= 0:
+        raise ValueError(f"precision must be positive, not {precision}.")
+    enc_df = df.copy()
+    # Delta columns
+    if len(delta_cols) > 0:
+        arr = df[delta_cols].to_numpy(dtype=np.float64)
+        is_nan = np.isnan(arr)
+        q = np.round(arr / precision)
+        # Forward filling NaN values (with 0 before the first value), so they have a zero delta
+        q[is_nan] = 0
+        fill_idx = np.where(is_nan, 0, np.arange(arr.shape[0])[:, None])
+        np.maximum.accumulate(fill_idx, axis=0, out=fill_idx)
+        q = np.take_along_axis(q, fill_idx, axis=0)
+        deltas = np.diff(q, axis=0, prepend=0)
+        info = np.iinfo(DELTA_DTYPE)
+        if deltas.size > 0 and (deltas.min() < info.min or deltas.max() > info.max):
+            raise ValueError(f"The quantised deltas do not fit in {DELTA_DTYPE.__name__}. Use a larger precision.")
+        deltas = deltas.astype(DELTA_DTYPE)
+        for i, col in enumerate(delta_cols):
+            enc_df[col] = pd.arrays.IntegerArray(deltas[:, i], is_nan[:, i])
+    # Unit columns
+    if len(unit_cols) > 0:
+        arr = df[unit_cols].to_numpy(dtype=np.float64)
+        is_nan = np.isnan(arr)
+        q = np.round(np.clip(np.nan_to_num(arr), 0, 1) * UNIT_LEVELS).astype(np.uint8)
+        for i, col in enumerate(unit_cols):
+            enc_df[col] = pd.arrays.IntegerArray(q[:, i], is_nan[:, i])
+    # Making table with codec metadata
+    table = pa.Table.from_pandas(enc_df, preserve_index=True)
+    codec_meta = {
+        "version": CODEC_VERSION,
+        "precision": precision,
+        "unit_levels": UNIT_LEVELS,
+        "delta_columns": [str(col) for col in delta_cols],
+        "unit_columns": [str(col) for col in unit_cols],
+    }
+    return table.replace_schema_metadata({**table.schema.metadata, CODEC_KEY: json.dumps(codec_meta).encode()})
+
+
+def get_codec_meta(schema: pa.Schema) -> None | dict:
+    """Returns the codec parameters from the parquet schema (or None if the file is not encoded)."""
+    if schema.metadata is None or CODEC_KEY not in schema.metadata:
+        return None
+    return json.loads(schema.metadata[CODEC_KEY])
+
+
+def decode_quantised(df: pd.DataFrame, codec_meta: dict, carry: None | dict[str, float] = None) -> pd.DataFrame:
+    """
+    Decodes the encoded columns of the df (read from a file encoded with `encode_quantised`).
+    Only the encoded columns in the df are decoded (i.e. the df can be a projection of the file).
+
+    For a file read in consecutive chunks, pass the same `carry` dict for each chunk.
+    It stores each delta column's last quantised value (updated in-place).
+    """
+    carry = {} if carry is None else carry
+    names = np.array([str(col) for col in df.columns])
+    # Delta columns
+    delta_idx = np.flatnonzero(np.isin(names, codec_meta["delta_columns"]))
+    dec_arrs = {}
+    if delta_idx.shape[0] > 0:
+        arr = df.iloc[:, delta_idx].to_numpy(dtype=np.float64, na_value=np.nan)
+        is_nan = np.isnan(arr)
+        q = np.cumsum(np.where(is_nan, 0, arr), axis=0)
+        q += np.array([carry.get(names[i], 0.0) for i in delta_idx])
+        if q.shape[0] > 0:
+            carry.update(zip(names[delta_idx], q[-1]))
+        q[is_nan] = np.nan
+        dec_arrs.update(zip(delta_idx, (q * codec_meta["precision"]).T))
+    # Unit columns
+    unit_idx = np.flatnonzero(np.isin(names, codec_meta["unit_columns"]))
+    if unit_idx.shape[0] > 0:
+        arr = df.iloc[:, unit_idx].to_numpy(dtype=np.float64, na_value=np.nan)
+        dec_arrs.update(zip(unit_idx, (arr / codec_meta["unit_levels"]).T))
+    # Making decoded df
+    if len(dec_arrs) == 0:
+        return df
+    data = {i: dec_arrs[i] if i in dec_arrs else df.iloc[:, i] for i in range(df.shape[1])}
+    dec_df = pd.DataFrame(data, index=df.index)
+    dec_df.columns = df.columns
+    return dec_df
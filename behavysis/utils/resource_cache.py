@@ -0,0 +1,107 @@
+"""
+Process-wide cache of shared (i.e. project-level) resources.
+
+Resources are files that many experiments use, such as the user's start times CSV or
+the behaviour classifier models.
+Each is parsed once per process, and `Project` broadcasts the parsed entries
+to its workers (refer to `Project._proc_scaff_mp`).
+
+Resources are only cached within a `ResourceCache.session()` (i.e. a `Project` stage),
+and the cache is cleared when the session ends, so resources are not kept in memory
+after the stage. Outside of a session, the readers load the file each call
+(i.e. callers get their own object).
+
+Example
+-------
+>>> with ResourceCache.session():
+...     read_start_times_csv(csv_fp)
+...     read_start_times_csv(csv_fp)  # not re-parsed
+"""
+
+import contextlib
+import os
+from typing import Any, Callable, Hashable, Iterator
+
+
+class ResourceCache:
+    """
+    Process-wide cache of shared resources.
+
+    Entries are keyed by `(kind, filepath)` and validated against the file's
+    modification time and size, so changed files are re-parsed.
+
+    Cached objects are shared (NOT copied) between callers,
+    so must be treated as read-only.
+    """
+
+    _entries: dict[tuple[Hashable, str], tuple[tuple[int, int], Any]] = {}
+    _n_sessions: int = 0
+
+    @classmethod
+    @contextlib.contextmanager
+    def session(cls) -> Iterator[None]:
+        """
+        Caches the loaded resources until the (outermost) session ends.
+        """
+        cls._n_sessions += 1
+        try:
+            yield
+        finally:
+            cls._n_sessions -= 1
+            if cls._n_sessions == 0:
+                cls.clear()
+
+    @classmethod
+    def is_active(cls) -> bool:
+        """Returns whether a session is active (i.e. loaded resources are cached)."""
+        return cls._n_sessions > 0
+
+    @classmethod
+    def load(cls, kind: Hashable, fp: str, loader: Callable[[], Any]) -> Any:
+        """
+        Returns the cached object for `(kind, fp)`, calling `loader()`
+        if it is not cached or the file has changed.
+
+        If there is no active session, returns `loader()` (without caching).
+        """
+        if not cls.is_active():
+            return loader()
+        fp = os.path.abspath(fp)
+        stat = os.stat(fp)
+        file_id = (stat.st_mtime_ns, stat.st_size)
+        entry = cls._entries.get((kind, fp))
+        if entry is None or entry[0] != file_id:
+            entry = (file_id, loader())
+            cls._entries[(kind, fp)] = entry
+        return entry[1]
+
+    @classmethod
+    def get_entries(cls) -> dict[tuple[Hashable, str], tuple[tuple[int, int], Any]]:
+        """Returns (a shallow copy of) all entries (e.g. to send to workers)."""
+        return dict(cls._entries)
+
+    @classmethod
+    def update(cls, entries: dict[tuple[Hashable, str], tuple[tuple[int, int], Any]]) -> None:
+        """Adds the entries (e.g. from `get_entries` in the parent process) to the cache."""
+        cls._entries.update(entries)
+
+    @classmethod
+    def clear(cls) -> None:
+        """Removes all entries."""
+        cls._entries.clear()
+
+    @classmethod
+    def run_with_entries(
+        cls,
+        entries: dict[tuple[Hashable, str], tuple[tuple[int, int], Any]],
+        func: Callable,
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Adds the entries to the cache, then returns `func(*args, **kwargs)` in a session.
+        Used to run tasks in workers with the parent process's resources.
+        """
+        with cls.session():
+            cls.update(entries)
+            return func(*args, **kwargs)
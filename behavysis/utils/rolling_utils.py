@@ -0,0 +1,126 @@
+"""
+NaN-aware rolling window kernels for arrays.
+
+Each kernel rolls along the first axis (i.e. frames) of a 1D or 2D array, and matches
+the pandas rolling equivalent (e.g. `pd.DataFrame(arr).rolling(window, min_periods, center).mean()`),
+with the same window bounds and NaN handling:
+
+- Windows are truncated at the edges.
+- NaN values are ignored.
+- Windows with fewer than `min_periods` non-NaN values are NaN
+  (`min_periods` of None is the window size).
+
+Sums, counts, and means are computed with cumulative sums, and minimums and maximums
+with `scipy.ndimage` filters, so each kernel is O(n) regardless of the window size
+(unlike `rolling(...).apply(func)`, which calls `func` for each window).
+"""
+
+import numpy as np
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+
+
+def get_window_bounds(n: int, window: int, center: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the `[start, stop)` indexes of each row's window (truncated at the edges).
+
+    Windows are `[i - window + 1, i + 1)` (trailing), or
+    `[i - window // 2, i - window // 2 + window)` if `center` (the same as pandas).
+    """
+    offset = _get_offset(window, center)
+    start = np.clip(np.arange(n) - offset, 0, n)
+    stop = np.clip(np.arange(n) - offset + window, 0, n)
+    return start, stop
+
+
+def _get_offset(window: int, center: bool) -> int:
+    """
+    Returns the number of rows before each row in its window.
+
+    Raises
+    ------
+    ValueError
+        `window` is less than 1.
+    """
+    if window < 1:
+        raise ValueError(f"window must be at least 1, not {window}.")
+    return window // 2 if center else window - 1
+
+
+def _rolling_cumsum(arr: np.ndarray, window: int, center: bool) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the rolling (NaN-ignoring) sums and non-NaN counts."""
+    n = arr.shape[0]
+    offset = _get_offset(window, center)
+    # Rolling along the last axis of a contiguous copy (cumsum is much faster along contiguous rows)
+    arr_t = np.ascontiguousarray(np.moveaxis(arr, 0, -1), dtype=np.float64)
+    is_valid = ~np.isnan(arr_t)
+    # Cumulative sums of values and non-NaN counts, padded so that index `j` is the
+    # cumulative sum of the rows before `j - offset` (clipped to [0, n]).
+    # Each window is then the difference between indexes `i + window` and `i`.
+    sums = np.zeros((*arr_t.shape[:-1], n + window))
+    counts = np.zeros((*arr_t.shape[:-1], n + window), dtype=np.int64)
+    for cum_arr, vals in ((sums, np.where(is_valid, arr_t, 0)), (counts, is_valid)):
+        np.cumsum(vals, axis=-1, out=cum_arr[..., offset + 1 : offset + 1 + n])
+        cum_arr[..., offset + 1 + n :] = cum_arr[..., offset + n : offset + n + 1]
+    window_sums = sums[..., window:] - sums[..., :n]
+    window_counts = counts[..., window:] - counts[..., :n]
+    return np.moveaxis(window_sums, -1, 0), np.moveaxis(window_counts, -1, 0)
+
+
+def _get_min_periods(window: int, min_periods: None | int) -> int:
+    return window if min_periods is None else min_periods
+
+
+def rolling_count_arr(arr: np.ndarray, window: int, center: bool = False) -> np.ndarray:
+    """Rolling count of non-NaN values."""
+    return _rolling_cumsum(arr, window, center)[1]
+
+
+def rolling_sum_arr(arr: np.ndarray, window: int, min_periods: None | int = None, center: bool = False) -> np.ndarray:
+    """Rolling sum (ignoring NaN values)."""
+    sums, counts = _rolling_cumsum(arr, window, center)
+    return np.where(counts >= _get_min_periods(window, min_periods), sums, np.nan)
+
+
+def rolling_mean_arr(arr: np.ndarray, window: int, min_periods: None | int = None, center: bool = False) -> np.ndarray:
+    """Rolling mean (ignoring NaN values)."""
+    sums, counts = _rolling_cumsum(arr, window, center)
+    is_valid = (counts >= _get_min_periods(window, min_periods)) & (counts > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(is_valid, sums / counts, np.nan)
+
+
+def _rolling_filter(
+    arr: np.ndarray, window: int, min_periods: None | int, center: bool, filter_func, fill: float
+) -> np.ndarray:
+    """Rolling min or max (with the given `scipy.ndimage` filter)."""
+    arr = np.asarray(arr, dtype=np.float64)
+    counts = rolling_count_arr(arr, window, center)
+    # NaN values (and the edges) are filled with the identity value
+    filled = np.where(np.isnan(arr), fill, arr)
+    # Origin of scipy's (centred) window, so it starts at the same index as `get_window_bounds`
+    origin = 0 if center else (window - 1) // 2
+    out = filter_func(filled, window, axis=0, mode="constant", cval=fill, origin=origin)
+    is_valid = (counts >= _get_min_periods(window, min_periods)) & (counts > 0)
+    return np.where(is_valid, out, np.nan)
+
+
+def rolling_min_arr(arr: np.ndarray, window: int, min_periods: None | int = None, center: bool = False) -> np.ndarray:
+    """Rolling minimum (ignoring NaN values)."""
+    return _rolling_filter(arr, window, min_periods, center, minimum_filter1d, np.inf)
+
+
+def rolling_max_arr(arr: np.ndarray, window: int, min_periods: None | int = None, center: bool = False) -> np.ndarray:
+    """Rolling maximum (ignoring NaN values)."""
+    return _rolling_filter(arr, window, min_periods, center, maximum_filter1d, -np.inf)
+
+
+def rolling_majority_arr(arr: np.ndarray, window: int, center: bool = False) -> np.ndarray:
+    """
+    Rolling majority of a bool array: True where more than half of the window's values
+    are True (ties are False).
+
+    Same as `pd.Series(arr).rolling(window, min_periods=1, center).apply(lambda x: x.mode()[0])`
+    (the smallest mode is used for ties).
+    """
+    sums, counts = _rolling_cumsum(np.asarray(arr, dtype=np.float64), window, center)
+    return sums * 2 > counts
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from behavysis.df_classes.keypoints_df import CoordsCols, KeypointsDf
+
+
+@pytest.fixture
+def make_keypoints_df():
+    """
+    Returns a factory of random keypoints dfs, with x and y coordinates in [0, 500) px
+    and likelihoods in [0.5, 1), where a `lhood_missing` fraction of frames start runs of low (0.1) likelihoods.
+    """
+
+    def _make_keypoints_df(n_frames, indivs, bpts, lhood_missing=0.3, seed=0, start_frame=0):
+        rng = np.random.default_rng(seed)
+        columns = pd.MultiIndex.from_product(
+            [["scorer"], indivs, bpts, [CoordsCols.X.value, CoordsCols.Y.value, CoordsCols.LIKELIHOOD.value]],
+            names=[i.value for i in KeypointsDf.CN],
+        )
+        keypoints_df = pd.DataFrame(
+            rng.uniform(0, 500, size=(n_frames, columns.shape[0])),
+            index=pd.Index(np.arange(n_frames) + start_frame, name=KeypointsDf.IN.FRAME.value),
+            columns=columns,
+        )
+        # Making likelihoods with runs of low values
+        lhood_columns = keypoints_df.columns[
+            keypoints_df.columns.get_level_values(KeypointsDf.CN.COORDS.value) == CoordsCols.LIKELIHOOD.value
+        ]
+        lhood = rng.uniform(0.5, 1, size=(n_frames, lhood_columns.shape[0]))
+        is_low = pd.DataFrame(rng.uniform(size=lhood.shape) < lhood_missing).rolling(5, min_periods=1).max()
+        lhood[is_low.to_numpy(dtype=bool)] = 0.1
+        keypoints_df[lhood_columns] = lhood
+        return keypoints_df
+
+    return _make_keypoints_df
@@ -0,0 +1,342 @@
+import glob
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from behavysis.df_classes.analysis_agg_df import AnalysisBinnedDf, AnalysisSummaryDf
+from behavysis.df_classes.analysis_df import AnalysisDf
+from behavysis.df_classes.analysis_sweep_df import AnalysisSweepDf
+from behavysis.df_classes.behav_df import BehavScoredDf
+from behavysis.df_classes.keypoints_df import CoordsCols, KeypointsDf
+from behavysis.processes.analyse import (
+    Analyse,
+    get_time_bin_idx,
+    occupancy_arr,
+    pt_in_roi,
+    pts_in_polygons,
+    remove_short_runs_arr,
+)
+from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
+from behavysis.utils.bout_array import BoutArray
+
+
+def pts_in_polygons_loop(pts, polygons):
+    # Previous per-point implementation (for reference)
+    out = np.zeros(pts.shape[:3], dtype=bool)
+    for j, corners in enumerate(polygons):
+        corners_df = pd.DataFrame(corners, columns=[CoordsCols.X.value, CoordsCols.Y.value])
+        for i in range(pts.shape[0]):
+            for k in range(pts.shape[2]):
+                pt = pd.Series(pts[i, j, k], index=[CoordsCols.X.value, CoordsCols.Y.value])
+                out[i, j, k] = pt_in_roi(pt, corners_df, logging.getLogger())
+    return out
+
+
+def test_pts_in_polygons_matches_pt_in_roi():
+    rng = np.random.default_rng(0)
+    polygons = [
+        # Square
+        np.array([[100, 100], [400, 100], [400, 400], [100, 400]], dtype=np.float64),
+        # Concave (arrow) polygon
+        np.array([[0, 0], [500, 250], [0, 500], [250, 250]], dtype=np.float64),
+        # Triangle with a horizontal edge
+        rng.uniform(0, 500, size=(3, 2)) * [1, 0] + [0, 200],
+    ]
+    pts = rng.uniform(0, 500, size=(300, len(polygons), 2, 2))
+    # Points on corners and edges, and NaN points
+    pts[0, 0, 0] = [100, 100]
+    pts[1, 0, 0] = [400, 250]
+    pts[2, 1, 0] = [250, 250]
+    pts[3, :, 1] = np.nan
+    pts[4, :, 0, 0] = np.nan
+    out = pts_in_polygons(pts, polygons, block_frames=64)
+    np.testing.assert_array_equal(out, pts_in_polygons_loop(pts, polygons))
+    assert not out[3, :, 1].any()
+
+
+def remove_short_runs_loop(arr, min_frames):
+    # Previous per-bout implementation (for reference)
+    out = arr.astype(np.int8)
+    for i in range(arr.shape[1]):
+        vect = pd.Series(arr[:, i], index=pd.Index(np.arange(arr.shape[0]), name="frame"))
+        bouts_df = BehavScoredDf.vect2bouts_df(vect)
+        for _, row in bouts_df.iterrows():
+            if row["dur"] < min_frames:
+                out[row["start"] : row["stop"] + 1, i] = 0
+    return out.astype(bool)
+
+
+def test_remove_short_runs_matches_loop():
+    rng = np.random.default_rng(0)
+    arr = rng.uniform(size=(1000, 3)) < [0.2, 0.8, 0.95]
+    # Runs at the start and end of columns
+    arr[:5, 0] = True
+    arr[-3:, 0] = True
+    for min_frames in [0, 1, 2, 5, 30]:
+        np.testing.assert_array_equal(remove_short_runs_arr(arr, min_frames), remove_short_runs_loop(arr, min_frames))
+    assert remove_short_runs_arr(np.zeros((0, 2), dtype=bool), 5).shape == (0, 2)
+
+
+def test_summary_binned_multi_matches_summary_binned(tmp_path):
+    rng = np.random.default_rng(0)
+    index = pd.Index(np.arange(100, 700), name=AnalysisDf.IN.FRAME.value)
+    # Analysis dfs with the same measure name
+    analysis_dfs = {}
+    for analysis, indivs in [("a", ["mouse1", "mouse2"]), ("b", ["mouse1_mouse2"])]:
+        analysis_df = AnalysisDf.init_df(index)
+        for indiv in indivs:
+            analysis_df[(indiv, "dist")] = rng.normal(size=index.shape[0])
+            analysis_df[(indiv, f"{analysis}_only")] = rng.normal(size=index.shape[0])
+        analysis_dfs[analysis] = analysis_df
+    kwargs = dict(name="exp", fps=10, summary_func=AnalysisSummaryDf.agg_quantitative, agg_column="mean")
+    # Summarising and binning each analysis df separately, and all at once
+    for analysis, analysis_df in analysis_dfs.items():
+        AnalysisBinnedDf.summary_binned(
+            analysis_df.copy(), str(tmp_path / "each" / analysis), bins_ls=[20], cbins_ls=[], **kwargs
+        )
+    AnalysisBinnedDf.summary_binned_multi(
+        {str(tmp_path / "multi" / analysis): analysis_df for analysis, analysis_df in analysis_dfs.items()},
+        bins_ls=[20],
+        cbins_ls=[],
+        **kwargs,
+    )
+    each_fps = sorted(glob.glob(str(tmp_path / "each" / "*" / "*" / "*.parquet")))
+    assert len(each_fps) == 4
+    for each_fp in each_fps:
+        multi_fp = os.path.join(tmp_path, "multi", os.path.relpath(each_fp, tmp_path / "each"))
+        pd.testing.assert_frame_equal(pd.read_parquet(multi_fp), pd.read_parquet(each_fp))
+
+
+def test_get_time_bin_idx_matches_pd_cut():
+    timestamps = np.arange(0, 1000) / 7
+    for bins in [np.arange(0, timestamps.max() + 10, 10), np.array([20, 50, 100])]:
+        time_bin_idx, bin_labels = get_time_bin_idx(timestamps, bins)
+        # Same bins as `AnalysisBinnedDf.make_binned`
+        all_bins = np.append(0, bins) if bins.min() > 0 else bins
+        all_bins = np.append(all_bins, timestamps.max()) if all_bins.max() < timestamps.max() else all_bins
+        expected = pd.cut(timestamps, bins=all_bins, labels=False, include_lowest=True)
+        np.testing.assert_array_equal(time_bin_idx, expected)
+        np.testing.assert_array_equal(bin_labels, all_bins[1:])
+
+
+def test_occupancy_arr_matches_histogram2d():
+    rng = np.random.default_rng(0)
+    pts = rng.uniform(-20, 520, size=(2000, 3, 2))
+    pts[:10, 0] = np.nan
+    time_bin_idx = np.repeat(np.arange(4), 500)
+    x_edges = np.arange(0, 501, 25.0)
+    y_edges = np.arange(0, 301, 25.0)
+    out = occupancy_arr(pts, time_bin_idx, 4, x_edges, y_edges)
+    assert out.shape == (4, 3, 12, 20)
+    for i in range(4):
+        for j in range(3):
+            pts_ij = pts[time_bin_idx == i, j]
+            # Excluding points on the last edges (histogram2d includes them in the last cells)
+            pts_ij = pts_ij[(pts_ij[:, 0] < x_edges[-1]) & (pts_ij[:, 1] < y_edges[-1])]
+            expected, _, _ = np.histogram2d(pts_ij[:, 1], pts_ij[:, 0], bins=[y_edges, x_edges])
+            np.testing.assert_array_equal(out[i, j], expected)
+
+
+def test_analyse_sweep_matches_configs(tmp_path):
+    rng = np.random.default_rng(0)
+    columns = pd.MultiIndex.from_product(
+        [["scorer"], ["mouse1", "mouse2", "mouse3"], ["Nose", "TailBase1"], ["x", "y", "likelihood"]],
+        names=[i.value for i in KeypointsDf.CN],
+    )
+    keypoints_df = pd.DataFrame(
+        rng.normal(size=(600, columns.shape[0])).cumsum(axis=0) + 250,
+        index=pd.Index(np.arange(600), name=KeypointsDf.IN.FRAME.value),
+        columns=columns,
+    )
+    keypoints_fp = os.path.join(tmp_path, "exp.parquet")
+    KeypointsDf.write(keypoints_df, keypoints_fp)
+    configs = ExperimentConfigs()
+    configs.auto.formatted_vid.fps = 30
+    configs.auto.formatted_vid.width_px = 960
+    configs.auto.formatted_vid.height_px = 540
+    configs.auto.px_per_mm = 2
+    configs.user.analyse.freezing.bodyparts = ["Nose", "TailBase1"]
+    configs.user.analyse.social_contact.bodyparts = ["Nose", "TailBase1"]
+    configs_fp = os.path.join(tmp_path, "exp.json")
+    configs.write_json(configs_fp)
+    param_grid = {"freezing.thresh_mm": [0.5, 1], "freezing.window_sec": [0.1, 0.5], "social_contact.thresh_mm": [50]}
+    sweep_fp = os.path.join(tmp_path, "sweep", f"exp.{AnalysisSweepDf.IO}")
+    Analyse.analyse_sweep(keypoints_fp, sweep_fp, configs_fp, param_grid)
+    sweep_df = AnalysisSweepDf.read(sweep_fp)
+    # The configs file is unchanged
+    assert ExperimentConfigs.read_json(configs_fp) == configs
+    # Each combination matches summarising the analysis with the combination's configs file
+    for thresh_mm in [0.5, 1]:
+        for window_sec in [0.1, 0.5]:
+            configs_i = configs.model_copy(deep=True)
+            configs_i.user.analyse.freezing.thresh_mm = thresh_mm
+            configs_i.user.analyse.freezing.window_sec = window_sec
+            configs_i.user.analyse.social_contact.thresh_mm = 50
+            configs_i_fp = os.path.join(tmp_path, "exp_i.json")
+            configs_i.write_json(configs_i_fp)
+            for f_name in ["freezing", "social_contact"]:
+                calc_func = getattr(Analyse, f"calc_{f_name}")
+                expected = AnalysisSummaryDf.agg_behavs(calc_func(keypoints_fp, configs_i_fp, None), 30)
+                rows = sweep_df[
+                    (sweep_df["freezing.thresh_mm"] == thresh_mm)
+                    & (sweep_df["freezing.window_sec"] == window_sec)
+                    & (sweep_df["analysis"] == f_name)
+                ]
+                out = rows.set_index(["individuals", "measures", "aggs"])["value"].unstack("aggs")
+                pd.testing.assert_frame_equal(out, expected, check_names=False, check_dtype=False)
+
+
+def agg_quantitative_loop(analysis_df):
+    # Previous per-column implementation (for reference)
+    summary_df_ls = []
+    for col in analysis_df.columns:
+        vect = analysis_df[col]
+        vect = np.array([0]) if vect.shape[0] == 0 else vect
+        vect = vect.astype(np.float64)
+        summary_df_ls.append(
+            {
+                "mean": np.nanmean(vect),
+                "std": np.nanstd(vect),
+                "min": np.nanmin(vect),
+                "Q1": np.nanquantile(vect, q=0.25),
+                "median": np.nanmedian(vect),
+                "Q3": np.nanquantile(vect, q=0.75),
+                "max": np.nanmax(vect),
+            }
+        )
+    return AnalysisSummaryDf.basic_clean(pd.DataFrame(summary_df_ls, index=analysis_df.columns))
+
+
+def agg_behavs_loop(analysis_df, fps):
+    # Previous per-column implementation (for reference)
+    summary_df_ls = [BoutArray.from_vect(analysis_df[col].to_numpy() == 1).summary(fps) for col in analysis_df.columns]
+    return AnalysisSummaryDf.basic_clean(pd.DataFrame(summary_df_ls, index=analysis_df.columns).astype(np.float64))
+
+
+def test_agg_matches_loop():
+    rng = np.random.default_rng(0)
+    for n_frames in [0, 1, 2, 7, 500]:
+        index = pd.Index(np.arange(n_frames), name=AnalysisDf.IN.FRAME.value)
+        analysis_df = AnalysisDf.init_df(index)
+        # Quantitative columns with NaN values (except the first frame)
+        for i in range(4):
+            is_nan = (rng.uniform(size=n_frames) < 0.2 * i) & (index > 0)
+            analysis_df[(f"mouse{i}", "dist")] = np.where(is_nan, np.nan, rng.normal(size=n_frames))
+        analysis_df[("mouse5", "dist")] = rng.integers(0, 3, size=n_frames)
+        expected = agg_quantitative_loop(analysis_df)
+        pd.testing.assert_frame_equal(AnalysisSummaryDf.agg_quantitative(analysis_df, 10), expected)
+        # Behaviour columns with no bouts, and NaN values
+        analysis_df[("mouse6", "dist")] = 0
+        analysis_df[("mouse7", "dist")] = 1
+        analysis_df[("mouse8", "dist")] = np.where(rng.uniform(size=n_frames) < 0.1, np.nan, 1)
+        analysis_df = (analysis_df > 0.5).astype(np.float64).where(analysis_df.notna())
+        expected = agg_behavs_loop(analysis_df, 15)
+        pd.testing.assert_frame_equal(AnalysisSummaryDf.agg_behavs(analysis_df, 15), expected)
+
+
+def test_make_binned_multi_matches_make_binned():
+    rng = np.random.default_rng(0)
+    index = pd.Index(np.arange(0, 997), name=AnalysisDf.IN.FRAME.value)
+    analysis_df = AnalysisDf.init_df(index)
+    for i in range(3):
+        # NaN values (except in the short bins)
+        is_nan = (rng.uniform(size=997) < 0.1 * i) & (index >= 30)
+        analysis_df[(f"mouse{i}", "dist")] = np.where(is_nan, np.nan, rng.normal(size=997))
+        # Bouts crossing the bin edges
+        analysis_df[(f"mouse{i}", "behav")] = (rng.uniform(size=997) < 0.05 * (i + 1)).cumsum() % 2
+    # Regular bins, bins without frames, and bins without a first edge of 0
+    bins_dict = {
+        "a": np.arange(0, 99.7 + 7, 7),
+        "b": [2.5, 2.51, 2.6, 5, 50],
+        "c": [0, 13],
+        "d": np.arange(0, 120, 1.5),
+    }
+    for summary_func in [AnalysisSummaryDf.agg_quantitative, AnalysisSummaryDf.agg_behavs]:
+        binned_dfs = AnalysisBinnedDf.make_binned_multi(analysis_df, 10, bins_dict, summary_func)
+        for name, bins in bins_dict.items():
+            expected = AnalysisBinnedDf.make_binned(analysis_df, 10, bins, summary_func)
+            pd.testing.assert_frame_equal(binned_dfs[name], expected)
+
+
+def test_make_binned_multi_bout_attribution():
+    rng = np.random.default_rng(0)
+    index = pd.Index(np.arange(0, 997), name=AnalysisDf.IN.FRAME.value)
+    analysis_df = AnalysisDf.init_df(index)
+    analysis_df[("mouse1", "behav")] = (rng.uniform(size=997) < 0.02).cumsum() % 2
+    summary_df = AnalysisSummaryDf.agg_behavs(analysis_df, 10)
+    bins_dict = {"a": np.arange(0, 99.7 + 7, 7)}
+    for attribution in ["start", "majority"]:
+        binned_df = AnalysisBinnedDf.make_binned_multi(
+            analysis_df, 10, bins_dict, AnalysisSummaryDf.agg_behavs, attribution
+        )["a"]
+        # Bouts are not split, so the bins have all of the bouts (and their durations)
+        for agg in ["bout_freq", "bout_dur_total"]:
+            np.testing.assert_allclose(binned_df[("mouse1", "behav", agg)].sum(), summary_df[agg].iloc[0])
+        assert binned_df[("mouse1", "behav", "bout_dur_max")].max() == summary_df["bout_dur_max"].iloc[0]
+
+
+def test_get_analysis_configs_bout_attribution():
+    configs = ExperimentConfigs()
+    configs.auto.formatted_vid.fps = 15
+    configs.auto.formatted_vid.width_px = 960
+    configs.auto.formatted_vid.height_px = 540
+    configs.auto.px_per_mm = 2
+    configs.user.analyse.bout_attribution = "majority"
+    configs.get_analysis_configs()
+    configs.user.analyse.bout_attribution = "splt"
+    with pytest.raises(ValueError):
+        configs.get_analysis_configs()
+
+
+def test_analyse_all_isolates_failing_analyses(tmp_path, make_keypoints_df):
+    keypoints_fp = os.path.join(tmp_path, "exp.parquet")
+    KeypointsDf.write(make_keypoints_df(300, ["mouse1"], ["Nose", "TailBase1"], lhood_missing=0), keypoints_fp)
+    configs = ExperimentConfigs()
+    configs.auto.formatted_vid.fps = 15
+    configs.auto.formatted_vid.width_px = 960
+    configs.auto.formatted_vid.height_px = 540
+    configs.auto.px_per_mm = 2
+    configs.user.analyse.bins_sec = [5]
+    configs.user.analyse.speed.bodyparts = ["Nose", "TailBase1"]
+    configs.user.analyse.social_distance.bodyparts = ["Nose", "TailBase1"]
+    configs_fp = os.path.join(tmp_path, "exp.json")
+    configs.write_json(configs_fp)
+    # social_distance fails (fewer than 2 individuals), but speed is still written
+    dst_dir = os.path.join(tmp_path, "analysis")
+    msg = Analyse.analyse_all(keypoints_fp, dst_dir, configs_fp, (Analyse.social_distance, Analyse.speed))
+    assert "social_distance" in msg
+    assert os.path.isfile(os.path.join(dst_dir, "speed", "fbf", f"exp.{AnalysisDf.IO}"))
+    assert os.path.isfile(os.path.join(dst_dir, "speed", "summary", f"exp.{AnalysisDf.IO}"))
+    assert not os.path.exists(os.path.join(dst_dir, "social_distance"))
+
+
+def test_calc_motion_energy_box_padding(tmp_path, monkeypatch, make_keypoints_df):
+    keypoints_fp = os.path.join(tmp_path, "exp.parquet")
+    keypoints_df = make_keypoints_df(20, ["mouse1"], ["Nose", "TailBase1"], lhood_missing=0)
+    KeypointsDf.write(keypoints_df, keypoints_fp)
+    configs = ExperimentConfigs()
+    configs.auto.formatted_vid.fps = 15
+    configs.auto.formatted_vid.width_px = 960
+    configs.auto.formatted_vid.height_px = 540
+    configs.auto.px_per_mm = 2
+    configs.user.analyse.motion_energy.padding_mm = 10
+    configs.user.analyse.motion_energy.bodyparts = ["Nose", "TailBase1"]
+    configs_fp = os.path.join(tmp_path, "exp.json")
+    configs.write_json(configs_fp)
+    # Capturing the boxes (without decoding a video)
+    boxes_ls = []
+
+    def motion_energy_arr(vid_fp, samples, scale, masks, boxes, n_workers):
+        boxes_ls.append(boxes)
+        return np.zeros(samples.shape[0]), np.zeros((samples.shape[0], 0)), np.zeros((samples.shape[0], 1))
+
+    monkeypatch.setattr("behavysis.processes.analyse.motion_energy_arr", motion_energy_arr)
+    Analyse.calc_motion_energy(keypoints_fp, configs_fp, None)
+    # Boxes are padded by padding_mm / px_per_mm = 5 px on each side
+    x = KeypointsDf.clean_headings(keypoints_df).loc[:, ("mouse1", slice(None), CoordsCols.X.value)].to_numpy()
+    boxes = boxes_ls[0]
+    np.testing.assert_allclose(boxes[:, 0, 0], x.min(axis=1) - 5)
+    np.testing.assert_allclose(boxes[:, 0, 2] - boxes[:, 0, 0], x.max(axis=1) - x.min(axis=1) + 10)
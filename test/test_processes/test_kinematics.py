@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from behavysis.df_classes.keypoints_df import KeypointsDf
+from behavysis.processes.kinematics import Kinematics, pairwise_min_dists
+from behavysis.utils.experiment_context import ExperimentContext
+
+
+def get_n_cached(ctx):
+    return len([key for key in ctx._cache if isinstance(key[0], tuple) and key[0][0] == Kinematics.__name__])
+
+
+def test_kinematics_centroid_speeds_match_pandas(make_keypoints_df):
+    keypoints_df = KeypointsDf.clean_headings(make_keypoints_df(300, ["mouse1", "mouse2"], ["Nose", "TailBase1"]))
+    keypoints_df.iloc[10:20, 0] = np.nan
+    bpts = ["Nose", "TailBase1"]
+    kinematics = Kinematics(keypoints_df, bpts, 3)
+    # Previous pandas implementation (for reference)
+    idx = pd.IndexSlice
+    smoothed_xy_df = keypoints_df.rolling(window=3, min_periods=1, center=True).mean()
+    for i, indiv in enumerate(["mouse1", "mouse2"]):
+        delta_x = smoothed_xy_df.loc[:, idx[indiv, bpts, "x"]].mean(axis=1).diff()
+        delta_y = smoothed_xy_df.loc[:, idx[indiv, bpts, "y"]].mean(axis=1).diff()
+        expected = np.sqrt(np.power(delta_x, 2) + np.power(delta_y, 2)).to_numpy()
+        np.testing.assert_allclose(kinematics.centroid_speeds[:, i], expected, atol=1e-9)
+
+
+def test_kinematics_cached_in_context(tmp_path, make_keypoints_df):
+    keypoints_fp = os.path.join(tmp_path, "keypoints.parquet")
+    KeypointsDf.write(make_keypoints_df(100, ["mouse1"], ["Nose"]), keypoints_fp)
+    with ExperimentContext() as ctx:
+        kinematics = Kinematics.load(keypoints_fp, ["Nose"], 3)
+        assert get_n_cached(ctx) == 1
+        Kinematics.load(keypoints_fp, ["Nose"], 3)
+        assert get_n_cached(ctx) == 1
+        Kinematics.load(keypoints_fp, ["Nose"], 1)
+        assert get_n_cached(ctx) == 2
+    np.testing.assert_array_equal(kinematics.positions, Kinematics.load(keypoints_fp, ["Nose"], 3).positions)
+
+
+def test_pairwise_min_dists_matches_loop(make_keypoints_df):
+    keypoints_df = KeypointsDf.clean_headings(make_keypoints_df(200, [f"mouse{i}" for i in range(6)], ["Nose", "Tail"]))
+    kinematics = Kinematics(keypoints_df, ["Nose", "Tail"], 1)
+    positions = kinematics.positions.copy()
+    positions[5, 0, 0] = np.nan
+    positions[6, 1] = np.nan
+    # Small block size so frames are split into blocks
+    out = pairwise_min_dists(positions, block_size=100)
+    pairs = kinematics.get_pairs()
+    assert out.shape == (200, 15)
+    assert pairs[0] == ("mouse0", "mouse1") and pairs[-1] == ("mouse4", "mouse5")
+    # Per-pair loop (for reference)
+    for i, (indiv_a, indiv_b) in enumerate(pairs):
+        a = positions[:, kinematics.indivs.index(indiv_a)]
+        b = positions[:, kinematics.indivs.index(indiv_b)]
+        dists = np.sqrt(np.sum(np.power(a[:, :, None] - b[:, None, :], 2), axis=-1)).reshape(200, -1)
+        expected = np.array([np.nan if np.isnan(row).all() else np.nanmin(row) for row in dists])
+        np.testing.assert_allclose(out[:, i], expected)
+    assert np.isnan(out[6, 0]) and not np.isnan(out[5, 0])
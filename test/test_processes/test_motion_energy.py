@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+
+from behavysis.processes.motion_energy import get_downsampled_size, motion_energy_arr
+
+
+def make_vid(fp, n_frames, width, height):
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(fp, cv2.VideoWriter.fourcc(*"mp4v"), 15, (width, height))
+    for i in range(n_frames):
+        frame = np.full((height, width, 3), 64, dtype=np.uint8)
+        # Moving square and noise
+        frame[20:60, 2 * i : 2 * i + 40] = 200
+        frame[rng.uniform(size=(height, width)) < 0.01] = 255
+        writer.write(frame)
+    writer.release()
+
+
+def motion_energy_loop(vid_fp, frames, scale, masks, boxes):
+    # Reading every frame in order (for reference)
+    cap = cv2.VideoCapture(vid_fp)
+    size = get_downsampled_size(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), scale)
+    vid = []
+    while True:
+        is_read, frame = cap.read()
+        if not is_read:
+            break
+        vid.append(cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), size, interpolation=cv2.INTER_AREA))
+    frame_energy = np.full(frames.shape[0], np.nan)
+    mask_energy = np.full((frames.shape[0], masks.shape[0]), np.nan)
+    box_energy = np.full((frames.shape[0], boxes.shape[1]), np.nan)
+    for i in range(1, frames.shape[0]):
+        if frames[i] >= len(vid):
+            break
+        diff = np.abs(vid[frames[i]].astype(np.float64) - vid[frames[i - 1]])
+        frame_energy[i] = diff.mean()
+        mask_energy[i] = [diff[mask].mean() for mask in masks]
+        for k, (x0, y0, x1, y1) in enumerate(boxes[i]):
+            if not np.isnan(x0):
+                y0, x0 = max(0, int(np.floor(y0 * scale))), max(0, int(np.floor(x0 * scale)))
+                box = diff[y0 : int(np.ceil(y1 * scale)), x0 : int(np.ceil(x1 * scale))]
+                box_energy[i, k] = box.mean()
+    return frame_energy, mask_energy, box_energy
+
+
+def test_motion_energy_arr_matches_loop(tmp_path):
+    vid_fp = str(tmp_path / "vid.mp4")
+    make_vid(vid_fp, 60, 160, 96)
+    scale = 0.5
+    width, height = get_downsampled_size(160, 96, scale)
+    # Samples past the end of the video, masks, and moving (and NaN) boxes
+    frames = np.append(np.arange(0, 60, 3), [59, 61])
+    masks = np.zeros((2, height, width), dtype=bool)
+    masks[0, :24] = True
+    masks[1, :, 30:] = True
+    boxes = np.zeros((frames.shape[0], 2, 4))
+    boxes[:, 0] = np.stack([frames * 2, np.full(frames.shape, 20), frames * 2 + 40, np.full(frames.shape, 60)], axis=1)
+    boxes[:, 1] = [-10, 50, 75, 200]
+    boxes[5, 1] = np.nan
+    expected = motion_energy_loop(vid_fp, frames, scale, masks, boxes)
+    for n_workers in [1, 3]:
+        out = motion_energy_arr(vid_fp, frames, scale, masks, boxes, n_workers)
+        for arr, expected_arr in zip(out, expected):
+            np.testing.assert_allclose(arr, expected_arr)
+    assert np.isnan(out[0][[0, -1]]).all()
+    assert np.isnan(out[2][5, 1])
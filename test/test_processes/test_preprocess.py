@@ -0,0 +1,241 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.signal import savgol_filter
+
+from behavysis.df_classes.keypoints_df import CoordsCols, IndivCols, KeypointsDf
+from behavysis.processes.preprocess import (
+    GAP_FLAG,
+    Preprocess,
+    get_body_lengths,
+    interpolate_arr,
+    interpolate_df,
+    remove_outliers_df,
+    smooth_df,
+    smooth_kalman_arr,
+    smooth_median_arr,
+    smooth_savgol_arr,
+    switch_identities,
+)
+from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
+from behavysis.pydantic_models.processes.preprocess import InterpolateStationaryConfigs
+
+
+def interpolate_df_pandas(keypoints_df, pcutoff):
+    # Previous per-bodypart implementation (for reference)
+    keypoints_df = keypoints_df.copy()
+    unique_cols = keypoints_df.columns.droplevel(["coords"]).unique()
+    for scorer, indiv, bp in unique_cols:
+        keypoints_df[(scorer, indiv, bp, CoordsCols.LIKELIHOOD.value)] = keypoints_df[
+            (scorer, indiv, bp, CoordsCols.LIKELIHOOD.value)
+        ].fillna(value=0)
+        to_remove = keypoints_df[(scorer, indiv, bp, CoordsCols.LIKELIHOOD.value)] < pcutoff
+        keypoints_df.loc[to_remove, (scorer, indiv, bp, CoordsCols.X.value)] = np.nan
+        keypoints_df.loc[to_remove, (scorer, indiv, bp, CoordsCols.Y.value)] = np.nan
+    return keypoints_df.interpolate(method="linear").bfill().ffill()
+
+
+def test_interpolate_df_matches_pandas(make_keypoints_df):
+    keypoints_df = make_keypoints_df(1000, ["mouse1", "mouse2"], ["nose", "tail"])
+    # Making leading and trailing gaps
+    keypoints_df.iloc[:7, 2] = 0
+    keypoints_df.iloc[-4:, 5] = 0
+    out = interpolate_df(keypoints_df, 0.5, None, False, logging.getLogger())
+    expected = interpolate_df_pandas(keypoints_df, 0.5)
+    pd.testing.assert_frame_equal(out, expected, check_exact=False, rtol=1e-12)
+
+
+def test_interpolate_arr_max_gap():
+    arr = np.array([np.nan, 1, np.nan, 3, np.nan, np.nan, np.nan, 7, np.nan, np.nan])[:, None]
+    out = interpolate_arr(arr, max_gap_frames=2)
+    expected = np.array([1, 1, 2, 3, np.nan, np.nan, np.nan, 7, 7, 7])[:, None]
+    np.testing.assert_array_equal(out, expected)
+    # No valid values stays NaN
+    assert np.isnan(interpolate_arr(np.full((5, 1), np.nan))).all()
+
+
+def test_interpolate_df_flag_gaps(make_keypoints_df):
+    keypoints_df = make_keypoints_df(50, ["mouse1"], ["nose"])
+    keypoints_df.iloc[:, 2] = 1
+    keypoints_df.iloc[10:20, 2] = 0
+    out = interpolate_df(keypoints_df, 0.5, 5, True, logging.getLogger())
+    gap = out[("scorer", IndivCols.PROCESSED.value, "mouse1_nose", GAP_FLAG)].to_numpy()
+    assert gap[10:20].all() and gap.sum() == 10
+    assert out[("scorer", "mouse1", "nose", CoordsCols.X.value)].iloc[10:20].isna().all()
+    # Only the x and y coords can be null
+    KeypointsDf.check_df(out)
+    out.iloc[10, 2] = np.nan
+    with pytest.raises(AssertionError):
+        KeypointsDf.check_df(out)
+
+
+def test_smooth_savgol_matches_scipy():
+    rng = np.random.default_rng(0)
+    arr = rng.normal(size=(200, 6)).cumsum(axis=0)
+    out = smooth_savgol_arr(arr, np.ones_like(arr), 11, 3)
+    expected = savgol_filter(arr, 11, 3, axis=0)
+    np.testing.assert_allclose(out[5:-5], expected[5:-5], atol=1e-9)
+
+
+def test_smooth_savgol_ignores_zero_weights():
+    arr = np.tile(np.arange(50, dtype=np.float64)[:, None], (1, 2))
+    weights = np.ones_like(arr)
+    # Outliers with zero weight do not affect the (linear) fit
+    arr[20, 0] = 1000
+    weights[20, 0] = 0
+    out = smooth_savgol_arr(arr, weights, 7, 1)
+    np.testing.assert_allclose(np.delete(out[:, 0], 20), np.delete(arr[:, 1], 20), atol=1e-9)
+    np.testing.assert_allclose(out[20, 0], 20, atol=1e-9)
+
+
+def test_smooth_df_savgol_pcutoff(make_keypoints_df):
+    keypoints_df = make_keypoints_df(50, ["mouse1"], ["Nose"], lhood_missing=0)
+    x_col = ("scorer", "mouse1", "Nose", CoordsCols.X.value)
+    lhood_col = ("scorer", "mouse1", "Nose", CoordsCols.LIKELIHOOD.value)
+    keypoints_df[x_col] = np.arange(50, dtype=np.float64)
+    # An outlier below pcutoff does not affect the (linear) fit
+    keypoints_df.loc[20, x_col] = 1000
+    keypoints_df.loc[20, lhood_col] = 0.4
+    out = smooth_df(keypoints_df, "savgol", 7, 1, 0.5, 0.01, 4, logging.getLogger())
+    np.testing.assert_allclose(out[x_col], np.arange(50), atol=1e-9)
+
+
+def test_smooth_median_matches_pandas():
+    rng = np.random.default_rng(0)
+    arr = rng.normal(size=(300, 4))
+    lhood = rng.uniform(size=arr.shape)
+    out = smooth_median_arr(arr, lhood, 7, 0.5)
+    expected = pd.DataFrame(np.where(lhood >= 0.5, arr, np.nan)).rolling(7, center=True, min_periods=1).median()
+    expected = expected.fillna(pd.DataFrame(arr)).to_numpy()
+    np.testing.assert_allclose(out, expected)
+
+
+def test_smooth_kalman_reduces_noise():
+    rng = np.random.default_rng(0)
+    truth = np.tile(np.linspace(0, 100, 500)[:, None], (1, 3))
+    arr = truth + rng.normal(scale=2, size=truth.shape)
+    lhood = np.ones_like(arr)
+    lhood[100:120] = 0
+    out = smooth_kalman_arr(arr, lhood, 0.5, 0.01, 4)
+    assert np.abs(out - truth).mean() < np.abs(arr - truth).mean() / 2
+    # Gaps without observations are bridged by the constant-velocity model
+    assert np.abs(out[100:120] - truth[100:120]).max() < 2
+
+
+def test_remove_outliers_df(make_keypoints_df):
+    keypoints_df = make_keypoints_df(100, ["mouse1"], ["Nose", "BodyCentre", "TailBase1"], lhood_missing=0)
+    idx = pd.IndexSlice
+    # Making a still animal with a body length of 20 px
+    keypoints_df.loc[:, idx[:, :, "Nose", CoordsCols.X.value]] = 100
+    keypoints_df.loc[:, idx[:, :, "BodyCentre", CoordsCols.X.value]] = 110
+    keypoints_df.loc[:, idx[:, :, "TailBase1", CoordsCols.X.value]] = 120
+    keypoints_df.loc[:, idx[:, :, :, CoordsCols.Y.value]] = 100
+    # A single-frame jump of the nose, and a tail far from the body
+    keypoints_df.loc[50, idx[:, :, "Nose", CoordsCols.X.value]] = 300
+    keypoints_df.loc[70:72, idx[:, :, "TailBase1", CoordsCols.Y.value]] = 200
+    body_lengths = get_body_lengths([keypoints_df], ["Nose", "TailBase1"], 0.5, 50, logging.getLogger())
+    assert body_lengths["mouse1"] == 20
+    out = remove_outliers_df(keypoints_df, 0.5, 50, body_lengths, 1.5, logging.getLogger())
+    nose_x = out[("scorer", "mouse1", "Nose", CoordsCols.X.value)]
+    tail_lhood = out[("scorer", "mouse1", "TailBase1", CoordsCols.LIKELIHOOD.value)]
+    assert nose_x.isna().to_numpy().nonzero()[0].tolist() == [50]
+    assert (tail_lhood == 0).to_numpy().nonzero()[0].tolist() == [70, 71, 72]
+
+
+def test_remove_outliers_df_jumps(make_keypoints_df):
+    keypoints_df = make_keypoints_df(100, ["mouse1"], ["Nose"], lhood_missing=0)
+    idx = pd.IndexSlice
+    keypoints_df.loc[:, idx[:, :, :, [CoordsCols.X.value, CoordsCols.Y.value]]] = 100
+    # A single-frame spike removes only the spiked frame
+    keypoints_df.loc[30, idx[:, :, :, CoordsCols.X.value]] = 300
+    # A relocation (one large step) is kept
+    keypoints_df.loc[60:, idx[:, :, :, CoordsCols.Y.value]] = 400
+    out = remove_outliers_df(keypoints_df, 0.5, 50, None, None, logging.getLogger())
+    nose_x = out[("scorer", "mouse1", "Nose", CoordsCols.X.value)]
+    assert nose_x.isna().to_numpy().nonzero()[0].tolist() == [30]
+
+
+def make_streaming_configs(chunk_frames):
+    configs = ExperimentConfigs()
+    configs.auto.formatted_vid.fps = 15
+    configs.auto.formatted_vid.width_px = 960
+    configs.auto.formatted_vid.height_px = 540
+    configs.auto.px_per_mm = 2
+    configs.auto.start_frame = 110
+    configs.auto.stop_frame = 1000
+    configs.user.preprocess.chunk_frames = chunk_frames
+    configs.user.preprocess.interpolate_stationary = [
+        InterpolateStationaryConfigs(bodypart="TopLeft", pcutoff=0.99, pcutoff_all=0.9)
+    ]
+    configs.user.preprocess.remove_outliers.max_speed_mm_per_sec = 2000
+    configs.user.preprocess.interpolate.max_gap_frames = 50
+    configs.user.preprocess.interpolate.flag_gaps = True
+    configs.user.preprocess.refine_ids.marked = "mouse1marked"
+    configs.user.preprocess.refine_ids.unmarked = "mouse2unmarked"
+    configs.user.preprocess.refine_ids.marking = "AnimalColourMark"
+    configs.user.preprocess.refine_ids.bodyparts = ["BodyCentre", "TailBase1"]
+    return configs
+
+
+@pytest.mark.parametrize(
+    "func, configs_kwargs",
+    [
+        (Preprocess.start_stop_trim, {}),
+        (Preprocess.interpolate_stationary, {}),
+        (Preprocess.remove_outliers, {}),
+        (Preprocess.interpolate, {}),
+        (Preprocess.smooth, {"method": "savgol"}),
+        (Preprocess.smooth, {"method": "median"}),
+        (Preprocess.refine_ids, {"metric": "current"}),
+        (Preprocess.refine_ids, {"metric": "rolling"}),
+        (Preprocess.refine_ids, {"metric": "binned"}),
+    ],
+)
+def test_streaming_matches_in_memory(tmp_path, make_keypoints_df, func, configs_kwargs):
+    # Making keypoints file (starting from a non-zero frame)
+    keypoints_df = make_keypoints_df(
+        1000, ["mouse1marked", "mouse2unmarked"], ["Nose", "BodyCentre", "TailBase1"], lhood_missing=0.05
+    )
+    single_df = make_keypoints_df(1000, [IndivCols.SINGLE.value], ["AnimalColourMark", "TopLeft"], seed=1)
+    keypoints_df = pd.concat([keypoints_df, single_df], axis=1)
+    keypoints_df.index = keypoints_df.index + 100
+    # Making a long gap (longer than the chunks)
+    keypoints_df.iloc[300:420, 2] = 0
+    src_fp = os.path.join(tmp_path, "src.parquet")
+    KeypointsDf.write(keypoints_df, src_fp)
+    # Running in-memory and streamed (chunks smaller than some halos)
+    out_dfs = []
+    for chunk_frames in [None, 37]:
+        configs = make_streaming_configs(chunk_frames)
+        for k, v in configs_kwargs.items():
+            setattr(getattr(configs.user.preprocess, func.__name__), k, v)
+        configs_fp = os.path.join(tmp_path, f"configs_{chunk_frames}.json")
+        configs.write_json(configs_fp)
+        dst_fp = os.path.join(tmp_path, f"dst_{chunk_frames}.parquet")
+        outcome = func(src_fp, dst_fp, configs_fp, True)
+        assert "ERROR" not in outcome
+        out_dfs.append(KeypointsDf.read(dst_fp))
+    pd.testing.assert_frame_equal(out_dfs[0], out_dfs[1])
+
+
+def test_switch_identities_pairs_by_labels(make_keypoints_df):
+    keypoints_df = make_keypoints_df(10, ["marked", "unmarked"], ["Nose", "TailBase1"])
+    # The unmarked individual's columns are in a different order
+    columns = keypoints_df.columns
+    is_marked = columns.get_level_values(KeypointsDf.CN.INDIVIDUALS.value) == "marked"
+    keypoints_df = keypoints_df[columns[is_marked].append(columns[~is_marked][::-1])]
+    is_switch = pd.Series(np.arange(10) >= 5, index=keypoints_df.index)
+    out = switch_identities(keypoints_df, is_switch, "marked", "unmarked", logging.getLogger())
+    for bpt in ["Nose", "TailBase1"]:
+        for coord in [CoordsCols.X.value, CoordsCols.Y.value, CoordsCols.LIKELIHOOD.value]:
+            marked = keypoints_df[("scorer", "marked", bpt, coord)].to_numpy()
+            unmarked = keypoints_df[("scorer", "unmarked", bpt, coord)].to_numpy()
+            np.testing.assert_array_equal(out[("scorer", "marked", bpt, coord)], np.r_[marked[:5], unmarked[5:]])
+            np.testing.assert_array_equal(out[("scorer", "unmarked", bpt, coord)], np.r_[unmarked[:5], marked[5:]])
+    # Individuals with different bodyparts cannot be switched
+    keypoints_df = keypoints_df.drop(columns=("scorer", "unmarked", "Nose"))
+    with pytest.raises(ValueError):
+        switch_identities(keypoints_df, is_switch, "marked", "unmarked", logging.getLogger())
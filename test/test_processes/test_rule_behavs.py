@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from behavysis.df_classes.behav_df import BehavPredictedDf, BehavScoredDf
+from behavysis.df_classes.keypoints_df import KeypointsDf
+from behavysis.processes.analyse import Analyse
+from behavysis.processes.rule_behavs import calc_rule_behavs, eval_rule
+from behavysis.pydantic_models.bouts import BoutStruct
+from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
+from behavysis.pydantic_models.processes.classify_behavs import RuleBehavConfigs, RuleVariableConfigs
+from behavysis.utils.bout_array import BoutArray
+
+
+def test_calc_rule_behavs_matches_analyses(tmp_path):
+    rng = np.random.default_rng(0)
+    columns = pd.MultiIndex.from_product(
+        [["scorer"], ["mouse1", "mouse2"], ["Nose", "TailBase1"], ["x", "y", "likelihood"]],
+        names=[i.value for i in KeypointsDf.CN],
+    )
+    keypoints_df = pd.DataFrame(
+        rng.normal(size=(900, columns.shape[0])).cumsum(axis=0) + 250,
+        index=pd.Index(np.arange(100, 1000), name=KeypointsDf.IN.FRAME.value),
+        columns=columns,
+    )
+    keypoints_fp = os.path.join(tmp_path, "exp.parquet")
+    KeypointsDf.write(keypoints_df, keypoints_fp)
+    configs = ExperimentConfigs()
+    configs.auto.formatted_vid.fps = 30
+    configs.auto.formatted_vid.width_px = 960
+    configs.auto.formatted_vid.height_px = 540
+    configs.auto.px_per_mm = 2
+    configs.user.analyse.speed.bodyparts = ["Nose", "TailBase1"]
+    configs.user.analyse.social_distance.bodyparts = ["Nose", "TailBase1"]
+    configs.user.rule_behavs = [
+        RuleBehavConfigs(
+            behav_name="approach",
+            expression="(dist < 20) & (speed > 10)",
+            variables={
+                "dist": RuleVariableConfigs(analysis="social_distance", individual="mouse1_mouse2", measure="DistMM"),
+                "speed": RuleVariableConfigs(individual="mouse1"),
+            },
+            min_bout_secs=0.2,
+            min_empty_window_secs=0.1,
+        ),
+        RuleBehavConfigs(
+            behav_name="slow",
+            expression="speed < 40",
+            variables={"speed": RuleVariableConfigs(individual="mouse2", measure="SpeedMMperSec")},
+            min_empty_window_secs=0,
+        ),
+    ]
+    configs_fp = os.path.join(tmp_path, "exp.json")
+    configs.write_json(configs_fp)
+    behavs_df = calc_rule_behavs(keypoints_fp, configs_fp)
+    BehavPredictedDf.check_df(behavs_df)
+    # Matching the rules applied to the analyses
+    speed_df = Analyse.calc_speed(keypoints_fp, configs_fp, None)
+    dist_df = Analyse.calc_social_distance(keypoints_fp, configs_fp, None)
+    is_approach = (dist_df[("mouse1_mouse2", "DistMM")] < 20) & (speed_df[("mouse1", "SpeedMMperSecSmoothed")] > 10)
+    expected = BoutArray.from_vect(is_approach.to_numpy()).merge_gaps(2).filter_dur(min_dur=6).to_vect(900)
+    np.testing.assert_array_equal(behavs_df[("approach", "pred")].to_numpy(), expected.astype(int))
+    expected = (speed_df[("mouse2", "SpeedMMperSec")] < 40).to_numpy().astype(int)
+    np.testing.assert_array_equal(behavs_df[("slow", "pred")].to_numpy(), expected)
+    pd.testing.assert_index_equal(behavs_df.index, speed_df.index)
+    # Compatible with scored behavs (as in `Export.predictedbehavs2scoredbehavs`)
+    bouts_struct = [BoutStruct(behav=behav, user_defined=[]) for behav in ["approach", "slow"]]
+    BehavScoredDf.check_df(BehavScoredDf.predicted2scored(behavs_df, bouts_struct))
+
+
+def test_eval_rule():
+    variables = {"a": np.array([1.0, np.nan, 3.0]), "b": np.array([1, 0, 1], dtype=np.int8)}
+    np.testing.assert_array_equal(eval_rule("(a > 0) & b", variables, 3), [True, False, True])
+    np.testing.assert_array_equal(eval_rule("~(a < 2)", variables, 3), [False, True, True])
+    with pytest.raises(ValueError):
+        eval_rule("__import__('os')", variables, 3)
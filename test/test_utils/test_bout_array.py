@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from scipy.stats import mode
+
+from behavysis.utils.bout_array import BoutArray
+
+
+def bouts_loop(vect):
+    # Per-frame reference implementation
+    bouts = []
+    for i, x in enumerate(vect):
+        if x and (i == 0 or not vect[i - 1]):
+            bouts.append([i, i])
+        elif x:
+            bouts[-1][1] = i
+    return bouts
+
+
+def to_list(bouts):
+    return [[int(start), int(stop)] for start, stop in zip(bouts.starts, bouts.stops)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_from_vect_and_from_arr(seed):
+    rng = np.random.default_rng(seed)
+    arr = rng.uniform(size=(300, 4)) < [0.1, 0.5, 0.9, 1]
+    arr[0, 0] = arr[-1, 0] = True
+    bouts_ls = BoutArray.from_arr(arr)
+    for i in range(arr.shape[1]):
+        expected = bouts_loop(arr[:, i])
+        assert to_list(BoutArray.from_vect(arr[:, i])) == expected
+        assert to_list(bouts_ls[i]) == expected
+        np.testing.assert_array_equal(bouts_ls[i].to_vect(arr.shape[0]), arr[:, i])
+    assert len(BoutArray.from_vect(np.zeros(0, dtype=bool))) == 0
+
+
+def test_from_runs():
+    bouts = BoutArray.from_runs(np.array([1, 1, 0, 2, 2, 2, 1]))
+    assert to_list(bouts) == [[0, 1], [2, 2], [3, 5], [6, 6]]
+    np.testing.assert_array_equal(bouts.values, [1, 0, 2, 1])
+    assert len(BoutArray.from_runs(np.array([]))) == 0
+
+
+def test_filter_and_merge():
+    bouts = BoutArray([0, 5, 8, 20], [2, 6, 10, 29])
+    assert to_list(bouts.filter_dur(3)) == [[0, 2], [8, 10], [20, 29]]
+    assert to_list(bouts.filter_dur(2, 3)) == [[0, 2], [5, 6], [8, 10]]
+    assert to_list(bouts.merge_gaps(1)) == [[0, 2], [5, 10], [20, 29]]
+    assert to_list(bouts.merge_gaps(2)) == [[0, 10], [20, 29]]
+    assert to_list(bouts.merge_gaps(9)) == [[0, 29]]
+    assert len(BoutArray([], []).merge_gaps(2)) == 0
+
+
+def test_set_operations_and_clip():
+    a = BoutArray([0, 10], [4, 14])
+    b = BoutArray([3, 12, 20], [11, 12, 21])
+    assert to_list(a.intersection(b)) == [[3, 4], [10, 12]]
+    assert to_list(a.union(b)) == [[0, 14], [20, 21]]
+    assert to_list(b.clip(5, 20)) == [[5, 11], [12, 12], [20, 20]]
+
+
+def test_get_modes_matches_scipy():
+    rng = np.random.default_rng(0)
+    vect = rng.integers(-1, 2, size=500)
+    bouts = BoutArray.from_vect(rng.uniform(size=500) < 0.8)
+    expected = [int(mode(vect[start : stop + 1]).mode) for start, stop in zip(bouts.starts, bouts.stops)]
+    np.testing.assert_array_equal(bouts.get_modes(vect), expected)
+
+
+def test_summary():
+    summary = BoutArray([0, 10], [1, 15]).summary(fps=2)
+    assert summary["bout_freq"] == 2
+    assert summary["bout_dur_total"] == 4
+    assert summary["bout_dur_max"] == 3
+    assert BoutArray([], []).summary()["bout_dur_mean"] == 0
+
+
+def split_bins_loop(bouts, bounds, attribution):
+    # Per-bout reference implementation
+    out = []
+    for start, stop in to_list(bouts):
+        parts = []
+        for i in range(len(bounds) - 1):
+            part_start, part_stop = max(start, bounds[i]), min(stop, bounds[i + 1] - 1)
+            if part_start <= part_stop:
+                parts.append((i, part_start, part_stop))
+        if attribution == "split":
+            out += parts
+        elif parts and attribution == "start":
+            out.append((parts[0][0], max(start, bounds[0]), min(stop, bounds[-1] - 1)))
+        elif parts:
+            bin_idx = max(parts, key=lambda x: x[2] - x[1])[0]
+            out.append((bin_idx, max(start, bounds[0]), min(stop, bounds[-1] - 1)))
+    return out
+
+
+@pytest.mark.parametrize("attribution", ["split", "start", "majority"])
+def test_split_bins(attribution):
+    rng = np.random.default_rng(0)
+    bouts = BoutArray.from_vect(rng.uniform(size=500) < 0.9)
+    # Bins without frames, and frames outside the bins
+    bounds = np.array([5, 20, 20, 21, 100, 250, 251, 480])
+    bins_idx, bins_bouts = bouts.split_bins(bounds, attribution)
+    out = [(int(i), int(start), int(stop)) for i, start, stop in zip(bins_idx, bins_bouts.starts, bins_bouts.stops)]
+    assert out == split_bins_loop(bouts, bounds, attribution)
+    bins_idx, bins_bouts = BoutArray([], []).split_bins(bounds, attribution)
+    assert bins_idx.shape[0] == len(bins_bouts) == 0
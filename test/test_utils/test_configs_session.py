@@ -0,0 +1,35 @@
+import os
+
+from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
+from behavysis.utils.configs_session import ConfigsSession
+
+
+def test_configs_session_batches_writes(tmp_path):
+    fp = os.path.join(tmp_path, "configs.json")
+    ExperimentConfigs().write_json(fp)
+    mtime_ns = os.stat(fp).st_mtime_ns
+    with ConfigsSession(fp):
+        # Read-modify-write, as in each `CalculateParams` func
+        for field, value in [("start_frame", 10), ("stop_frame", 100), ("dur_frames", 90)]:
+            configs = ExperimentConfigs.read_json(fp)
+            setattr(configs.auto, field, value)
+            configs.write_json(fp)
+        # Updates are only in memory until the session exits
+        assert os.stat(fp).st_mtime_ns == mtime_ns
+        assert ExperimentConfigs.read_json(fp).auto.start_frame == 10
+    configs = ExperimentConfigs.read_json(fp)
+    assert (configs.auto.start_frame, configs.auto.stop_frame, configs.auto.dur_frames) == (10, 100, 90)
+    # No temporary files are left behind
+    assert os.listdir(tmp_path) == ["configs.json"]
+
+
+def test_configs_session_not_persisted(tmp_path):
+    fp = os.path.join(tmp_path, "configs.json")
+    ExperimentConfigs().write_json(fp)
+    with ConfigsSession(fp, persist=False):
+        configs = ExperimentConfigs.read_json(fp)
+        configs.auto.start_frame = 10
+        configs.write_json(fp)
+        assert ExperimentConfigs.read_json(fp).auto.start_frame == 10
+    # Updates are discarded
+    assert ExperimentConfigs.read_json(fp) == ExperimentConfigs()
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from behavysis.pydantic_models.experiment_configs import ExperimentConfigs
+from behavysis.utils.df_mixin import DFMixin
+from behavysis.utils.experiment_context import ExperimentContext
+
+
+def test_experiment_context_caches_reads(tmp_path, monkeypatch):
+    fp = os.path.join(tmp_path, "df.parquet")
+    DFMixin.write(pd.DataFrame({"a": np.arange(5.0)}), fp)
+    # Counting reads from disk
+    n_reads = []
+    read_parquet = DFMixin.read_parquet.__func__
+
+    def counted_read_parquet(cls, fp):
+        n_reads.append(fp)
+        return read_parquet(cls, fp)
+
+    monkeypatch.setattr(DFMixin, "read_parquet", classmethod(counted_read_parquet))
+    with ExperimentContext():
+        df = DFMixin.read(fp)
+        # Modifying the returned df does not change the cache
+        df["a"] = 0
+        assert DFMixin.read(fp)["a"].tolist() == [0, 1, 2, 3, 4]
+        assert len(n_reads) == 1
+        # Writing invalidates the cache
+        DFMixin.write(df, fp)
+        assert DFMixin.read(fp)["a"].tolist() == [0] * 5
+        assert len(n_reads) == 2
+    # Without an active context, reads from disk each call
+    DFMixin.read(fp)
+    DFMixin.read(fp)
+    assert len(n_reads) == 4
+
+
+def test_experiment_context_configs(tmp_path):
+    fp = os.path.join(tmp_path, "configs.json")
+    ExperimentConfigs().write_json(fp)
+    with ExperimentContext() as ctx:
+        configs = ExperimentConfigs.read_json(fp)
+        configs.auto.start_frame = 10
+        assert ExperimentConfigs.read_json(fp).auto.start_frame == -1
+        configs.write_json(fp)
+        assert ExperimentConfigs.read_json(fp).auto.start_frame == 10
+        assert ExperimentContext.get_active() is ctx
+    assert ExperimentContext.get_active() is None
+
+
+def test_experiment_context_shares_data(tmp_path):
+    fp = os.path.join(tmp_path, "df.parquet")
+    DFMixin.write(pd.DataFrame({"a": np.arange(5.0)}), fp)
+    with ExperimentContext() as ctx:
+        # Dfs are shallow copies of the cached df (the data is not copied)
+        df_a = DFMixin.read(fp)
+        df_b = DFMixin.read(fp)
+        assert df_a is not df_b
+        assert np.shares_memory(df_a["a"].to_numpy(), df_b["a"].to_numpy())
+        # Renaming the returned df's index does not change the cache
+        df_a.index.name = "b"
+        assert DFMixin.read(fp).index.name is None
+        # Arrays are read-only and shared
+        arr = ctx.load("arr", fp, lambda: np.arange(5.0))
+        assert not arr.flags.writeable
+        assert ctx.load("arr", fp, lambda: np.arange(5.0)) is arr
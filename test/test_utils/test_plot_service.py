@@ -0,0 +1,59 @@
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.figure import Figure
+
+from behavysis.utils.plot_service import PlotService, PlotSpec, render_plot
+
+
+def scatter_fig(n_pts: int) -> Figure:
+    fig, ax = plt.subplots()
+    ax.scatter(np.arange(n_pts), np.arange(n_pts))
+    ax.plot(np.arange(n_pts))
+    return fig
+
+
+def failing_fig(n_pts: int) -> Figure:
+    plt.subplots()
+    raise ValueError("Plotting failed.")
+
+
+def test_render_plot_closes_figures(tmp_path):
+    fignums = plt.get_fignums()
+    dst_fp = os.path.join(tmp_path, "plots", "scatter.png")
+    assert render_plot(PlotSpec(scatter_fig, dst_fp, 10)) == dst_fp
+    assert os.path.isfile(dst_fp)
+    # Figures opened by failed plots are also closed
+    try:
+        render_plot(PlotSpec(failing_fig, os.path.join(tmp_path, "failing.png"), 10))
+    except ValueError:
+        pass
+    assert plt.get_fignums() == fignums
+
+
+def test_render_plot_rasterises_large_artists(tmp_path):
+    # Vector outputs store an image (not every point) of large artists
+    small_fp = os.path.join(tmp_path, "small.svg")
+    large_fp = os.path.join(tmp_path, "large.svg")
+    render_plot(PlotSpec(scatter_fig, small_fp, 100))
+    render_plot(PlotSpec(scatter_fig, large_fp, 20000))
+    with open(small_fp) as f:
+        assert "<image" not in f.read()
+    with open(large_fp) as f:
+        assert "<image" in f.read()
+
+
+def test_plot_service(tmp_path):
+    fignums = plt.get_fignums()
+    dst_fp_ls = [os.path.join(tmp_path, f"{i}.png") for i in range(6)]
+    with PlotService(max_workers=2, max_pending=2) as service:
+        assert PlotService.get_active() is service
+        for dst_fp in dst_fp_ls:
+            PlotService.render_active(PlotSpec(scatter_fig, dst_fp, 100))
+        PlotService.render_active(PlotSpec(failing_fig, os.path.join(tmp_path, "failing.png"), 100))
+        # Failed plots are counted (and do not stop the other plots)
+        assert service.wait() == 1
+    assert PlotService.get_active() is None
+    assert all(os.path.isfile(dst_fp) for dst_fp in dst_fp_ls)
+    assert plt.get_fignums() == fignums
@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from behavysis.df_classes.keypoints_df import CoordsCols, KeypointsDf
+from behavysis.utils.quantised_codec import UNIT_LEVELS
+
+
+def make_nan_keypoints_df(make_keypoints_df):
+    keypoints_df = make_keypoints_df(1000, ["mouse1", "mouse2"], ["Nose", "TailBase1"], start_frame=100)
+    # Making NaN values (e.g. long gaps after preprocessing)
+    keypoints_df.iloc[50:80, 0] = np.nan
+    keypoints_df.iloc[:10, 3] = np.nan
+    return keypoints_df
+
+
+def test_write_quantised_max_error(tmp_path, make_keypoints_df):
+    keypoints_df = make_nan_keypoints_df(make_keypoints_df)
+    fp = os.path.join(tmp_path, "keypoints.parquet")
+    KeypointsDf.write_quantised(keypoints_df, fp, 0.01)
+    out = KeypointsDf.read(fp)
+    expected = KeypointsDf.basic_clean(keypoints_df)
+    pd.testing.assert_index_equal(out.columns, expected.columns)
+    pd.testing.assert_index_equal(out.index, expected.index)
+    np.testing.assert_array_equal(out.isna(), expected.isna())
+    err = (out - expected).abs()
+    lhood_cols = expected.columns.get_level_values("coords") == CoordsCols.LIKELIHOOD.value
+    assert err.loc[:, ~lhood_cols].max().max() <= 0.01 / 2 + 1e-9
+    assert err.loc[:, lhood_cols].max().max() <= 1 / (2 * UNIT_LEVELS) + 1e-9
+
+
+def test_iter_parquet_quantised_matches_read(tmp_path, make_keypoints_df):
+    keypoints_df = make_nan_keypoints_df(make_keypoints_df)
+    fp = os.path.join(tmp_path, "keypoints.parquet")
+    KeypointsDf.write_quantised(keypoints_df, fp, 0.01)
+    expected = KeypointsDf.read(fp)
+    out = pd.concat(list(KeypointsDf.iter_parquet(fp, 37)))
+    pd.testing.assert_frame_equal(out, expected)
+    # Projected columns
+    columns = expected.columns[[0, 2, 5]].to_list()
+    out = pd.concat(list(KeypointsDf.iter_parquet(fp, 37, columns)))
+    pd.testing.assert_frame_equal(out, expected[columns])
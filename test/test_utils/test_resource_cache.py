@@ -0,0 +1,33 @@
+import os
+
+import pandas as pd
+
+from behavysis.processes.calculate_params import read_start_times_csv
+from behavysis.utils.resource_cache import ResourceCache
+
+
+def test_resource_cache_parses_once(tmp_path):
+    csv_fp = os.path.join(tmp_path, "start_times.csv")
+    pd.DataFrame({"start_sec": [1.5, 2.0]}, index=pd.Index([1, 2], name="name")).to_csv(csv_fp)
+    with ResourceCache.session():
+        df = read_start_times_csv(csv_fp)
+        assert df.index.tolist() == ["1", "2"]
+        assert read_start_times_csv(csv_fp) is df
+        # Entries can be sent to (and used by) another process
+        entries = ResourceCache.get_entries()
+        ResourceCache.clear()
+        assert ResourceCache.run_with_entries(entries, read_start_times_csv, csv_fp) is df
+        # Changed files are re-parsed
+        pd.DataFrame({"start_sec": [3.0]}, index=pd.Index(["a"], name="name")).to_csv(csv_fp)
+        assert read_start_times_csv(csv_fp).index.tolist() == ["a"]
+    # The cache is cleared when the session ends
+    assert ResourceCache.get_entries() == {}
+
+
+def test_resource_cache_without_session(tmp_path):
+    csv_fp = os.path.join(tmp_path, "start_times.csv")
+    pd.DataFrame({"start_sec": [1.5]}, index=pd.Index([1], name="name")).to_csv(csv_fp)
+    # Without a session, each call parses the file (and gets its own df)
+    assert not ResourceCache.is_active()
+    assert read_start_times_csv(csv_fp) is not read_start_times_csv(csv_fp)
+    assert ResourceCache.get_entries() == {}
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from behavysis.utils.rolling_utils import (
+    rolling_count_arr,
+    rolling_majority_arr,
+    rolling_max_arr,
+    rolling_mean_arr,
+    rolling_min_arr,
+    rolling_sum_arr,
+)
+
+KERNELS = [
+    (rolling_sum_arr, "sum"),
+    (rolling_mean_arr, "mean"),
+    (rolling_min_arr, "min"),
+    (rolling_max_arr, "max"),
+]
+
+
+def make_arr(seed, n_frames=150, n_cols=3):
+    # Random array with random NaN fraction (including all-NaN runs)
+    rng = np.random.default_rng(seed)
+    arr = rng.normal(size=(n_frames, n_cols))
+    arr[rng.uniform(size=arr.shape) < rng.uniform(0, 0.5)] = np.nan
+    start = rng.integers(n_frames)
+    arr[start : start + rng.integers(20), rng.integers(n_cols)] = np.nan
+    return arr
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("func, name", KERNELS)
+def test_rolling_matches_pandas(seed, func, name):
+    rng = np.random.default_rng(seed)
+    arr = make_arr(seed)
+    for window in [1, 2, rng.integers(3, 40), 200]:
+        for center in [False, True]:
+            for min_periods in [None, 1, int(rng.integers(0, window + 1))]:
+                out = func(arr, window, min_periods=min_periods, center=center)
+                rolling = pd.DataFrame(arr).rolling(window, min_periods=min_periods, center=center)
+                expected = getattr(rolling, name)().to_numpy()
+                np.testing.assert_allclose(out, expected, atol=1e-9)
+    # 1D arrays
+    np.testing.assert_allclose(func(arr[:, 0], 5), getattr(pd.Series(arr[:, 0]).rolling(5), name)().to_numpy())
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rolling_count_matches_pandas(seed):
+    arr = make_arr(seed)
+    for center in [False, True]:
+        expected = pd.DataFrame(arr).rolling(7, min_periods=0, center=center).count().to_numpy()
+        np.testing.assert_array_equal(rolling_count_arr(arr, 7, center=center), expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rolling_majority_matches_pandas(seed):
+    rng = np.random.default_rng(seed)
+    arr = rng.uniform(size=100) < rng.uniform(0.2, 0.8)
+    for window in [1, 4, 9]:
+        for center in [False, True]:
+            expected = pd.Series(arr).rolling(window, min_periods=1, center=center).apply(lambda x: x.mode()[0])
+            np.testing.assert_array_equal(rolling_majority_arr(arr, window, center=center), expected.to_numpy() == 1)
+
+
+def test_rolling_invalid_window():
+    with pytest.raises(ValueError):
+        rolling_mean_arr(np.zeros(10), 0)